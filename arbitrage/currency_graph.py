@@ -0,0 +1,184 @@
+# arbitrage/currency_graph.py
+import logging
+import math
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger('triangular')
+
+# Ребро графа: (валюта_призначення, формат_пари, напрямок)
+Edge = Tuple[str, str, str]
+
+class CurrencyGraph:
+    """
+    Граф валют біржі для пошуку арбітражних циклів
+
+    Вершини - валюти, ребра - можливі угоди. Ринок BASE/QUOTE дає два ребра:
+    QUOTE -> BASE (купівля за ask) та BASE -> QUOTE (продаж за bid).
+    Вага ребра дорівнює -log(курс), тож цикл прибутковий, якщо сума ваг від'ємна.
+    Суміжність будується один раз з переліку ринків, а для кожного знімка цін
+    рахуються лише ваги ребер.
+    """
+    def __init__(self, symbols: Iterable[str], base_currency: str):
+        self.base_currency = base_currency
+        self.symbols: List[str] = []
+        self.adjacency: Dict[str, List[Edge]] = {}  # валюта -> вихідні ребра
+
+        for symbol in symbols:
+            # Пропускаємо деривативи ('BTC/USDT:USDT') та некоректні символи
+            if ':' in symbol or symbol.count('/') != 1:
+                continue
+            base, quote = symbol.split('/')
+            if not base or not quote or base == quote:
+                continue
+
+            self.symbols.append(symbol)
+            self.adjacency.setdefault(quote, []).append((base, symbol, 'buy'))
+            self.adjacency.setdefault(base, []).append((quote, symbol, 'sell'))
+
+        logger.info(f"Побудовано граф валют: {len(self.adjacency)} валют, {len(self.symbols)} ринків")
+
+    def edge_weights(self, tickers: Dict[str, Dict]) -> Dict[str, Dict[str, Tuple[float, str, str, float]]]:
+        """
+        Розраховує ваги ребер для знімка цін
+
+        Args:
+            tickers (Dict[str, Dict]): Тікери біржі
+
+        Returns:
+            Dict[str, Dict[str, Tuple[float, str, str, float]]]:
+                від_валюти -> {до_валюти: (вага, формат_пари, напрямок, ціна)}.
+                Якщо між валютами кілька ринків, залишається найвигідніший.
+        """
+        weights: Dict[str, Dict[str, Tuple[float, str, str, float]]] = {}
+
+        for from_currency, edges in self.adjacency.items():
+            currency_weights = {}
+            for to_currency, symbol, direction in edges:
+                ticker = tickers.get(symbol)
+                if not ticker:
+                    continue
+
+                if direction == 'buy':
+                    # Купуємо базову валюту: отримуємо 1 / ask за одиницю котирувальної
+                    price = ticker.get('ask')
+                    if not price or price <= 0:
+                        continue
+                    weight = math.log(price)
+                else:
+                    # Продаємо базову валюту: отримуємо bid за одиницю
+                    price = ticker.get('bid')
+                    if not price or price <= 0:
+                        continue
+                    weight = -math.log(price)
+
+                current = currency_weights.get(to_currency)
+                if current is None or weight < current[0]:
+                    currency_weights[to_currency] = (weight, symbol, direction, price)
+
+            if currency_weights:
+                weights[from_currency] = currency_weights
+
+        return weights
+
+    def find_cycles(self, tickers: Dict[str, Dict], fee_percent: float,
+                    min_net_profit: float, max_legs: int = 4) -> List[Dict]:
+        """
+        Знаходить усі прибуткові цикли з 3 та 4 угод через базову валюту
+
+        Комісія за угоду включається у вагу кожного ребра як -log(1 - fee),
+        тож відсікання відбувається одразу за чистим прибутком.
+
+        Args:
+            tickers (Dict[str, Dict]): Тікери біржі (один знімок)
+            fee_percent (float): Комісія за одну угоду у відсотках
+            min_net_profit (float): Мінімальний чистий прибуток у відсотках
+            max_legs (int): Максимальна кількість угод у циклі (3 або 4)
+
+        Returns:
+            List[Dict]: Цикли, відсортовані за чистим прибутком, у форматі
+                {'path', 'pairs', 'rates', 'profit_percent', 'net_profit_percent'}
+        """
+        weights = self.edge_weights(tickers)
+        base = self.base_currency
+        base_edges = weights.get(base)
+        if not base_edges:
+            return []
+
+        fee_weight = -math.log(1 - fee_percent / 100)
+        threshold = -math.log(1 + min_net_profit / 100)
+
+        # Ребра, що ведуть назад у базову валюту: валюта -> вага
+        to_base = {currency: edges[base][0] for currency, edges in weights.items()
+                   if base in edges and currency != base}
+
+        cycles = []
+
+        # Цикли з 3 угод: BASE -> A -> B -> BASE
+        limit3 = threshold - 3 * fee_weight
+        for a, (w_ba, _, _, _) in base_edges.items():
+            for b, (w_ab, _, _, _) in weights.get(a, {}).items():
+                if b == base or b not in to_base:
+                    continue
+                gross = w_ba + w_ab + to_base[b]
+                if gross < limit3:
+                    cycles.append(self._make_cycle(weights, [base, a, b, base], gross, fee_weight))
+
+        if max_legs >= 4:
+            # Цикли з 4 угод: BASE -> A -> B -> C -> BASE.
+            # Для кожної середньої валюти B збираємо найкращі половини циклу
+            # і перебираємо лише ті комбінації, що можуть пройти поріг.
+            limit4 = threshold - 4 * fee_weight
+
+            first_half: Dict[str, List[Tuple[float, str]]] = {}
+            for a, (w_ba, _, _, _) in base_edges.items():
+                for b, (w_ab, _, _, _) in weights.get(a, {}).items():
+                    if b != base:
+                        first_half.setdefault(b, []).append((w_ba + w_ab, a))
+
+            second_half: Dict[str, List[Tuple[float, str]]] = {}
+            for b in first_half:
+                for c, (w_bc, _, _, _) in weights.get(b, {}).items():
+                    if c != base and c in to_base:
+                        second_half.setdefault(b, []).append((w_bc + to_base[c], c))
+
+            for b, firsts in first_half.items():
+                seconds = second_half.get(b)
+                if not seconds:
+                    continue
+                firsts.sort()
+                seconds.sort()
+                if firsts[0][0] + seconds[0][0] >= limit4:
+                    continue
+
+                for w_first, a in firsts:
+                    if w_first + seconds[0][0] >= limit4:
+                        break
+                    for w_second, c in seconds:
+                        gross = w_first + w_second
+                        if gross >= limit4:
+                            break
+                        if c != a:
+                            cycles.append(self._make_cycle(weights, [base, a, b, c, base], gross, fee_weight))
+
+        cycles.sort(key=lambda cycle: cycle['net_profit_percent'], reverse=True)
+        return cycles
+
+    def _make_cycle(self, weights, path: List[str], gross_weight: float, fee_weight: float) -> Dict:
+        """
+        Формує опис знайденого циклу
+        """
+        pairs = []
+        rates = []
+        for i in range(len(path) - 1):
+            _, symbol, direction, price = weights[path[i]][path[i + 1]]
+            pairs.append((symbol, direction))
+            rates.append(price)
+
+        legs = len(path) - 1
+        return {
+            'path': path,
+            'pairs': pairs,
+            'rates': rates,
+            'profit_percent': (math.exp(-gross_weight) - 1) * 100,
+            'net_profit_percent': (math.exp(-(gross_weight + legs * fee_weight)) - 1) * 100
+        }
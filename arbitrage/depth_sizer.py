@@ -0,0 +1,164 @@
+# arbitrage/depth_sizer.py
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from exchange_api.base_exchange import BaseExchange
+from arbitrage.opportunity import ArbitrageOpportunity
+import config
+
+logger = logging.getLogger('arbitrage')
+
+class OrderBookSizer:
+    """
+    Оцінка крос-біржових можливостей з урахуванням глибини ордербуків
+
+    Для кожної можливості проходимо asks біржі купівлі та bids біржі продажу
+    і визначаємо максимальний обсяг, на якому угода ще прибуткова після комісій.
+    Ордербуки кешуються на короткий час, тож кілька можливостей для однієї
+    пари використовують один запит.
+    """
+    def __init__(self, exchanges: Dict[str, BaseExchange],
+                 cache_ttl: float = config.ORDERBOOK_CACHE_TTL,
+                 depth: int = config.ORDERBOOK_DEPTH):
+        self.exchanges = exchanges
+        self.cache_ttl = cache_ttl
+        self.depth = depth
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}  # (біржа, пара) -> (час, ордербук)
+
+    async def size_opportunities(self, opportunities: List[ArbitrageOpportunity]) -> List[ArbitrageOpportunity]:
+        """
+        Додає до крос-біржових можливостей максимальний прибутковий обсяг та прибуток на цьому обсязі
+
+        Args:
+            opportunities (List[ArbitrageOpportunity]): Знайдені можливості
+
+        Returns:
+            List[ArbitrageOpportunity]: Ті самі можливості з заповненими полями обсягу
+        """
+        candidates = [opp for opp in opportunities
+                      if opp.opportunity_type == "cross" and opp.buy_exchange in self.exchanges
+                      and opp.sell_exchange in self.exchanges]
+        if not candidates:
+            return opportunities
+
+        keys = set()
+        for opp in candidates:
+            keys.add((opp.buy_exchange, opp.symbol))
+            keys.add((opp.sell_exchange, opp.symbol))
+        await self._fetch_orderbooks(keys)
+
+        for opp in candidates:
+            buy_book = self._cached_orderbook(opp.buy_exchange, opp.symbol)
+            sell_book = self._cached_orderbook(opp.sell_exchange, opp.symbol)
+            if not buy_book or not sell_book:
+                continue
+
+            sizing = calculate_max_profitable_size(
+                buy_book.get('asks', []), sell_book.get('bids', []), opp.buy_fee, opp.sell_fee
+            )
+            if sizing is None:
+                continue
+
+            opp.max_size, opp.avg_buy_price, opp.avg_sell_price, opp.sized_net_profit, opp.sized_net_profit_percent = sizing
+            logger.info(
+                f"Глибина {opp.symbol} {opp.buy_exchange} -> {opp.sell_exchange}: "
+                f"макс. обсяг {opp.max_size:.8f}, середня купівля {opp.avg_buy_price:.8f}, "
+                f"середній продаж {opp.avg_sell_price:.8f}, чистий прибуток {opp.sized_net_profit:.4f} "
+                f"({opp.sized_net_profit_percent:.4f}%)"
+            )
+
+        return opportunities
+
+    async def _fetch_orderbooks(self, keys):
+        """
+        Одночасно отримує ордербуки, яких немає в кеші або термін яких сплив
+        """
+        now = time.monotonic()
+
+        # Прибираємо застарілі записи, щоб кеш не ріс необмежено
+        for key in [key for key, (fetched_at, _) in self._cache.items() if now - fetched_at >= self.cache_ttl]:
+            del self._cache[key]
+
+        missing = [key for key in keys if key not in self._cache]
+        if not missing:
+            return
+
+        results = await asyncio.gather(
+            *[self.exchanges[exchange_name].get_orderbook(symbol, self.depth) for exchange_name, symbol in missing],
+            return_exceptions=True
+        )
+
+        fetched_at = time.monotonic()
+        for key, orderbook in zip(missing, results):
+            if isinstance(orderbook, Exception):
+                logger.error(f"Помилка при отриманні ордербуку {key[1]} на {key[0]}: {orderbook}")
+                continue
+            if orderbook:
+                self._cache[key] = (fetched_at, orderbook)
+
+    def _cached_orderbook(self, exchange_name: str, symbol: str) -> Optional[Dict]:
+        cached = self._cache.get((exchange_name, symbol))
+        return cached[1] if cached else None
+
+def calculate_max_profitable_size(asks, bids, buy_fee: float = 0.0,
+                                  sell_fee: float = 0.0) -> Optional[Tuple[float, float, float, float, float]]:
+    """
+    Розраховує максимальний прибутковий обсяг угоди за рівнями ордербуків
+
+    Рівні asks (за зростанням ціни) та bids (за спаданням) зводяться до спільних
+    точок накопиченого обсягу. На кожному відрізку між ними гранична ціна купівлі
+    і продажу стала, а граничний прибуток не зростає, тож прибуткові відрізки
+    утворюють префікс.
+
+    Args:
+        asks: Рівні [ціна, обсяг] біржі купівлі
+        bids: Рівні [ціна, обсяг] біржі продажу
+        buy_fee (float): Комісія купівлі у відсотках
+        sell_fee (float): Комісія продажу у відсотках
+
+    Returns:
+        Optional[Tuple[float, float, float, float, float]]:
+            (обсяг, середня ціна купівлі, середня ціна продажу, чистий прибуток
+            у котирувальній валюті, чистий прибуток у відсотках) або None,
+            якщо прибуткового обсягу немає
+    """
+    if not asks or not bids:
+        return None
+
+    asks = np.asarray(asks, dtype=float)[:, :2]
+    bids = np.asarray(bids, dtype=float)[:, :2]
+    ask_volumes = np.cumsum(asks[:, 1])
+    bid_volumes = np.cumsum(bids[:, 1])
+
+    total = min(ask_volumes[-1], bid_volumes[-1])
+    breakpoints = np.unique(np.concatenate([ask_volumes, bid_volumes]))
+    breakpoints = breakpoints[(breakpoints > 0) & (breakpoints <= total)]
+    if breakpoints.size == 0:
+        return None
+
+    starts = np.concatenate([[0.0], breakpoints[:-1]])
+    lengths = breakpoints - starts
+    middles = (starts + breakpoints) / 2
+
+    buy_prices = asks[np.searchsorted(ask_volumes, middles), 0]
+    sell_prices = bids[np.searchsorted(bid_volumes, middles), 0]
+
+    buy_multiplier = 1 + buy_fee / 100
+    sell_multiplier = 1 - sell_fee / 100
+    profitable = sell_prices * sell_multiplier > buy_prices * buy_multiplier
+
+    count = int(np.argmin(profitable)) if not profitable.all() else profitable.size
+    if count == 0:
+        return None
+
+    size = float(breakpoints[count - 1])
+    cost = float(np.dot(lengths[:count], buy_prices[:count]))
+    revenue = float(np.dot(lengths[:count], sell_prices[:count]))
+    net_profit = revenue * sell_multiplier - cost * buy_multiplier
+    net_profit_percent = net_profit / (cost * buy_multiplier) * 100
+
+    return size, cost / size, revenue / size, net_profit, net_profit_percent
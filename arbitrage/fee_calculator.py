@@ -34,10 +34,10 @@ class FeeCalculator:
         base_currency, quote_currency = symbol.split('/')
         
         # Комісія за купівлю (taker fee)
-        buy_fee_percent = self._get_trading_fee(buy_exchange, 'taker')
+        buy_fee_percent = self.get_trading_fee(buy_exchange, 'taker')
         
         # Комісія за продаж (taker fee)
-        sell_fee_percent = self._get_trading_fee(sell_exchange, 'taker')
+        sell_fee_percent = self.get_trading_fee(sell_exchange, 'taker')
         
         # Комісія за виведення базової валюти з біржі покупки
         withdrawal_fee = self._get_withdrawal_fee(buy_exchange, base_currency, amount)
@@ -71,7 +71,7 @@ class FeeCalculator:
         trade_count = len(path) - 1
         
         # Отримуємо комісію за угоду (taker fee)
-        taker_fee = self._get_trading_fee(exchange, 'taker')
+        taker_fee = self.get_trading_fee(exchange, 'taker')
         
         # Загальна комісія у відсотках
         total_fee_percent = taker_fee * trade_count
@@ -82,7 +82,7 @@ class FeeCalculator:
         
         return total_fee_percent
     
-    def _get_trading_fee(self, exchange: str, fee_type: str) -> float:
+    def get_trading_fee(self, exchange: str, fee_type: str) -> float:
         """
         Отримати комісію за угоду з урахуванням можливих знижок
         
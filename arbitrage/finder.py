@@ -2,18 +2,25 @@
 import logging
 from typing import Dict, List, Tuple, Optional
 import asyncio
+import time
 from datetime import datetime
-import json
-import os
+
+import numpy as np
 
 from exchange_api.base_exchange import BaseExchange
 from exchange_api.factory import ExchangeFactory
 from arbitrage.opportunity import ArbitrageOpportunity
+from arbitrage.spread_engine import SpreadEngine
+from arbitrage.depth_sizer import OrderBookSizer
+from arbitrage.history_store import OpportunityHistoryStore
 import config
+import metrics
 
 logger = logging.getLogger('arbitrage')
 all_opps_logger = logging.getLogger('all_opportunities')
 
+TICKERS_LATENCY = metrics.histogram("exchange_get_tickers_seconds", "Час отримання тікерів біржі", ("exchange",))
+
 class ArbitrageFinder:
     """
     Клас для пошуку арбітражних можливостей між біржами
@@ -23,13 +30,18 @@ class ArbitrageFinder:
                  min_profit: float = config.MIN_PROFIT_THRESHOLD, 
                  include_fees: bool = config.INCLUDE_FEES,
                  buy_fee_type: str = config.BUY_FEE_TYPE,
-                 sell_fee_type: str = config.SELL_FEE_TYPE):
+                 sell_fee_type: str = config.SELL_FEE_TYPE,
+                 engine: str = config.CROSS_ENGINE):
         self.exchange_names = exchange_names
         self.min_profit = min_profit
         self.include_fees = include_fees
         self.buy_fee_type = buy_fee_type.lower()  # 'maker' або 'taker'
         self.sell_fee_type = sell_fee_type.lower()  # 'maker' або 'taker'
         self.exchanges: Dict[str, BaseExchange] = {}
+        self.engine = engine.lower()  # 'loop' - перебір у циклах, 'vectorized' - розрахунок масивами NumPy
+        self.spread_engine: Optional[SpreadEngine] = None
+        self.depth_sizer = OrderBookSizer(self.exchanges)
+        self.history_store = OpportunityHistoryStore(config.HISTORY_DIR)
         logger.info(f"Ініціалізовано ArbitrageFinder з min_profit={min_profit}%, include_fees={include_fees}")
         
     async def initialize(self):
@@ -40,6 +52,10 @@ class ArbitrageFinder:
             try:
                 self.exchanges[name] = ExchangeFactory.create(name)
                 logger.info(f"Ініціалізовано біржу {name}")
+                
+                if config.USE_WEBSOCKET_STREAMS:
+                    await self.exchanges[name].start_ticker_stream(ExchangeFactory.get_supported_pairs(name))
+                    logger.info(f"Запущено WebSocket-потік цін для біржі {name}")
             except Exception as e:
                 logger.error(f"Помилка при ініціалізації біржі {name}: {e}")
     
@@ -49,10 +65,11 @@ class ArbitrageFinder:
         """
         for name, exchange in self.exchanges.items():
             try:
-                await exchange.close()
-                logger.info(f"Закрито з'єднання з біржею {name}")
+                await ExchangeFactory.release(exchange)
             except Exception as e:
                 logger.error(f"Помилка при закритті з'єднання з біржею {name}: {e}")
+        self.exchanges.clear()
+        self.history_store.close()
     
     async def get_all_tickers(self, symbols: List[str] = None) -> Dict[str, Dict[str, Dict]]:
         """
@@ -105,13 +122,20 @@ class ArbitrageFinder:
         """
         Отримання тікерів для однієї біржі
         """
+        start_time = time.perf_counter()
         try:
-            tickers = await exchange.get_tickers(symbols)
+            # Обмежуємо час, щоб повільна біржа не затримувала порівняння цін інших бірж
+            tickers = await asyncio.wait_for(exchange.get_tickers(symbols), timeout=config.SCAN_TIMEOUT)
             logger.info(f"Отримано {len(tickers)} тікерів для {exchange_name}")
             return tickers
+        except asyncio.TimeoutError:
+            logger.warning(f"Біржа {exchange_name} не повернула тікери за {config.SCAN_TIMEOUT} с")
+            return {}
         except Exception as e:
             logger.error(f"Помилка при отриманні тікерів для {exchange_name}: {e}")
             return {}
+        finally:
+            TICKERS_LATENCY.labels(exchange_name).observe(time.perf_counter() - start_time)
     
     async def find_opportunities(self, symbols: List[str] = None) -> List[ArbitrageOpportunity]:
         """
@@ -120,9 +144,6 @@ class ArbitrageFinder:
         if symbols is None:
             symbols = config.PAIRS
             
-        opportunities = []
-        all_possible_opportunities = []  # Для збереження всіх можливостей
-        
         # Логуємо, які пари перевіряються
         logger.info(f"Починаємо пошук арбітражних можливостей для {len(symbols)} пар: {', '.join(symbols)}")
         
@@ -152,6 +173,73 @@ class ArbitrageFinder:
         if missing_pairs:
             logger.info(f"Не знайдено тікерів для пар: {', '.join(missing_pairs)}")
             
+        if self.engine == "vectorized":
+            opportunities, all_possible_opportunities = self._find_vectorized(symbols, all_tickers)
+        else:
+            opportunities, all_possible_opportunities = self._find_in_loop(symbols, all_tickers)
+        
+        # Логуємо всі можливості, навіть якщо вони не пройшли за порогом
+        if all_possible_opportunities:
+            # Сортуємо за чистим прибутком
+            all_possible_opportunities.sort(key=lambda x: x['net_profit_percent'], reverse=True)
+            
+            # Логуємо у спеціальний файл одним структурованим записом: рядки звіту
+            # формує форматер файлу в потоці запису логів, а не цикл пошуку
+            all_opps_logger.info(
+                "===== ЗВІТ ПРО ВСІ МОЖЛИВОСТІ (%s) =====\nВсього знайдено %d потенційних можливостей:",
+                datetime.now().strftime('%Y-%m-%d %H:%M:%S'), len(all_possible_opportunities),
+                extra={"data": all_possible_opportunities}
+            )
+            
+            # Також дописуємо всі можливості в історію для аналізу
+            try:
+                saved = self.history_store.append(all_possible_opportunities)
+                logger.info(f"Збережено {saved} потенційних можливостей в історію {config.HISTORY_DIR}")
+            except Exception as e:
+                logger.error(f"Помилка при збереженні можливостей в історію: {e}")
+        
+        logger.info(f"Всього знайдено {len(opportunities)} арбітражних можливостей")
+        return opportunities
+    
+    async def size_opportunities(self, opportunities: List[ArbitrageOpportunity]) -> List[ArbitrageOpportunity]:
+        """
+        Оцінює знайдені можливості за глибиною ордербуків
+        
+        Ордербуки запитуються лише для знайдених можливостей, тож основний пошук
+        залишається на тікерах. У разі помилки чи таймауту можливості повертаються без оцінки.
+        
+        Args:
+            opportunities (List[ArbitrageOpportunity]): Можливості, знайдені find_opportunities()
+            
+        Returns:
+            List[ArbitrageOpportunity]: Можливості з максимальним прибутковим обсягом
+        """
+        try:
+            return await asyncio.wait_for(self.depth_sizer.size_opportunities(opportunities), timeout=config.SCAN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Оцінка глибини ордербуків не завершилась за {config.SCAN_TIMEOUT} с")
+        except Exception as e:
+            logger.error(f"Помилка при оцінці глибини ордербуків: {e}")
+        return opportunities
+    
+    def _find_in_loop(self, symbols: List[str], all_tickers: Dict[str, Dict[str, Dict]]) -> Tuple[List[ArbitrageOpportunity], List[Dict]]:
+        """
+        Пошук можливостей перебором пар і комбінацій бірж
+        
+        Returns:
+            Tuple[List[ArbitrageOpportunity], List[Dict]]: Можливості вище порогу та всі можливості з позитивним прибутком
+        """
+        opportunities = []
+        all_possible_opportunities = []  # Для збереження всіх можливостей
+        
+        # Діагностичні записи по кожній комбінації формуються лише при рівні DEBUG
+        # (config.ARBITRAGE_DEBUG_LOG), інакше цикл не створює для них жодних рядків
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        # Час циклу спільний для всіх можливостей
+        timestamp = datetime.now().isoformat()
+        # Комісії бірж (купівля, продаж) визначаються один раз за цикл
+        fees = {exchange_name: self._get_fees(exchange_name) for exchange_name in all_tickers}
+        
         # Для кожної валютної пари перевіряємо можливості арбітражу між біржами
         for symbol in symbols:
             # Збираємо ціни з усіх бірж для поточної пари
@@ -171,7 +259,8 @@ class ArbitrageFinder:
             
             # Якщо маємо ціни з принаймні двох бірж
             if len(symbol_prices) >= 2:
-                logger.debug(f"Знайдено ціни для {symbol} на {len(symbol_prices)} біржах: {', '.join(symbol_prices.keys())}")
+                if debug_enabled:
+                    logger.debug("Знайдено ціни для %s на %d біржах: %s", symbol, len(symbol_prices), ', '.join(symbol_prices))
                 # Перевіряємо всі можливі комбінації бірж
                 exchange_names = list(symbol_prices.keys())
                 for i in range(len(exchange_names)):
@@ -192,17 +281,8 @@ class ArbitrageFinder:
                                 profit_percent = (sell_price - buy_price) / buy_price * 100
                                 
                                 # Отримуємо відповідні комісії для бірж (окремо для купівлі та продажу)
-                                buy_fee = 0.0
-                                sell_fee = 0.0
-                                
-                                if self.include_fees:
-                                    # Комісія для купівлі з використанням відповідного типу (maker/taker)
-                                    if buy_exchange.lower() in config.EXCHANGE_FEES:
-                                        buy_fee = config.EXCHANGE_FEES[buy_exchange.lower()].get(self.buy_fee_type, 0.0)
-                                    
-                                    # Комісія для продажу з використанням відповідного типу (maker/taker)
-                                    if sell_exchange.lower() in config.EXCHANGE_FEES:
-                                        sell_fee = config.EXCHANGE_FEES[sell_exchange.lower()].get(self.sell_fee_type, 0.0)
+                                buy_fee = fees[buy_exchange][0]
+                                sell_fee = fees[sell_exchange][1]
                                 
                                 # Розраховуємо чистий прибуток з урахуванням комісій
                                 if self.include_fees and (buy_fee > 0 or sell_fee > 0):
@@ -217,19 +297,13 @@ class ArbitrageFinder:
                                     compare_profit = profit_percent
                                     net_profit_percent = None
                                 
-                                # Форматуємо рядок з чистим прибутком
-                                if net_profit_percent is not None:
-                                    net_profit_str = f"{net_profit_percent:.4f}"
-                                else:
-                                    net_profit_str = "0.0000"
-                                
                                 # Логуємо для діагностики - всі комбінації, навіть ті, що не дають прибуток
-                                logger.debug(
-                                    f"{symbol}: {buy_exchange} -> {sell_exchange}: "
-                                    f"buy={buy_price:.8f}, sell={sell_price:.8f}, "
-                                    f"profit={profit_percent:.4f}%, "
-                                    f"net_profit={net_profit_str}%"
-                                )
+                                if debug_enabled:
+                                    logger.debug(
+                                        "%s: %s -> %s: buy=%.8f, sell=%.8f, profit=%.4f%%, net_profit=%.4f%%",
+                                        symbol, buy_exchange, sell_exchange, buy_price, sell_price,
+                                        profit_percent, net_profit_percent or 0.0
+                                    )
                                 
                                 # Логуємо всі можливості з позитивним прибутком, навіть якщо не проходять за порогом
                                 if profit_percent > 0:
@@ -244,7 +318,7 @@ class ArbitrageFinder:
                                         "buy_fee": buy_fee,
                                         "sell_fee": sell_fee,
                                         "net_profit_percent": net_profit_percent if net_profit_percent is not None else 0.0,
-                                        "timestamp": datetime.now().isoformat()
+                                        "timestamp": timestamp
                                     }
                                     all_possible_opportunities.append(opportunity_data)
                                 
@@ -271,7 +345,7 @@ class ArbitrageFinder:
                                         f"купити на {buy_exchange} за {buy_price:.8f} (комісія {buy_fee}%), "
                                         f"продати на {sell_exchange} за {sell_price:.8f} (комісія {sell_fee}%). "
                                         f"Прибуток: {profit_percent:.2f}%, "
-                                        f"Чистий прибуток: {net_profit_str}%"
+                                        f"Чистий прибуток: {net_profit_percent or 0.0:.4f}%"
                                     )
                                 elif profit_percent >= self.min_profit and (net_profit_percent is None or net_profit_percent < self.min_profit):
                                     # Логуємо випадки, коли є потенційний прибуток, але комісії його "з'їдають"
@@ -280,50 +354,105 @@ class ArbitrageFinder:
                                         f"купити на {buy_exchange} за {buy_price:.8f} (комісія {buy_fee}%), "
                                         f"продати на {sell_exchange} за {sell_price:.8f} (комісія {sell_fee}%). "
                                         f"Прибуток: {profit_percent:.2f}%, "
-                                        f"Чистий прибуток: {net_profit_str}% < {self.min_profit}%"
+                                        f"Чистий прибуток: {net_profit_percent or 0.0:.4f}% < {self.min_profit}%"
                                     )
-            else:
-                logger.debug(f"Недостатньо бірж для арбітражу для {symbol} (знайдено цін: {len(symbol_prices)})")
+            elif debug_enabled:
+                logger.debug("Недостатньо бірж для арбітражу для %s (знайдено цін: %d)", symbol, len(symbol_prices))
         
-        # Логуємо всі можливості, навіть якщо вони не пройшли за порогом
-        if all_possible_opportunities:
-            # Сортуємо за чистим прибутком
-            all_possible_opportunities.sort(key=lambda x: x['net_profit_percent'], reverse=True)
-            
-            # Логуємо у спеціальний файл
-            opportunity_log = f"===== ЗВІТ ПРО ВСІ МОЖЛИВОСТІ ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) =====\n"
-            opportunity_log += f"Всього знайдено {len(all_possible_opportunities)} потенційних можливостей:\n"
-            
-            for i, opp in enumerate(all_possible_opportunities, 1):
-                opportunity_log += (
-                    f"{i}. {opp['symbol']}: {opp['buy_exchange']} → {opp['sell_exchange']}, "
-                    f"Прибуток {opp['profit_percent']:.4f}%, "
-                    f"Чистий прибуток {opp['net_profit_percent']:.4f}%, "
-                    f"Buy: {opp['buy_price']}, Sell: {opp['sell_price']}\n"
-                )
-            
-            all_opps_logger.info(opportunity_log)
+        return opportunities, all_possible_opportunities
+    
+    def _get_fees(self, exchange_name: str) -> Tuple[float, float]:
+        """
+        Повертає комісії біржі для купівлі та продажу з урахуванням типів (maker/taker)
+        
+        Args:
+            exchange_name (str): Назва біржі
             
-            # Також зберігаємо всі можливості в JSON файл для аналізу
-            opportunities_data = {
-                "timestamp": datetime.now().isoformat(),
-                "total": len(all_possible_opportunities),
-                "opportunities": all_possible_opportunities,
-                "min_profit_threshold": self.min_profit
-            }
+        Returns:
+            Tuple[float, float]: Комісія купівлі та продажу у відсотках (0.0, якщо комісії вимкнені)
+        """
+        exchange_fees = config.EXCHANGE_FEES.get(exchange_name.lower()) if self.include_fees else None
+        if not exchange_fees:
+            return 0.0, 0.0
+        return exchange_fees.get(self.buy_fee_type, 0.0), exchange_fees.get(self.sell_fee_type, 0.0)
+    
+    def _find_vectorized(self, symbols: List[str], all_tickers: Dict[str, Dict[str, Dict]]) -> Tuple[List[ArbitrageOpportunity], List[Dict]]:
+        """
+        Пошук можливостей векторизованим розрахунком спредів для всіх пар і комбінацій бірж
+        
+        Об'єкти ArbitrageOpportunity створюються лише для рядків, що пройшли поріг.
+        
+        Returns:
+            Tuple[List[ArbitrageOpportunity], List[Dict]]: Можливості вище порогу та всі можливості з позитивним прибутком
+        """
+        exchange_names = list(all_tickers.keys())
+        if self.spread_engine is None or self.spread_engine.exchange_names != exchange_names:
+            self.spread_engine = SpreadEngine(exchange_names, self.include_fees, self.buy_fee_type, self.sell_fee_type)
+        engine = self.spread_engine
+        
+        bids, asks = engine.pack_prices(symbols, all_tickers)
+        spreads = engine.compute(bids, asks)
+        valid = spreads['valid']
+        profit = spreads['profit']
+        net_profit = spreads['net_profit']
+        buy_prices = spreads['buy_price']
+        sell_prices = spreads['sell_price']
+        
+        # Всі можливості з позитивним прибутком, навіть якщо не проходять за порогом
+        all_possible_opportunities = []
+        timestamp = datetime.now().isoformat()
+        for s, b, x in zip(*np.nonzero(valid & (profit > 0))):
+            net = net_profit[s, b, x]
+            all_possible_opportunities.append({
+                "symbol": symbols[s],
+                "buy_exchange": exchange_names[b],
+                "sell_exchange": exchange_names[x],
+                "buy_price": float(buy_prices[s, b, x]),
+                "sell_price": float(sell_prices[s, b, x]),
+                "profit_percent": float(profit[s, b, x]),
+                "buy_fee": float(engine.buy_fees[b]),
+                "sell_fee": float(engine.sell_fees[x]),
+                "net_profit_percent": 0.0 if np.isnan(net) else float(net),
+                "timestamp": timestamp
+            })
+        
+        # Можливості, що перевищують мінімальний поріг
+        opportunities = []
+        passed = valid & (spreads['compare'] >= self.min_profit)
+        for s, b, x in zip(*np.nonzero(passed)):
+            net = net_profit[s, b, x]
+            opportunity = ArbitrageOpportunity(
+                symbol=symbols[s],
+                buy_exchange=exchange_names[b],
+                sell_exchange=exchange_names[x],
+                buy_price=float(buy_prices[s, b, x]),
+                sell_price=float(sell_prices[s, b, x]),
+                profit_percent=float(profit[s, b, x]),
+                buy_fee=float(engine.buy_fees[b]),
+                sell_fee=float(engine.sell_fees[x]),
+                net_profit_percent=None if np.isnan(net) else float(net),
+                buy_fee_type=self.buy_fee_type if self.include_fees else "",
+                sell_fee_type=self.sell_fee_type if self.include_fees else ""
+            )
+            opportunities.append(opportunity)
             
-            try:
-                # Створюємо директорію, якщо вона не існує
-                os.makedirs("data", exist_ok=True)
-                
-                # Зберігаємо з ім'ям файлу на основі поточної дати та часу
-                filename = f"data/opportunities_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                with open(filename, "w") as f:
-                    json.dump(opportunities_data, f, indent=2)
-                    
-                logger.info(f"Збережено {len(all_possible_opportunities)} потенційних можливостей у файл {filename}")
-            except Exception as e:
-                logger.error(f"Помилка при збереженні можливостей у JSON: {e}")
+            logger.info(
+                f"ЗНАЙДЕНО АРБІТРАЖНУ МОЖЛИВІСТЬ: {opportunity.symbol} "
+                f"купити на {opportunity.buy_exchange} за {opportunity.buy_price:.8f} (комісія {opportunity.buy_fee}%), "
+                f"продати на {opportunity.sell_exchange} за {opportunity.sell_price:.8f} (комісія {opportunity.sell_fee}%). "
+                f"Прибуток: {opportunity.profit_percent:.2f}%, "
+                f"Чистий прибуток: {0.0 if np.isnan(net) else net:.4f}%"
+            )
         
-        logger.info(f"Всього знайдено {len(opportunities)} арбітражних можливостей")
-        return opportunities
+        # Випадки, коли є потенційний прибуток, але комісії його "з'їдають"
+        rejected = valid & ~passed & (profit >= self.min_profit)
+        for s, b, x in zip(*np.nonzero(rejected)):
+            logger.info(
+                f"ВІДХИЛЕНО ЧЕРЕЗ КОМІСІЇ: {symbols[s]} "
+                f"купити на {exchange_names[b]} за {buy_prices[s, b, x]:.8f} (комісія {engine.buy_fees[b]}%), "
+                f"продати на {exchange_names[x]} за {sell_prices[s, b, x]:.8f} (комісія {engine.sell_fees[x]}%). "
+                f"Прибуток: {profit[s, b, x]:.2f}%, "
+                f"Чистий прибуток: {net_profit[s, b, x]:.4f}% < {self.min_profit}%"
+            )
+        
+        return opportunities, all_possible_opportunities
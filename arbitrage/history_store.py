@@ -0,0 +1,210 @@
+# arbitrage/history_store.py
+import logging
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger('arbitrage')
+
+# Запис фіксованої ширини (56 байт): час циклу, ідентифікатори назв та ціни
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),  # Unix-час циклу пошуку
+    ('symbol', '<u4'),  # Ідентифікатор пари у словнику назв сегмента
+    ('buy_exchange', '<u2'),  # Ідентифікатор біржі купівлі
+    ('sell_exchange', '<u2'),  # Ідентифікатор біржі продажу
+    ('buy_price', '<f8'),
+    ('sell_price', '<f8'),
+    ('profit_percent', '<f8'),
+    ('net_profit_percent', '<f8'),
+    ('buy_fee', '<f4'),
+    ('sell_fee', '<f4'),
+])
+
+class OpportunityHistoryStore:
+    """
+    Історія потенційних можливостей у щоденних бінарних сегментах
+
+    Кожен день - це два файли, до яких лише дописуються дані:
+    - opportunities_YYYYMMDD.bin - записи RECORD_DTYPE, впорядковані за часом;
+    - opportunities_YYYYMMDD.names - словник назв пар і бірж (рядок N має ідентифікатор N).
+
+    Оскільки записи впорядковані за часом, діапазон часу знаходиться бінарним
+    пошуком, а фільтр за парою - порівнянням ідентифікаторів у відображеному в пам'ять масиві.
+    """
+    def __init__(self, base_dir: str = "data/history"):
+        self.base_dir = base_dir
+        self._day: Optional[date] = None
+        self._records_file = None
+        self._names_file = None
+        self._name_ids: Dict[str, int] = {}
+
+    def segment_paths(self, day: date) -> Tuple[str, str]:
+        """
+        Повертає шляхи до файлу записів і словника назв для вказаного дня
+        """
+        prefix = os.path.join(self.base_dir, f"opportunities_{day.strftime('%Y%m%d')}")
+        return f"{prefix}.bin", f"{prefix}.names"
+
+    def append(self, opportunities: List[Dict], timestamp: Optional[datetime] = None) -> int:
+        """
+        Дописує можливості одного циклу пошуку
+
+        Args:
+            opportunities (List[Dict]): Можливості у форматі all_possible_opportunities
+            timestamp (Optional[datetime]): Час циклу (за замовчуванням - поточний)
+
+        Returns:
+            int: Кількість записаних можливостей
+        """
+        if not opportunities:
+            return 0
+
+        timestamp = timestamp or datetime.now()
+        self._open_segment(timestamp.date())
+
+        records = np.zeros(len(opportunities), dtype=RECORD_DTYPE)
+        records['timestamp'] = timestamp.timestamp()
+        for i, opp in enumerate(opportunities):
+            records[i]['symbol'] = self._name_id(opp['symbol'])
+            records[i]['buy_exchange'] = self._name_id(opp['buy_exchange'])
+            records[i]['sell_exchange'] = self._name_id(opp['sell_exchange'])
+        for field in ('buy_price', 'sell_price', 'profit_percent', 'net_profit_percent', 'buy_fee', 'sell_fee'):
+            records[field] = [opp.get(field) or 0.0 for opp in opportunities]
+
+        # Нові назви записуються раніше за записи, які на них посилаються
+        self._names_file.flush()
+        self._records_file.write(records.tobytes())
+        self._records_file.flush()
+        return len(records)
+
+    def close(self):
+        """
+        Закриває відкритий сегмент
+        """
+        for f in (self._records_file, self._names_file):
+            if f:
+                f.close()
+        self._records_file = None
+        self._names_file = None
+        self._day = None
+        self._name_ids = {}
+
+    def _open_segment(self, day: date):
+        """
+        Відкриває сегмент дня для дописування (переходить на новий сегмент опівночі)
+        """
+        if self._day == day:
+            return
+
+        self.close()
+        os.makedirs(self.base_dir, exist_ok=True)
+        records_path, names_path = self.segment_paths(day)
+
+        names = self._read_names(names_path)
+        self._name_ids = {name: i for i, name in enumerate(names)}
+        self._names_file = open(names_path, "a", encoding="utf-8")
+
+        # Обрізаємо неповний запис, що міг залишитись після аварійної зупинки
+        if os.path.exists(records_path):
+            size = os.path.getsize(records_path)
+            if size % RECORD_DTYPE.itemsize:
+                logger.warning(f"Сегмент {records_path} містить неповний запис, обрізаємо його")
+                with open(records_path, "r+b") as f:
+                    f.truncate(size - size % RECORD_DTYPE.itemsize)
+
+        self._records_file = open(records_path, "ab")
+        self._day = day
+
+    def _name_id(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = len(self._name_ids)
+            self._name_ids[name] = name_id
+            self._names_file.write(name + "\n")
+        return name_id
+
+    @staticmethod
+    def _read_names(names_path: str) -> List[str]:
+        if not os.path.exists(names_path):
+            return []
+        with open(names_path, "r", encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    def read_day(self, day: date, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Tuple[np.ndarray, List[str]]:
+        """
+        Відображає сегмент дня в пам'ять і повертає записи в межах часу
+
+        Args:
+            day (date): День сегмента
+            start (Optional[datetime]): Початок діапазону (включно)
+            end (Optional[datetime]): Кінець діапазону (не включно)
+
+        Returns:
+            Tuple[np.ndarray, List[str]]: Записи RECORD_DTYPE та словник назв сегмента
+        """
+        records_path, names_path = self.segment_paths(day)
+        if not os.path.exists(records_path):
+            return np.zeros(0, dtype=RECORD_DTYPE), []
+
+        count = os.path.getsize(records_path) // RECORD_DTYPE.itemsize
+        if count == 0:
+            return np.zeros(0, dtype=RECORD_DTYPE), []
+
+        records = np.memmap(records_path, dtype=RECORD_DTYPE, mode='r', shape=(count,))
+        timestamps = records['timestamp']
+        first = int(np.searchsorted(timestamps, start.timestamp(), side='left')) if start else 0
+        last = int(np.searchsorted(timestamps, end.timestamp(), side='left')) if end else count
+
+        return records[first:last], self._read_names(names_path)
+
+    def read_range(self, start: datetime, end: datetime,
+                   symbol: Optional[str] = None) -> Tuple[np.ndarray, List[str]]:
+        """
+        Повертає записи за діапазон часу, що може охоплювати кілька днів
+
+        Ідентифікатори назв у записах різних днів перекодовуються у спільний словник.
+
+        Args:
+            start (datetime): Початок діапазону (включно)
+            end (datetime): Кінець діапазону (не включно)
+            symbol (Optional[str]): Фільтр за парою (підрядок без урахування регістру)
+
+        Returns:
+            Tuple[np.ndarray, List[str]]: Записи RECORD_DTYPE та спільний словник назв
+        """
+        parts = []
+        names: List[str] = []
+        name_ids: Dict[str, int] = {}
+
+        day = start.date()
+        while day <= end.date():
+            records, day_names = self.read_day(day, start, end)
+            day += timedelta(days=1)
+            if len(records) == 0:
+                continue
+
+            if symbol:
+                matching = [i for i, name in enumerate(day_names) if symbol.upper() in name.upper()]
+                records = records[np.isin(records['symbol'], matching)]
+                if len(records) == 0:
+                    continue
+
+            # Перекодовуємо ідентифікатори дня у спільний словник
+            mapping = np.empty(len(day_names), dtype=np.uint32)
+            for i, name in enumerate(day_names):
+                if name not in name_ids:
+                    name_ids[name] = len(names)
+                    names.append(name)
+                mapping[i] = name_ids[name]
+
+            records = np.array(records)
+            for field in ('symbol', 'buy_exchange', 'sell_exchange'):
+                records[field] = mapping[records[field]]
+            parts.append(records)
+
+        if not parts:
+            return np.zeros(0, dtype=RECORD_DTYPE), names
+        return np.concatenate(parts), names
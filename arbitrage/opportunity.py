@@ -3,6 +3,66 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Dict, Optional, List
 
+# Емодзі криптовалют
+COIN_EMOJIS = {
+    "BTC": "₿",
+    "ETH": "Ξ",
+    "XRP": "✖",
+    "BNB": "🔶",
+    "SOL": "☀️",
+    "TRX": "♦️",
+    "HBAR": "♓",
+    "NEAR": "🔺",
+    "ATOM": "⚛️",
+    "ADA": "🔷",
+    "AVAX": "🔺",
+    "USDT": "💵",
+    "USDC": "💲"
+}
+DEFAULT_COIN_EMOJI = "🪙"
+
+# Емодзі за розміром прибутку: (мінімальний прибуток %, емодзі), від найбільшого
+PROFIT_EMOJIS = (
+    (5.0, "🔥"),  # Дуже високий прибуток
+    (2.0, "💰"),  # Високий прибуток
+    (1.0, "📈"),  # Середній прибуток
+)
+DEFAULT_PROFIT_EMOJI = "🔍"  # Низький прибуток
+
+# Шаблони повідомлень для Telegram
+CROSS_TEMPLATE = (
+    "<b>{emoji} {coin_emoji} Крос-біржова можливість ({profit_percent:.2f}%)</b>\n\n"
+    "<b>Пара:</b> {symbol}\n"
+    "<b>Купити на:</b> {buy_exchange} за {buy_price:.8f}\n"
+    "<b>Продати на:</b> {sell_exchange} за {sell_price:.8f}\n"
+).format
+TRIANGULAR_TEMPLATE = (
+    "<b>{emoji} {coin_emoji} Трикутна можливість ({profit_percent:.2f}%)</b>\n\n"
+    "<b>Біржа:</b> {buy_exchange}\n"
+    "<b>Шлях:</b> {path}\n"
+    "<b>Початкова ціна:</b> {buy_price:.8f}\n"
+    "<b>Кінцева ціна:</b> {sell_price:.8f}\n"
+).format
+TRIANGULAR_NO_PATH_TEMPLATE = (
+    "<b>{emoji} {coin_emoji} Трикутна можливість ({profit_percent:.2f}%)</b>\n\n"
+    "<b>Біржа:</b> {buy_exchange}\n"
+    "<b>Початкова ціна:</b> {buy_price:.8f}\n"
+    "<b>Кінцева ціна:</b> {sell_price:.8f}\n"
+).format
+FEES_TEMPLATE = (
+    "<b>Комісія купівлі ({buy_fee_type}):</b> {buy_fee:.2f}%\n"
+    "<b>Комісія продажу ({sell_fee_type}):</b> {sell_fee:.2f}%\n"
+    "<b>Прибуток (брутто):</b> {profit_percent:.2f}%\n"
+    "<b>Прибуток (нетто):</b> {net_profit_percent:.2f}%\n"
+).format
+PROFIT_TEMPLATE = "<b>Прибуток:</b> {profit_percent:.2f}%\n".format
+SIZED_TEMPLATE = (
+    "<b>Макс. обсяг:</b> {max_size:.8f} (купівля ~{avg_buy_price:.8f}, продаж ~{avg_sell_price:.8f})\n"
+    "<b>Прибуток на обсязі:</b> {sized_net_profit:.2f} {quote_currency} ({sized_net_profit_percent:.2f}%)\n"
+).format
+TIME_TEMPLATE = "<b>Час:</b> {timestamp:%Y-%m-%d %H:%M:%S}".format
+DIGEST_LINE_TEMPLATE = "• {title} - <b>{profit:.2f}%</b> ({timestamp:%H:%M:%S})".format
+
 @dataclass
 class ArbitrageOpportunity:
     """
@@ -23,6 +83,11 @@ class ArbitrageOpportunity:
     opportunity_type: str = "cross"  # Тип можливості: "cross" (крос-біржовий) або "triangular" (трикутний)
     path: Optional[List[str]] = None  # Шлях для трикутного арбітражу
     estimated_fees: float = 0.0  # Оцінка загальних комісій
+    max_size: Optional[float] = None  # Максимальний прибутковий обсяг за глибиною ордербуків (у базовій валюті)
+    avg_buy_price: Optional[float] = None  # Середня ціна купівлі на цьому обсязі
+    avg_sell_price: Optional[float] = None  # Середня ціна продажу на цьому обсязі
+    sized_net_profit: Optional[float] = None  # Чистий прибуток на цьому обсязі (у котирувальній валюті)
+    sized_net_profit_percent: Optional[float] = None  # Чистий прибуток на цьому обсязі (%)
     
     def __post_init__(self):
         """
@@ -63,6 +128,15 @@ class ArbitrageOpportunity:
                 'net_profit_percent': self.net_profit_percent
             })
             
+        if self.max_size is not None:
+            result.update({
+                'max_size': self.max_size,
+                'avg_buy_price': self.avg_buy_price,
+                'avg_sell_price': self.avg_sell_price,
+                'sized_net_profit': self.sized_net_profit,
+                'sized_net_profit_percent': self.sized_net_profit_percent
+            })
+            
         return result
     
     def to_message(self) -> str:
@@ -75,82 +149,65 @@ class ArbitrageOpportunity:
         else:
             profit_value = self.profit_percent
             
-        if profit_value >= 5.0:
-            emoji = "🔥"  # Дуже високий прибуток
-        elif profit_value >= 2.0:
-            emoji = "💰"  # Високий прибуток
-        elif profit_value >= 1.0:
-            emoji = "📈"  # Середній прибуток
-        else:
-            emoji = "🔍"  # Низький прибуток
-            
+        emoji = next((emoji for threshold, emoji in PROFIT_EMOJIS if profit_value >= threshold), DEFAULT_PROFIT_EMOJI)
+        
         # Додаємо емодзі криптовалюти, якщо вони доступні
         if self.opportunity_type == "cross":
-            coin_symbol = self.symbol.split('/')[0]
-            coin_emoji = self._get_coin_emoji(coin_symbol)
-            
-            message = (
-                f"<b>{emoji} {coin_emoji} Крос-біржова можливість ({self.profit_percent:.2f}%)</b>\n\n"
-                f"<b>Пара:</b> {self.symbol}\n"
-                f"<b>Купити на:</b> {self.buy_exchange} за {self.buy_price:.8f}\n"
-                f"<b>Продати на:</b> {self.sell_exchange} за {self.sell_price:.8f}\n"
-            )
-        else:  # triangular
+            parts = [CROSS_TEMPLATE(
+                emoji=emoji, coin_emoji=self._get_coin_emoji(self.symbol.split('/')[0]),
+                profit_percent=self.profit_percent, symbol=self.symbol,
+                buy_exchange=self.buy_exchange, buy_price=self.buy_price,
+                sell_exchange=self.sell_exchange, sell_price=self.sell_price
+            )]
+        elif self.path:
             # Для трикутного арбітражу використовуємо емодзі першої валюти в шляху
-            if self.path and len(self.path) > 0:
-                coin_symbol = self.path[0]
-                coin_emoji = self._get_coin_emoji(coin_symbol)
-                path_str = " → ".join(self.path)
-                
-                message = (
-                    f"<b>{emoji} {coin_emoji} Трикутна можливість ({self.profit_percent:.2f}%)</b>\n\n"
-                    f"<b>Біржа:</b> {self.buy_exchange}\n"
-                    f"<b>Шлях:</b> {path_str}\n"
-                    f"<b>Початкова ціна:</b> {self.buy_price:.8f}\n"
-                    f"<b>Кінцева ціна:</b> {self.sell_price:.8f}\n"
-                )
-            else:
-                coin_emoji = "🪙"
-                message = (
-                    f"<b>{emoji} {coin_emoji} Трикутна можливість ({self.profit_percent:.2f}%)</b>\n\n"
-                    f"<b>Біржа:</b> {self.buy_exchange}\n"
-                    f"<b>Початкова ціна:</b> {self.buy_price:.8f}\n"
-                    f"<b>Кінцева ціна:</b> {self.sell_price:.8f}\n"
-                )
+            parts = [TRIANGULAR_TEMPLATE(
+                emoji=emoji, coin_emoji=self._get_coin_emoji(self.path[0]),
+                profit_percent=self.profit_percent, buy_exchange=self.buy_exchange,
+                path=" → ".join(self.path), buy_price=self.buy_price, sell_price=self.sell_price
+            )]
+        else:
+            parts = [TRIANGULAR_NO_PATH_TEMPLATE(
+                emoji=emoji, coin_emoji=DEFAULT_COIN_EMOJI, profit_percent=self.profit_percent,
+                buy_exchange=self.buy_exchange, buy_price=self.buy_price, sell_price=self.sell_price
+            )]
         
         # Додаємо інформацію про комісії та чистий прибуток, якщо вони доступні
         if self.buy_fee > 0 or self.sell_fee > 0:
-            message += (
-                f"<b>Комісія купівлі ({self.buy_fee_type}):</b> {self.buy_fee:.2f}%\n"
-                f"<b>Комісія продажу ({self.sell_fee_type}):</b> {self.sell_fee:.2f}%\n"
-                f"<b>Прибуток (брутто):</b> {self.profit_percent:.2f}%\n"
-                f"<b>Прибуток (нетто):</b> {self.net_profit_percent:.2f}%\n"
-            )
+            parts.append(FEES_TEMPLATE(
+                buy_fee_type=self.buy_fee_type, buy_fee=self.buy_fee,
+                sell_fee_type=self.sell_fee_type, sell_fee=self.sell_fee,
+                profit_percent=self.profit_percent, net_profit_percent=self.net_profit_percent
+            ))
         else:
-            message += f"<b>Прибуток:</b> {self.profit_percent:.2f}%\n"
+            parts.append(PROFIT_TEMPLATE(profit_percent=self.profit_percent))
+            
+        # Додаємо оцінку за глибиною ордербуків, якщо вона є
+        if self.max_size is not None:
+            parts.append(SIZED_TEMPLATE(
+                max_size=self.max_size, avg_buy_price=self.avg_buy_price, avg_sell_price=self.avg_sell_price,
+                sized_net_profit=self.sized_net_profit, quote_currency=self.symbol.split('/')[-1],
+                sized_net_profit_percent=self.sized_net_profit_percent
+            ))
             
-        message += f"<b>Час:</b> {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
+        parts.append(TIME_TEMPLATE(timestamp=self.timestamp))
+        return "".join(parts)
+        
+    def to_digest_line(self) -> str:
+        """
+        Форматує можливість одним рядком для дайджесту
+        """
+        profit_value = self.net_profit_percent if self.net_profit_percent is not None else self.profit_percent
         
-        return message
+        if self.opportunity_type == "cross":
+            title = f"{self.symbol}: {self.buy_exchange} → {self.sell_exchange}"
+        else:
+            title = f"{' → '.join(self.path) if self.path else self.symbol} ({self.buy_exchange})"
+            
+        return DIGEST_LINE_TEMPLATE(title=title, profit=profit_value, timestamp=self.timestamp)
         
     def _get_coin_emoji(self, coin_symbol: str) -> str:
         """
         Повертає емодзі для криптовалюти
         """
-        coin_emojis = {
-            "BTC": "₿",
-            "ETH": "Ξ",
-            "XRP": "✖",
-            "BNB": "🔶",
-            "SOL": "☀️",
-            "TRX": "♦️",
-            "HBAR": "♓",
-            "NEAR": "🔺",
-            "ATOM": "⚛️",
-            "ADA": "🔷",
-            "AVAX": "🔺",
-            "USDT": "💵",
-            "USDC": "💲"
-        }
-        
-        return coin_emojis.get(coin_symbol, "🪙")  # Якщо емодзі не знайдено, повертаємо загальний емодзі монети
+        return COIN_EMOJIS.get(coin_symbol, DEFAULT_COIN_EMOJI)  # Якщо емодзі не знайдено, повертаємо загальний емодзі монети
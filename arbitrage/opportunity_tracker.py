@@ -0,0 +1,181 @@
+# arbitrage/opportunity_tracker.py
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from arbitrage.opportunity import ArbitrageOpportunity
+import config
+
+logger = logging.getLogger('arbitrage')
+
+# Ключ можливості: (тип, пара/шлях, біржа купівлі, біржа продажу)
+OpportunityKey = Tuple[str, str, str, str]
+
+EVENT_OPEN = "open"
+EVENT_UPDATE = "update"
+EVENT_CLOSE = "close"
+
+@dataclass
+class OpportunityState:
+    """
+    Стан можливості, що спостерігається протягом кількох циклів
+    """
+    key: OpportunityKey
+    opportunity: ArbitrageOpportunity  # Остання версія можливості
+    first_seen: datetime
+    last_seen: datetime
+    peak_profit: float  # Максимальний прибуток за час існування (%)
+    emitted_profit: float  # Прибуток в останньому надісланому сповіщенні (%)
+    last_cycle: int  # Номер циклу, в якому можливість бачили востаннє
+    cycles_seen: int = 1
+    recipients: Set[int] = field(default_factory=set)  # Користувачі, яким надсилались сповіщення про можливість
+
+    @property
+    def lifetime(self) -> float:
+        """
+        Тривалість існування можливості в секундах
+        """
+        return (self.last_seen - self.first_seen).total_seconds()
+
+    def to_closed_message(self) -> str:
+        """
+        Форматує повідомлення про закриття можливості для Telegram
+        """
+        opp = self.opportunity
+        if opp.opportunity_type == "cross":
+            title = f"{opp.symbol}: {opp.buy_exchange} → {opp.sell_exchange}"
+        else:
+            title = f"{' → '.join(opp.path) if opp.path else opp.symbol} ({opp.buy_exchange})"
+
+        return (
+            f"<b>⏹ Можливість закрита</b>\n\n"
+            f"<b>{title}</b>\n"
+            f"<b>Тривалість:</b> {self.lifetime:.0f} с ({self.cycles_seen} циклів)\n"
+            f"<b>Піковий прибуток:</b> {self.peak_profit:.2f}%\n"
+            f"<b>Час:</b> {self.last_seen.strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+
+def opportunity_key(opp: ArbitrageOpportunity) -> OpportunityKey:
+    return (opp.opportunity_type, opp.symbol, opp.buy_exchange, opp.sell_exchange)
+
+def opportunity_profit(opp: ArbitrageOpportunity) -> float:
+    return opp.net_profit_percent if opp.net_profit_percent is not None else opp.profit_percent
+
+class OpportunityTracker:
+    """
+    Відстеження можливостей між циклами пошуку з гістерезисом
+
+    Сповіщення генерується лише при появі можливості, при зміні прибутку
+    щонайменше на change_delta відсоткових пунктів та при закритті (можливість
+    не з'являлась close_after циклів поспіль).
+
+    Стани зберігаються в OrderedDict у порядку останнього оновлення, тож
+    оновлення коштує O(1), а закриті можливості завжди на початку словника.
+    Розмір обмежено max_size: найдавніше оновлені стани витісняються.
+    """
+    def __init__(self, change_delta: float = config.TRACKER_CHANGE_DELTA,
+                 close_after: int = config.TRACKER_CLOSE_AFTER,
+                 max_size: int = config.TRACKER_MAX_SIZE):
+        self.change_delta = change_delta
+        self.close_after = max(1, close_after)
+        self.max_size = max_size
+        self.states: "OrderedDict[OpportunityKey, OpportunityState]" = OrderedDict()
+        self.cycle = 0
+
+        # Статистика тривалості закритих можливостей
+        self.opened_count = 0
+        self.closed_count = 0
+        self.evicted_count = 0
+        self.total_lifetime = 0.0
+        self.max_lifetime = 0.0
+        self.total_peak_profit = 0.0
+
+    def update(self, opportunities: List[ArbitrageOpportunity],
+               now: Optional[datetime] = None) -> List[Tuple[str, OpportunityState]]:
+        """
+        Обробляє можливості одного циклу пошуку
+
+        Args:
+            opportunities (List[ArbitrageOpportunity]): Можливості, знайдені в цьому циклі
+            now (Optional[datetime]): Час циклу (за замовчуванням - поточний)
+
+        Returns:
+            List[Tuple[str, OpportunityState]]: Події (EVENT_OPEN, EVENT_UPDATE або EVENT_CLOSE) зі станом можливості
+        """
+        now = now or datetime.now()
+        self.cycle += 1
+        events = []
+
+        for opp in opportunities:
+            key = opportunity_key(opp)
+            profit = opportunity_profit(opp)
+            state = self.states.get(key)
+
+            if state is None:
+                state = OpportunityState(
+                    key=key, opportunity=opp, first_seen=now, last_seen=now,
+                    peak_profit=profit, emitted_profit=profit, last_cycle=self.cycle
+                )
+                self.states[key] = state
+                self.opened_count += 1
+                events.append((EVENT_OPEN, state))
+                continue
+
+            if state.last_cycle == self.cycle:
+                # Дублікат у межах одного циклу - залишаємо вигіднішу версію
+                if profit > opportunity_profit(state.opportunity):
+                    state.opportunity = opp
+                continue
+
+            state.opportunity = opp
+            state.last_seen = now
+            state.last_cycle = self.cycle
+            state.cycles_seen += 1
+            state.peak_profit = max(state.peak_profit, profit)
+            self.states.move_to_end(key)
+
+            if abs(profit - state.emitted_profit) >= self.change_delta:
+                state.emitted_profit = profit
+                events.append((EVENT_UPDATE, state))
+
+        # Стани, не оновлені в останніх close_after циклах, знаходяться на початку словника
+        while self.states:
+            key, state = next(iter(self.states.items()))
+            if self.cycle - state.last_cycle < self.close_after:
+                break
+            self.states.popitem(last=False)
+            self._record_closed(state)
+            events.append((EVENT_CLOSE, state))
+
+        while len(self.states) > self.max_size:
+            _, state = self.states.popitem(last=False)
+            self.evicted_count += 1
+            logger.debug(f"Стан можливості {state.key} витіснено з трекера")
+
+        if events:
+            counts = {event: sum(1 for e, _ in events if e == event) for event in (EVENT_OPEN, EVENT_UPDATE, EVENT_CLOSE)}
+            logger.info(f"Трекер можливостей: нових {counts[EVENT_OPEN]}, змінених {counts[EVENT_UPDATE]}, "
+                        f"закритих {counts[EVENT_CLOSE]}, відстежується {len(self.states)}")
+        return events
+
+    def _record_closed(self, state: OpportunityState):
+        self.closed_count += 1
+        self.total_lifetime += state.lifetime
+        self.max_lifetime = max(self.max_lifetime, state.lifetime)
+        self.total_peak_profit += state.peak_profit
+
+    def get_stats(self) -> Dict:
+        """
+        Повертає статистику тривалості можливостей
+        """
+        return {
+            "tracked": len(self.states),
+            "opened": self.opened_count,
+            "closed": self.closed_count,
+            "evicted": self.evicted_count,
+            "avg_lifetime_seconds": self.total_lifetime / self.closed_count if self.closed_count else 0.0,
+            "max_lifetime_seconds": self.max_lifetime,
+            "avg_peak_profit_percent": self.total_peak_profit / self.closed_count if self.closed_count else 0.0
+        }
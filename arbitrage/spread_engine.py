@@ -0,0 +1,100 @@
+# arbitrage/spread_engine.py
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import config
+
+logger = logging.getLogger('arbitrage')
+
+class SpreadEngine:
+    """
+    Векторизований розрахунок крос-біржових спредів
+
+    Ціни пакуються в щільні масиви (пари × біржі), а брутто- та нетто-спред
+    для всіх комбінацій біржа купівлі × біржа продажу рахуються одним проходом NumPy.
+    """
+    def __init__(self, exchange_names: List[str], include_fees: bool,
+                 buy_fee_type: str, sell_fee_type: str):
+        self.exchange_names = list(exchange_names)
+        self.include_fees = include_fees
+
+        buy_fees = np.zeros(len(self.exchange_names))
+        sell_fees = np.zeros(len(self.exchange_names))
+        if include_fees:
+            for i, name in enumerate(self.exchange_names):
+                fees = config.EXCHANGE_FEES.get(name.lower(), {})
+                buy_fees[i] = fees.get(buy_fee_type, 0.0)
+                sell_fees[i] = fees.get(sell_fee_type, 0.0)
+
+        # Комісії для кожної комбінації (біржа купівлі, біржа продажу)
+        self.buy_fees = buy_fees
+        self.sell_fees = sell_fees
+        self.buy_multiplier = 1 + buy_fees / 100
+        self.sell_multiplier = 1 - sell_fees / 100
+        self.fee_matrix = (buy_fees[:, None] > 0) | (sell_fees[None, :] > 0)
+        if not include_fees:
+            self.fee_matrix[:] = False
+
+    def pack_prices(self, symbols: List[str],
+                    all_tickers: Dict[str, Dict[str, Dict]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Пакує тікери у масиви bid та ask розміром (пари × біржі)
+
+        Відсутні або неповні ціни позначаються як NaN.
+        """
+        bids = np.full((len(symbols), len(self.exchange_names)), np.nan)
+        asks = np.full((len(symbols), len(self.exchange_names)), np.nan)
+
+        for j, name in enumerate(self.exchange_names):
+            tickers = all_tickers.get(name, {})
+            for i, symbol in enumerate(symbols):
+                ticker = tickers.get(symbol)
+                if not ticker:
+                    continue
+                bid = ticker.get('bid')
+                ask = ticker.get('ask')
+                if bid is not None and ask is not None:
+                    bids[i, j] = bid
+                    asks[i, j] = ask
+
+        return bids, asks
+
+    def compute(self, bids: np.ndarray, asks: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Розраховує спреди для всіх пар та комбінацій бірж
+
+        Args:
+            bids (np.ndarray): Ціни bid (пари × біржі)
+            asks (np.ndarray): Ціни ask (пари × біржі)
+
+        Returns:
+            Dict[str, np.ndarray]: Масиви розміром (пари × біржа купівлі × біржа продажу):
+                'buy_price', 'sell_price', 'profit', 'net_profit' (NaN без комісій),
+                'compare' (прибуток для порівняння з порогом) та 'valid'
+        """
+        buy_price = asks[:, :, None]
+        sell_price = bids[:, None, :]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            profit = (sell_price - buy_price) / buy_price * 100
+
+            buy_with_fee = buy_price * self.buy_multiplier[None, :, None]
+            sell_with_fee = sell_price * self.sell_multiplier[None, None, :]
+            net_profit = (sell_with_fee - buy_with_fee) / buy_with_fee * 100
+
+        net_profit = np.where(self.fee_matrix[None, :, :], net_profit, np.nan)
+        compare = np.where(self.fee_matrix[None, :, :], net_profit, profit)
+
+        # Біржу не порівнюємо саму з собою; ціни мають бути відомі і додатні
+        valid = (buy_price > 0) & np.isfinite(sell_price) & ~np.eye(len(self.exchange_names), dtype=bool)[None, :, :]
+
+        return {
+            'buy_price': np.broadcast_to(buy_price, profit.shape),
+            'sell_price': np.broadcast_to(sell_price, profit.shape),
+            'profit': profit,
+            'net_profit': net_profit,
+            'compare': compare,
+            'valid': valid
+        }
@@ -7,36 +7,46 @@ import time
 from exchange_api.base_exchange import BaseExchange
 from arbitrage.opportunity import ArbitrageOpportunity
 from arbitrage.fee_calculator import FeeCalculator
+from arbitrage.currency_graph import CurrencyGraph
 import config
+import metrics
 
 logger = logging.getLogger('triangular')  # Змінюємо логер на 'triangular'
 
+TICKERS_LATENCY = metrics.histogram("exchange_get_tickers_seconds", "Час отримання тікерів біржі", ("exchange",))
+
 class TriangularArbitrageFinder:
     """
     Клас для пошуку трикутних арбітражних можливостей на одній біржі
     """
     def __init__(self, exchange: BaseExchange, 
                  base_currency: str = "USDT", 
-                 min_profit: float = config.TRIANGULAR_MIN_PROFIT_THRESHOLD):  # Використовуємо новий параметр
+                 min_profit: float = config.TRIANGULAR_MIN_PROFIT_THRESHOLD,  # Використовуємо новий параметр
+                 engine: str = config.TRIANGULAR_ENGINE,
+                 exchange_key: Optional[str] = None):
         self.exchange = exchange
         self.exchange_name = exchange.name
+        # Ключ біржі в конфігурації ('binance'), за яким шукаються комісії в EXCHANGE_FEES
+        self.exchange_key = (exchange_key or exchange.name).lower()
         self.base_currency = base_currency
         self.min_profit = min_profit
         self.fee_calculator = FeeCalculator()
         self.paths = config.TRIANGULAR_PATHS
         self.market_cache = {}  # Кеш для збереження підтримуваних форматів пар
+        self.engine = engine.lower()  # 'paths' - шляхи з конфігурації, 'graph' - всі цикли графа валют
+        self.graph: Optional[CurrencyGraph] = None
 
     async def initialize_market_cache(self):
         """
         Ініціалізує кеш підтримуваних ринків для біржі
         """
         try:
-            # Отримуємо всі доступні ринки на біржі
-            markets = await self.exchange.exchange.fetch_markets()
+            # Отримуємо всі доступні ринки на біржі. load_markets() кешує їх у
+            # спільному клієнті ccxt, тож повторні виклики не роблять запитів
+            markets = await self.exchange.exchange.load_markets()
             
             # Заповнюємо кеш
-            for market in markets:
-                symbol = market['symbol']
+            for symbol in markets:
                 self.market_cache[symbol] = True
                 
             logger.info(f"Ініціалізовано кеш ринків для {self.exchange_name}: {len(self.market_cache)} ринків")
@@ -47,6 +57,10 @@ class TriangularArbitrageFinder:
         """
         Пошук трикутних арбітражних можливостей
         
+        Спершу визначаються пари для всіх шляхів, потім тікери всіх унікальних
+        пар отримуються одним запитом get_tickers(), і кожен шлях оцінюється
+        з цього знімка цін.
+        
         Returns:
             List[ArbitrageOpportunity]: Список знайдених можливостей
         """
@@ -56,7 +70,11 @@ class TriangularArbitrageFinder:
         if not self.market_cache:
             await self.initialize_market_cache()
         
-        # Для кожного шляху в конфігурації
+        if self.engine == "graph":
+            return await self._find_graph_opportunities()
+        
+        # Визначаємо пари для кожного шляху в конфігурації
+        path_pairs = []
         for path in self.paths:
             try:
                 # Перевіряємо чи шлях починається і закінчується тією ж валютою
@@ -64,51 +82,143 @@ class TriangularArbitrageFinder:
                     logger.warning(f"Шлях {path} не є циклічним. Пропускаємо.")
                     continue
                 
-                # Перевіряємо можливість для шляху
-                opportunity = await self._check_path(path)
-                if opportunity:
-                    opportunities.append(opportunity)
+                pairs = await self._resolve_path_pairs(path)
+                if pairs:
+                    path_pairs.append((path, pairs))
                     
             except Exception as e:
                 logger.error(f"Помилка при перевірці шляху {path}: {e}")
         
+        if not path_pairs:
+            return opportunities
+        
+        # Отримуємо тікери всіх унікальних пар одним запитом
+        symbols = sorted({pair_format for _, pairs in path_pairs for pair_format, _ in pairs})
+        try:
+            tickers = await self._get_tickers(symbols)
+        except Exception as e:
+            logger.error(f"Помилка при отриманні тікерів для трикутного арбітражу на {self.exchange_name}: {e}")
+            return opportunities
+        
+        logger.debug(f"Отримано {len(tickers)} з {len(symbols)} тікерів для {len(path_pairs)} шляхів на {self.exchange_name}")
+        
+        # Оцінюємо кожен шлях з отриманого знімка цін
+        for path, pairs in path_pairs:
+            opportunity = self._check_path(path, pairs, tickers)
+            if opportunity:
+                opportunities.append(opportunity)
+        
+        return opportunities
+    
+    async def _get_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Отримує тікери біржі з вимірюванням часу запиту
+        """
+        start_time = time.perf_counter()
+        try:
+            return await self.exchange.get_tickers(symbols)
+        finally:
+            TICKERS_LATENCY.labels(self.exchange_name).observe(time.perf_counter() - start_time)
+    
+    async def _find_graph_opportunities(self) -> List[ArbitrageOpportunity]:
+        """
+        Пошук усіх прибуткових циклів з 3 та 4 угод через базову валюту на графі всіх ринків біржі
+        
+        Returns:
+            List[ArbitrageOpportunity]: Список знайдених можливостей
+        """
+        opportunities = []
+        
+        if self.graph is None:
+            if not self.market_cache:
+                return opportunities
+            self.graph = CurrencyGraph(self.market_cache.keys(), self.base_currency)
+        
+        # Один знімок цін для всіх ринків графа
+        try:
+            tickers = await self._get_tickers(self.graph.symbols)
+        except Exception as e:
+            logger.error(f"Помилка при отриманні тікерів для графа валют на {self.exchange_name}: {e}")
+            return opportunities
+        
+        start_time = time.perf_counter()
+        fee_percent = self.fee_calculator.get_trading_fee(self.exchange_key, 'taker')
+        cycles = self.graph.find_cycles(
+            tickers, fee_percent, config.MIN_NET_PROFIT_THRESHOLD, config.TRIANGULAR_MAX_LEGS
+        )
+        
+        for cycle in cycles:
+            if cycle['profit_percent'] < self.min_profit:
+                continue
+            
+            path = cycle['path']
+            opportunity = ArbitrageOpportunity(
+                symbol="->".join(path[:-1]),
+                buy_exchange=self.exchange_name,
+                sell_exchange=self.exchange_name,
+                buy_price=cycle['rates'][0],
+                sell_price=cycle['rates'][-1],
+                profit_percent=cycle['profit_percent'],
+                opportunity_type="triangular",
+                estimated_fees=self.fee_calculator.calculate_triangular_fees(self.exchange_key, path, 100),
+                net_profit_percent=cycle['net_profit_percent'],
+                path=path
+            )
+            opportunities.append(opportunity)
+            
+            logger.info(f"Знайдено трикутну арбітражну можливість на {self.exchange_name}: "
+                      f"Шлях: {' -> '.join(path)}, Прибуток: {cycle['net_profit_percent']:.2f}% після комісій")
+        
+        logger.info(f"Граф валют {self.exchange_name}: перевірено {len(tickers)} тікерів за "
+                    f"{(time.perf_counter() - start_time) * 1000:.1f} мс, знайдено {len(opportunities)} циклів")
+        
         return opportunities
+    
+    async def _resolve_path_pairs(self, path: List[str]) -> Optional[List[Tuple[str, str]]]:
+        """
+        Визначає пари та напрямки угод для кожного переходу в шляху
+        
+        Args:
+            path (List[str]): Список валют для арбітражного шляху, наприклад ['USDT', 'BTC', 'ETH', 'USDT']
+            
+        Returns:
+            Optional[List[Tuple[str, str]]]: Список (формат_пари, напрямок) або None, якщо якусь пару не знайдено
+        """
+        pairs = []
+        for i in range(len(path) - 1):
+            from_currency = path[i]
+            to_currency = path[i + 1]
+            
+            # Спробуємо знайти правильний формат пари
+            pair_info = await self._find_valid_pair_format(from_currency, to_currency)
+            
+            if pair_info is None:
+                # Якщо формат пари не знайдено, пропускаємо цей шлях
+                logger.warning(f"Не вдалося отримати тікер для пари {from_currency}/{to_currency} або {to_currency}/{from_currency}. Пропускаємо шлях {path}.")
+                return None
+            
+            pairs.append(pair_info)
+        
+        return pairs
                 
-    async def _check_path(self, path: List[str]) -> Optional[ArbitrageOpportunity]:
+    def _check_path(self, path: List[str], pairs: List[Tuple[str, str]],
+                    tickers: Dict[str, Dict]) -> Optional[ArbitrageOpportunity]:
         """
         Перевіряє конкретний трикутний шлях на наявність арбітражних можливостей
         
         Args:
             path (List[str]): Список валют для арбітражного шляху, наприклад ['USDT', 'BTC', 'ETH', 'USDT']
+            pairs (List[Tuple[str, str]]): Пари та напрямки угод для кожного переходу
+            tickers (Dict[str, Dict]): Знімок тікерів біржі
             
         Returns:
             Optional[ArbitrageOpportunity]: Арбітражна можливість, якщо вона є, або None
         """
         try:
-            # Створюємо пари для кожного переходу в шляху
-            pairs = []
-            for i in range(len(path) - 1):
-                from_currency = path[i]
-                to_currency = path[i + 1]
-                
-                # Спробуємо знайти правильний формат пари
-                pair_info = await self._find_valid_pair_format(from_currency, to_currency)
-                
-                if pair_info is None:
-                    # Якщо формат пари не знайдено, пропускаємо цей шлях
-                    logger.warning(f"Не вдалося отримати тікер для пари {from_currency}/{to_currency} або {to_currency}/{from_currency}. Пропускаємо шлях {path}.")
-                    return None
-                
-                pairs.append(pair_info)
-            
-            # Отримуємо тікери для всіх пар
-            tickers = {}
             for pair_format, _ in pairs:
-                ticker = await self.exchange.get_ticker(pair_format)
-                if not ticker:
+                if not tickers.get(pair_format):
                     logger.warning(f"Не вдалося отримати тікер для пари {pair_format}. Пропускаємо шлях {path}.")
                     return None
-                tickers[pair_format] = ticker
             
             # Розраховуємо прибуток для шляху
             initial_amount = 100  # Припускаємо, що починаємо зі 100 одиниць першої валюти
@@ -119,7 +229,7 @@ class TriangularArbitrageFinder:
             for (pair_format, direction) in pairs:
                 ticker = tickers[pair_format]
                 
-                if 'bid' not in ticker or 'ask' not in ticker:
+                if not ticker.get('bid') or not ticker.get('ask'):
                     logger.warning(f"Тікер для пари {pair_format} не містить необхідних даних. Пропускаємо шлях {path}.")
                     return None
                 
@@ -144,7 +254,7 @@ class TriangularArbitrageFinder:
             if profit_percent >= self.min_profit:
                 # Розраховуємо комісії
                 fees_percent = self.fee_calculator.calculate_triangular_fees(
-                    self.exchange_name, path, initial_amount
+                    self.exchange_key, path, initial_amount
                 )
                 
                 # Розраховуємо чистий прибуток
@@ -154,7 +264,7 @@ class TriangularArbitrageFinder:
                 if net_profit_percent >= config.MIN_NET_PROFIT_THRESHOLD:
                     # Створюємо об'єкт арбітражної можливості
                     opportunity = ArbitrageOpportunity(
-                        symbol=f"{path[0]}->{path[1]}->{path[2]}",
+                        symbol="->".join(path[:-1]),
                         buy_exchange=self.exchange_name,
                         sell_exchange=self.exchange_name,
                         buy_price=rates[0],
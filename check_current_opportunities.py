@@ -1,7 +1,12 @@
 # check_current_opportunities.py
 import os
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from arbitrage.history_store import OpportunityHistoryStore
+import config
 
 def check_current_opportunities():
     """
@@ -69,39 +74,33 @@ def check_current_opportunities():
                 
             # Перевіряємо дані за останню годину
             print("\n== Дані за останню годину ==")
-            current_hour = datetime.now().strftime('%Y%m%d_%H')
-            recent_files = [f for f in os.listdir("data") if f.startswith(f"opportunities_{current_hour}")]
+            store = OpportunityHistoryStore(config.HISTORY_DIR)
+            records, names = store.read_range(now - timedelta(hours=1), now + timedelta(seconds=1))
             
-            if recent_files:
-                print(f"Знайдено {len(recent_files)} файлів з даними за останню годину.")
+            if len(records) > 0:
+                cycle_times = np.unique(records['timestamp'])
+                print(f"Знайдено {len(cycle_times)} циклів пошуку з даними за останню годину.")
                 
-                # Беремо останній файл
-                latest_file = sorted(recent_files)[-1]
-                with open(os.path.join("data", latest_file), "r") as f:
-                    data = json.load(f)
+                # Беремо останній цикл
+                latest = records[records['timestamp'] == cycle_times[-1]]
+                print(f"Останній цикл містить {len(latest)} можливостей.")
+                
+                # Фільтруємо можливості з прибутком > 0.2%
+                profitable = latest[latest['net_profit_percent'] > 0.2]
+                if len(profitable) > 0:
+                    print(f"Знайдено {len(profitable)} можливостей з чистим прибутком > 0.2%:")
                     
-                opportunities = data.get("opportunities", [])
-                if opportunities:
-                    print(f"Останній файл містить {len(opportunities)} можливостей.")
+                    # Сортуємо за прибутком
+                    profitable = profitable[np.argsort(-profitable['net_profit_percent'], kind='stable')]
                     
-                    # Фільтруємо можливості з прибутком > 0.2%
-                    profitable = [o for o in opportunities if o.get("net_profit_percent", 0) > 0.2]
-                    if profitable:
-                        print(f"Знайдено {len(profitable)} можливостей з чистим прибутком > 0.2%:")
-                        
-                        # Сортуємо за прибутком
-                        profitable.sort(key=lambda x: x.get("net_profit_percent", 0), reverse=True)
-                        
-                        # Виводимо топ-5
-                        for i, opp in enumerate(profitable[:5], 1):
-                            print(f"{i}. {opp.get('symbol')}: {opp.get('buy_exchange')} → {opp.get('sell_exchange')}, "
-                                  f"Нетто: {opp.get('net_profit_percent', 0):.4f}%")
-                    else:
-                        print("Не знайдено можливостей з чистим прибутком > 0.2%")
+                    # Виводимо топ-5
+                    for i, opp in enumerate(profitable[:5], 1):
+                        print(f"{i}. {names[opp['symbol']]}: {names[opp['buy_exchange']]} → {names[opp['sell_exchange']]}, "
+                              f"Нетто: {opp['net_profit_percent']:.4f}%")
                 else:
-                    print("Файл не містить можливостей.")
+                    print("Не знайдено можливостей з чистим прибутком > 0.2%")
             else:
-                print("Не знайдено файлів з даними за останню годину.")
+                print("Не знайдено даних за останню годину.")
         else:
             print("Файл status.json не знайдено. Бот може не бути запущеним.")
     
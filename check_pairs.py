@@ -138,8 +138,7 @@ async def check_pairs_availability():
         # Закриваємо з'єднання з біржами
         for name, exchange in exchanges.items():
             try:
-                await exchange.close()
-                logger.info(f"Закрито з'єднання з біржею {name}")
+                await ExchangeFactory.release(exchange)
             except Exception as e:
                 logger.error(f"Помилка при закритті з'єднання з біржею {name}: {e}")
 
@@ -18,9 +18,46 @@ KRAKEN_API_SECRET = os.getenv("KRAKEN_API_SECRET", "")
 # Telegram config
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# Відправка повідомлень: пул відправників та ліміти Bot API
+TELEGRAM_SENDER_WORKERS = int(os.getenv("TELEGRAM_SENDER_WORKERS", "8"))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))  # повідомлень за секунду на всі чати
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))  # повідомлень за секунду в один чат
+TELEGRAM_BACKLOG_LIMIT = int(os.getenv("TELEGRAM_BACKLOG_LIMIT", "1000"))  # повідомлень з черги в планувальнику одночасно
+ALERT_TTL = float(os.getenv("ALERT_TTL", "120"))  # секунд; старіші сповіщення про можливості не відправляються
+TELEGRAM_EDIT_ALERTS = os.getenv("TELEGRAM_EDIT_ALERTS", "1") == "1"  # оновлення можливості редагують надіслане сповіщення
+TELEGRAM_EDIT_CACHE_SIZE = int(os.getenv("TELEGRAM_EDIT_CACHE_SIZE", "50000"))  # запам'ятованих message_id для редагування
+
+# Режим дайджесту: сповіщення накопичуються і надсилаються одним повідомленням за вікно
+DIGEST_BUFFER_SIZE = int(os.getenv("DIGEST_BUFFER_SIZE", "200"))  # записів у буфері одного користувача
+DIGEST_MIN_INTERVAL = int(os.getenv("DIGEST_MIN_INTERVAL", "60"))  # мінімальне вікно дайджесту (секунд)
+DIGEST_CHECK_INTERVAL = float(os.getenv("DIGEST_CHECK_INTERVAL", "1"))  # як часто перевіряти завершені вікна (секунд)
+
+# Отримання оновлень Telegram: webhook (якщо вказано TELEGRAM_WEBHOOK_URL) або довге опитування
+TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")  # публічна HTTPS-адреса, що веде на TELEGRAM_WEBHOOK_PATH веб-сервера
+TELEGRAM_WEBHOOK_PATH = os.getenv("TELEGRAM_WEBHOOK_PATH", "/telegram/webhook")
+TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")  # перевіряється в заголовку X-Telegram-Bot-Api-Secret-Token (порожній - випадковий при запуску)
+TELEGRAM_UPDATE_WORKERS = int(os.getenv("TELEGRAM_UPDATE_WORKERS", "8"))  # одночасних обробників команд
+TELEGRAM_UPDATE_DEDUP_WINDOW = int(os.getenv("TELEGRAM_UPDATE_DEDUP_WINDOW", "10000"))  # останніх update_id для відсіювання повторів
+TELEGRAM_UPDATE_MAX_PENDING = int(os.getenv("TELEGRAM_UPDATE_MAX_PENDING", "1000"))  # оновлень в очікуванні обробки
+
+# Відкладене збереження користувачів: зміни накопичуються і записуються одним файлом
+USERS_FLUSH_INTERVAL = float(os.getenv("USERS_FLUSH_INTERVAL", "5"))  # секунд після першої незбереженої зміни
+USERS_FLUSH_THRESHOLD = int(os.getenv("USERS_FLUSH_THRESHOLD", "100"))  # змінених користувачів, після яких зберігаємо одразу
+
+# Черга повідомлень на диску (переживає перезапуск бота)
+USE_DURABLE_OUTBOX = os.getenv("USE_DURABLE_OUTBOX", "1") == "1"
+OUTBOX_DIR = os.getenv("OUTBOX_DIR", "data/outbox")
+OUTBOX_WINDOW = int(os.getenv("OUTBOX_WINDOW", "1000"))  # максимум повідомлень у пам'яті
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", "0.2"))  # секунд між fsync
+OUTBOX_COMPACT_THRESHOLD = int(os.getenv("OUTBOX_COMPACT_THRESHOLD", "10000"))  # підтверджень до стиснення журналу
 
 # Шлях до файлу з користувачами
 USERS_FILE = os.getenv("USERS_FILE", "users.json")
+USERS_STORAGE = os.getenv("USERS_STORAGE", "json")  # сховище користувачів: json або sqlite
+USERS_DB_FILE = os.getenv("USERS_DB_FILE", "data/users.db")  # база SQLite (при першому запуску переносить users.json)
+USERS_CACHE_SIZE = int(os.getenv("USERS_CACHE_SIZE", "1000"))  # прочитаних на вимогу користувачів у пам'яті (sqlite)
 
 # Arbitrage settings
 MIN_PROFIT_THRESHOLD = float(os.getenv("MIN_PROFIT_THRESHOLD", "0.5"))  # мінімальний % прибутку
@@ -31,6 +68,10 @@ PEAK_CHECK_INTERVAL = int(os.getenv("PEAK_CHECK_INTERVAL", "30"))  # інтер
 
 # Logging settings
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"  # запис логів фоновим потоком через чергу
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # записів у черзі; при переповненні записи відкидаються
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # формат файлів логів: text або json
+ARBITRAGE_DEBUG_LOG = os.getenv("ARBITRAGE_DEBUG_LOG", "0") == "1"  # діагностичні записи по кожній комбінації бірж (повільніше)
 MAIN_LOG_FILE = "logs/main.log"
 TELEGRAM_LOG_FILE = "logs/telegram.log"
 ARBITRAGE_LOG_FILE = "logs/arbitrage.log"
@@ -74,6 +115,9 @@ EXCHANGE_FEES = {
     }
 }
 
+# Рушій крос-біржового пошуку: "loop" - перебір у циклах, "vectorized" - розрахунок масивами NumPy
+CROSS_ENGINE = os.getenv("CROSS_ENGINE", "loop").lower()
+
 # Використовувати maker чи taker комісії для розрахунків
 # Окремо для купівлі і продажу
 BUY_FEE_TYPE = os.getenv("BUY_FEE_TYPE", "taker").lower()  # Тип комісії для купівлі
@@ -126,18 +170,63 @@ TRIANGULAR_PATHS = [
     ["USDT", "SOL", "BTC", "USDT"],  # USDT/SOL, SOL/BTC, BTC/USDT
 ]
 
+# Рушій трикутного арбітражу: "paths" - лише TRIANGULAR_PATHS, "graph" - всі цикли графа ринків біржі
+TRIANGULAR_ENGINE = os.getenv("TRIANGULAR_ENGINE", "paths").lower()
+TRIANGULAR_MAX_LEGS = int(os.getenv("TRIANGULAR_MAX_LEGS", "4"))  # максимальна кількість угод у циклі (3 або 4)
+
 # Список пар, які будуть використовуватися за замовчуванням
 PAIRS = ALL_PAIRS
 
 # Exchange API settings
 REQUEST_TIMEOUT = 10  # seconds
 RATE_LIMIT_RETRY = True
+SCAN_TIMEOUT = float(os.getenv("SCAN_TIMEOUT", "30"))  # граничний час пошуку на одній біржі в секундах
+
+# Оцінка обсягу крос-біржових можливостей за глибиною ордербуків
+ORDERBOOK_SIZING = os.getenv("ORDERBOOK_SIZING", "0") == "1"
+ORDERBOOK_DEPTH = int(os.getenv("ORDERBOOK_DEPTH", "20"))  # кількість рівнів ордербуку
+ORDERBOOK_CACHE_TTL = float(os.getenv("ORDERBOOK_CACHE_TTL", "2"))  # секунд; в межах цього часу ордербук не запитується повторно
+
+# Відстеження можливостей між циклами: сповіщення лише про нові, суттєво змінені та закриті
+TRACK_OPPORTUNITIES = os.getenv("TRACK_OPPORTUNITIES", "1") == "1"
+TRACKER_CHANGE_DELTA = float(os.getenv("TRACKER_CHANGE_DELTA", "0.2"))  # зміна прибутку (відсоткових пунктів) для повторного сповіщення
+TRACKER_CLOSE_AFTER = int(os.getenv("TRACKER_CLOSE_AFTER", "2"))  # циклів без можливості, після яких вона вважається закритою
+TRACKER_MAX_SIZE = int(os.getenv("TRACKER_MAX_SIZE", "10000"))  # максимум можливостей, що відстежуються
+
+# Каталог щоденних сегментів історії потенційних можливостей
+HISTORY_DIR = os.getenv("HISTORY_DIR", "data/history")
+
+# WebSocket-потоки цін (REST-опитування залишається запасним варіантом)
+USE_WEBSOCKET_STREAMS = os.getenv("USE_WEBSOCKET_STREAMS", "0") == "1"
+WS_TICKER_MAX_AGE = float(os.getenv("WS_TICKER_MAX_AGE", "10"))  # секунд; старіші ціни запитуємо через REST
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443/ws")
+KUCOIN_WS_URL = os.getenv("KUCOIN_WS_URL", "")  # порожнє значення - адреса отримується через bullet-public
+KRAKEN_WS_URL = os.getenv("KRAKEN_WS_URL", "wss://ws.kraken.com/v2")
 
 # Web server settings
 WEB_SERVER_ENABLED = os.getenv("WEB_SERVER_ENABLED", "1") == "1"
 WEB_SERVER_HOST = os.getenv("WEB_SERVER_HOST", "localhost")
 WEB_SERVER_PORT = int(os.getenv("WEB_SERVER_PORT", "8080"))
 
+# Метрики (Prometheus, /metrics веб-сервера)
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "bitmonbot")  # префікс назв метрик
+
+# Монітор циклу подій (затримка і місця, що блокують цикл)
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.5"))  # секунд між вимірюваннями затримки
+LOOP_MONITOR_THRESHOLD = float(os.getenv("LOOP_MONITOR_THRESHOLD", "0.1"))  # секунд; довше блокування знімає стек
+LOOP_MONITOR_SAMPLE_INTERVAL = float(os.getenv("LOOP_MONITOR_SAMPLE_INTERVAL", "0.02"))  # секунд між зразками стека
+LOOP_MONITOR_MAX_OFFENDERS = int(os.getenv("LOOP_MONITOR_MAX_OFFENDERS", "100"))  # місць у коді в статистиці
+LOOP_MONITOR_STACK_DEPTH = int(os.getenv("LOOP_MONITOR_STACK_DEPTH", "15"))  # кадрів стека у звіті
+
+# Вибірковий профайлер на вимогу (/profile, /api/profile)
+PROFILER_DIR = os.getenv("PROFILER_DIR", "data/profiles")  # каталог файлів collapsed stacks
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))  # секунд між зрізами стеків
+PROFILER_MAX_DURATION = float(os.getenv("PROFILER_MAX_DURATION", "300"))  # максимальна тривалість профілювання (секунд)
+PROFILER_DEFAULT_DURATION = float(os.getenv("PROFILER_DEFAULT_DURATION", "30"))  # тривалість без явного значення
+PROFILER_TOP_FUNCTIONS = int(os.getenv("PROFILER_TOP_FUNCTIONS", "10"))  # функцій у підсумку
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")  # заголовок X-Profiler-Token для POST /api/profile; без нього - лише localhost
+
 # App settings
 APP_NAME = "Bitmonbot"
 VERSION = "1.0.0"
@@ -155,8 +244,10 @@ BOT_COMMANDS = {
     "/approve": "Схвалити користувача (тільки для адміністраторів)",
     "/block": "Заблокувати користувача (тільки для адміністраторів)",
     "/users": "Список користувачів (тільки для адміністраторів)",
+    "/profile": "Профілювання процесу на N секунд (тільки для адміністраторів)",
     "/pairs": "Керування валютними парами",
     "/threshold": "Встановити мінімальний поріг прибутку",
+    "/digest": "Режим доставки: миттєво або дайджестом",
     "/settings": "Налаштування користувача"
 }
 
@@ -178,14 +269,25 @@ def save_users(users):
     Зберігає список користувачів у файл
     """
     try:
-        # Створюємо директорію, якщо вона не існує
-        users_dir = os.path.dirname(USERS_FILE)
-        if users_dir and not os.path.exists(users_dir):
-            os.makedirs(users_dir)
-            
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=4)
+        write_users_file(json.dumps(users))
         return True
     except Exception as e:
         print(f"Помилка при збереженні користувачів: {e}")
         return False
+
+def write_users_file(data: str):
+    """
+    Атомарно записує серіалізованих користувачів у файл (тимчасовий файл + перейменування),
+    тож після аварійної зупинки файл містить або стару, або нову версію
+    """
+    # Створюємо директорію, якщо вона не існує
+    users_dir = os.path.dirname(USERS_FILE)
+    if users_dir and not os.path.exists(users_dir):
+        os.makedirs(users_dir)
+        
+    temp_file = USERS_FILE + ".tmp"
+    with open(temp_file, 'w') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, USERS_FILE)
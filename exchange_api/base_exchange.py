@@ -1,6 +1,16 @@
 # exchange_api/base_exchange.py
+import asyncio
+import json
+import logging
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple, Optional
+from typing import AsyncIterator, Dict, List, Tuple, Optional
+
+import aiohttp
+
+import config
+
+logger = logging.getLogger('main')
 
 class BaseExchange(ABC):
     """
@@ -10,6 +20,12 @@ class BaseExchange(ABC):
         self.api_key = api_key
         self.api_secret = api_secret
         self.name = self.__class__.__name__
+        self.ws_url: Optional[str] = None  # Адреса WebSocket-потоку (задається в адаптерах)
+        self.ws_ping_interval: float = 20.0  # Інтервал прикладного ping у секундах
+        self.live_tickers: Dict[str, Dict] = {}  # Останні найкращі bid/ask з WebSocket-потоку
+        self.stream_task: Optional[asyncio.Task] = None
+        self._ws_session: Optional[aiohttp.ClientSession] = None
+        self._ws_symbol_map: Dict[str, str] = {}  # Символ біржі -> уніфікований символ
     
     @abstractmethod
     async def get_ticker(self, symbol: str) -> Dict:
@@ -73,3 +89,178 @@ class BaseExchange(ABC):
         Закрити з'єднання з біржею
         """
         pass
+    
+    async def subscribe_tickers(self, symbols: List[str]) -> AsyncIterator[Dict]:
+        """
+        Підписується на WebSocket-потік найкращих цін bid/ask
+        
+        Кожен отриманий тікер також зберігається в self.live_tickers.
+        Ітератор завершується, коли біржа закриває з'єднання.
+        
+        Args:
+            symbols (List[str]): Список символів валютних пар
+            
+        Yields:
+            Dict: Тікер у форматі {'symbol', 'bid', 'ask', 'bidVolume', 'askVolume', 'timestamp'}
+            
+        Raises:
+            NotImplementedError: Якщо біржа не підтримує WebSocket-потоки
+        """
+        url = await self._get_ws_url()
+        if not url:
+            raise NotImplementedError(f"Біржа {self.name} не підтримує WebSocket-потоки")
+        
+        self._ws_symbol_map = {self._to_ws_symbol(symbol): symbol for symbol in symbols}
+        
+        if self._ws_session is None or self._ws_session.closed:
+            self._ws_session = aiohttp.ClientSession()
+        
+        async with self._ws_session.ws_connect(url) as ws:
+            for message in self._build_subscribe_messages(list(self._ws_symbol_map.keys())):
+                await ws.send_json(message)
+            logger.info(f"Підписано на WebSocket-потік {self.name} для {len(symbols)} пар")
+            
+            while True:
+                try:
+                    msg = await ws.receive(timeout=self.ws_ping_interval)
+                except asyncio.TimeoutError:
+                    # Тиша в каналі - надсилаємо прикладний ping, якщо біржа його вимагає
+                    ping = self._build_ping_message()
+                    if ping is not None:
+                        await ws.send_json(ping)
+                    continue
+                
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    try:
+                        data = json.loads(msg.data)
+                    except ValueError:
+                        logger.debug(f"Некоректний кадр WebSocket від {self.name}: {msg.data[:200]}")
+                        continue
+                    
+                    for ticker in self._parse_ws_message(data):
+                        self.live_tickers[ticker['symbol']] = ticker
+                        yield ticker
+                elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                                  aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+    
+    async def start_ticker_stream(self, symbols: List[str]):
+        """
+        Запускає фонову задачу, яка підтримує self.live_tickers в актуальному стані
+        
+        Args:
+            symbols (List[str]): Список символів валютних пар
+        """
+        if self.stream_task and not self.stream_task.done():
+            return
+        self.stream_task = asyncio.create_task(self._run_ticker_stream(list(symbols)))
+    
+    async def stop_ticker_stream(self):
+        """
+        Зупиняє фонову задачу WebSocket-потоку
+        """
+        if self.stream_task:
+            self.stream_task.cancel()
+            try:
+                await self.stream_task
+            except asyncio.CancelledError:
+                pass
+            self.stream_task = None
+        
+        if self._ws_session:
+            await self._ws_session.close()
+            self._ws_session = None
+    
+    def get_streamed_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Повертає свіжі тікери з WebSocket-потоку
+        
+        Args:
+            symbols (List[str]): Список символів валютних пар
+            
+        Returns:
+            Dict[str, Dict]: Тікери, отримані не пізніше WS_TICKER_MAX_AGE секунд тому.
+                Пари без свіжих даних не включаються (їх слід отримати через REST).
+        """
+        if not self.stream_task or self.stream_task.done():
+            return {}
+        
+        oldest_allowed = (time.time() - config.WS_TICKER_MAX_AGE) * 1000
+        result = {}
+        for symbol in symbols:
+            ticker = self.live_tickers.get(symbol)
+            if ticker and ticker['timestamp'] >= oldest_allowed:
+                result[symbol] = ticker
+        return result
+    
+    async def _run_ticker_stream(self, symbols: List[str]):
+        """
+        Тримає WebSocket-потік відкритим з перепідключенням та експоненціальною затримкою
+        """
+        delay = 1
+        while True:
+            try:
+                async for _ in self.subscribe_tickers(symbols):
+                    delay = 1
+                logger.warning(f"WebSocket-потік {self.name} закрито біржею")
+            except asyncio.CancelledError:
+                raise
+            except NotImplementedError as e:
+                logger.warning(f"{e}. Використовуємо лише REST")
+                return
+            except Exception as e:
+                logger.error(f"Помилка WebSocket-потоку {self.name}: {e}")
+            
+            logger.info(f"Перепідключення до WebSocket-потоку {self.name} через {delay} с")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+    
+    async def _get_ws_url(self) -> Optional[str]:
+        """
+        Повертає адресу WebSocket-потоку або None, якщо потік не підтримується
+        """
+        return self.ws_url
+    
+    def _to_ws_symbol(self, symbol: str) -> str:
+        """
+        Перетворює уніфікований символ ('BTC/USDT') у формат WebSocket-потоку біржі
+        """
+        return symbol
+    
+    def _build_subscribe_messages(self, ws_symbols: List[str]) -> List[Dict]:
+        """
+        Формує повідомлення підписки для WebSocket-потоку біржі
+        """
+        return []
+    
+    def _build_ping_message(self) -> Optional[Dict]:
+        """
+        Формує прикладне ping-повідомлення або None, якщо достатньо ping протоколу WebSocket
+        """
+        return None
+    
+    def _parse_ws_message(self, data) -> List[Dict]:
+        """
+        Розбирає кадр WebSocket-потоку у список тікерів
+        """
+        return []
+    
+    def _make_stream_ticker(self, ws_symbol: str, bid, ask, bid_volume=None, ask_volume=None) -> List[Dict]:
+        """
+        Формує тікер у форматі ccxt з кадру WebSocket-потоку
+        
+        Returns:
+            List[Dict]: Список з одного тікера або порожній список для непідписаних пар
+        """
+        symbol = self._ws_symbol_map.get(ws_symbol)
+        if symbol is None or bid is None or ask is None:
+            return []
+        
+        return [{
+            'symbol': symbol,
+            'bid': float(bid),
+            'ask': float(ask),
+            'bidVolume': float(bid_volume) if bid_volume is not None else None,
+            'askVolume': float(ask_volume) if ask_volume is not None else None,
+            'timestamp': int(time.time() * 1000)
+        }]
@@ -21,6 +21,7 @@ class BinanceAPI(BaseExchange):
             'timeout': config.REQUEST_TIMEOUT * 1000,  # в мілісекундах
             'enableRateLimit': config.RATE_LIMIT_RETRY
         })
+        self.ws_url = config.BINANCE_WS_URL
         
     async def get_ticker(self, symbol: str) -> Dict:
         """
@@ -36,10 +37,20 @@ class BinanceAPI(BaseExchange):
     async def get_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
         """
         Отримати поточні ціни для списку валютних пар
+        
+        Якщо запущено WebSocket-потік, свіжі ціни беруться з нього,
+        а через REST запитуються лише пари без актуальних даних.
         """
+        streamed = self.get_streamed_tickers(symbols)
+        if len(streamed) == len(symbols):
+            return streamed
+        if streamed:
+            symbols = [symbol for symbol in symbols if symbol not in streamed]
+        
         try:
             # Метод fetch_tickers підтримує отримання даних для кількох символів одразу
             tickers = await self.exchange.fetch_tickers(symbols)
+            tickers.update(streamed)
             return tickers
         except Exception as e:
             logger.error(f"Помилка при отриманні тікерів на Binance: {e}")
@@ -52,6 +63,7 @@ class BinanceAPI(BaseExchange):
                         result[symbol] = ticker
                 except Exception as e:
                     logger.error(f"Помилка при отриманні тікера для {symbol} на Binance: {e}")
+            result.update(streamed)
             return result
     
     async def get_orderbook(self, symbol: str, limit: int = 10) -> Dict:
@@ -107,8 +119,35 @@ class BinanceAPI(BaseExchange):
             logger.error(f"Помилка при перевірці глибини ордербуку для {symbol} на Binance: {e}")
             return False, None
             
+    def _to_ws_symbol(self, symbol: str) -> str:
+        """
+        Перетворює 'BTC/USDT' у формат потоку Binance ('BTCUSDT')
+        """
+        return symbol.replace('/', '').upper()
+    
+    def _build_subscribe_messages(self, ws_symbols: List[str]) -> List[Dict]:
+        """
+        Підписка на потоки найкращих цін bookTicker
+        """
+        streams = [f"{ws_symbol.lower()}@bookTicker" for ws_symbol in ws_symbols]
+        return [{"method": "SUBSCRIBE", "params": streams, "id": 1}]
+    
+    def _parse_ws_message(self, data) -> List[Dict]:
+        """
+        Розбирає кадр bookTicker: {"u": ..., "s": "BTCUSDT", "b": "...", "B": "...", "a": "...", "A": "..."}
+        """
+        # Кадри комбінованих потоків мають вигляд {"stream": ..., "data": {...}}
+        if isinstance(data, dict) and 'data' in data:
+            data = data['data']
+        
+        if not isinstance(data, dict) or 's' not in data:
+            return []
+        
+        return self._make_stream_ticker(data['s'], data.get('b'), data.get('a'), data.get('B'), data.get('A'))
+    
     async def close(self):
         """
         Закрити з'єднання з біржею
         """
+        await self.stop_ticker_stream()
         await self.exchange.close()
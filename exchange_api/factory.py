@@ -19,10 +19,18 @@ class ExchangeFactory:
         'kraken': KrakenAPI
     }
     
+    # Спільні для процесу об'єкти бірж та кількість їх користувачів
+    _instances: Dict[str, BaseExchange] = {}
+    _ref_counts: Dict[str, int] = {}
+    
     @classmethod
     def create(cls, exchange_name: str) -> BaseExchange:
         """
-        Створює об'єкт біржі за її назвою
+        Повертає спільний об'єкт біржі за її назвою
+        
+        Усі виклики для однієї біржі отримують той самий об'єкт (і той самий
+        клієнт ccxt з його HTTP-сесією, лімітом запитів та кешем ринків).
+        Кожен виклик create() має бути врівноважений викликом release().
         
         Args:
             exchange_name (str): Назва біржі ('binance', 'kucoin', 'kraken')
@@ -35,6 +43,47 @@ class ExchangeFactory:
         """
         exchange_name = exchange_name.lower()
         
+        if exchange_name in cls._instances:
+            cls._ref_counts[exchange_name] += 1
+            logger.debug(f"Повторне використання об'єкту біржі {exchange_name} (користувачів: {cls._ref_counts[exchange_name]})")
+            return cls._instances[exchange_name]
+        
+        exchange = cls._create_instance(exchange_name)
+        cls._instances[exchange_name] = exchange
+        cls._ref_counts[exchange_name] = 1
+        return exchange
+    
+    @classmethod
+    async def release(cls, exchange: BaseExchange):
+        """
+        Звільняє об'єкт біржі, отриманий через create()
+        
+        З'єднання закривається, коли об'єкт звільнили всі його користувачі.
+        
+        Args:
+            exchange (BaseExchange): Об'єкт біржі
+        """
+        for exchange_name, instance in cls._instances.items():
+            if instance is exchange:
+                break
+        else:
+            logger.debug(f"Об'єкт біржі {exchange.name} вже звільнено")
+            return
+        
+        cls._ref_counts[exchange_name] -= 1
+        if cls._ref_counts[exchange_name] > 0:
+            return
+        
+        del cls._instances[exchange_name]
+        del cls._ref_counts[exchange_name]
+        await exchange.close()
+        logger.info(f"Закрито з'єднання з біржею {exchange_name}")
+    
+    @classmethod
+    def _create_instance(cls, exchange_name: str) -> BaseExchange:
+        """
+        Створює новий об'єкт біржі за її назвою
+        """
         if exchange_name not in cls._exchanges:
             raise ValueError(f"Біржа {exchange_name} не підтримується")
         
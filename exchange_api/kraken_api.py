@@ -20,6 +20,7 @@ class KrakenAPI(BaseExchange):
             'timeout': config.REQUEST_TIMEOUT * 1000,  # в мілісекундах
             'enableRateLimit': config.RATE_LIMIT_RETRY
         })
+        self.ws_url = config.KRAKEN_WS_URL
         
     async def get_ticker(self, symbol: str) -> Dict:
         """
@@ -35,9 +36,19 @@ class KrakenAPI(BaseExchange):
     async def get_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
         """
         Отримати поточні ціни для списку валютних пар
+        
+        Якщо запущено WebSocket-потік, свіжі ціни беруться з нього,
+        а через REST запитуються лише пари без актуальних даних.
         """
+        streamed = self.get_streamed_tickers(symbols)
+        if len(streamed) == len(symbols):
+            return streamed
+        if streamed:
+            symbols = [symbol for symbol in symbols if symbol not in streamed]
+        
         try:
             tickers = await self.exchange.fetch_tickers(symbols)
+            tickers.update(streamed)
             return tickers
         except Exception as e:
             logger.error(f"Помилка при отриманні тікерів на Kraken: {e}")
@@ -50,6 +61,7 @@ class KrakenAPI(BaseExchange):
                         result[symbol] = ticker
                 except Exception as e:
                     logger.error(f"Помилка при отриманні тікера для {symbol} на Kraken: {e}")
+            result.update(streamed)
             return result
     
     async def get_orderbook(self, symbol: str, limit: int = 10) -> Dict:
@@ -105,8 +117,36 @@ class KrakenAPI(BaseExchange):
             logger.error(f"Помилка при перевірці глибини ордербуку для {symbol} на Kraken: {e}")
             return False, None
     
+    def _build_subscribe_messages(self, ws_symbols: List[str]) -> List[Dict]:
+        """
+        Підписка на канал ticker WebSocket API v2 (символи у форматі 'BTC/USDT')
+        """
+        return [{"method": "subscribe", "params": {"channel": "ticker", "symbol": ws_symbols}}]
+    
+    def _build_ping_message(self) -> Optional[Dict]:
+        """
+        Kraken очікує прикладний ping для підтримки з'єднання
+        """
+        return {"method": "ping"}
+    
+    def _parse_ws_message(self, data) -> List[Dict]:
+        """
+        Розбирає кадр {"channel": "ticker", "type": "snapshot"|"update", "data": [{"symbol", "bid", "ask", ...}]}
+        """
+        if not isinstance(data, dict) or data.get('channel') != 'ticker':
+            return []
+        
+        tickers = []
+        for item in data.get('data', []):
+            tickers.extend(self._make_stream_ticker(
+                item.get('symbol'), item.get('bid'), item.get('ask'),
+                item.get('bid_qty'), item.get('ask_qty')
+            ))
+        return tickers
+    
     async def close(self):
         """
         Закрити з'єднання з біржею
         """
+        await self.stop_ticker_stream()
         await self.exchange.close()
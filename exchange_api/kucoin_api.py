@@ -2,6 +2,7 @@
 import ccxt.async_support as ccxt
 from typing import Dict, List, Tuple, Optional
 import logging
+import uuid
 
 from exchange_api.base_exchange import BaseExchange
 import config
@@ -21,6 +22,7 @@ class KuCoinAPI(BaseExchange):
             'timeout': config.REQUEST_TIMEOUT * 1000,  # в мілісекундах
             'enableRateLimit': config.RATE_LIMIT_RETRY
         })
+        self.ws_url = config.KUCOIN_WS_URL or None
         
     async def get_ticker(self, symbol: str) -> Dict:
         """
@@ -36,9 +38,19 @@ class KuCoinAPI(BaseExchange):
     async def get_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
         """
         Отримати поточні ціни для списку валютних пар
+        
+        Якщо запущено WebSocket-потік, свіжі ціни беруться з нього,
+        а через REST запитуються лише пари без актуальних даних.
         """
+        streamed = self.get_streamed_tickers(symbols)
+        if len(streamed) == len(symbols):
+            return streamed
+        if streamed:
+            symbols = [symbol for symbol in symbols if symbol not in streamed]
+        
         try:
             tickers = await self.exchange.fetch_tickers(symbols)
+            tickers.update(streamed)
             return tickers
         except Exception as e:
             logger.error(f"Помилка при отриманні тікерів на KuCoin: {e}")
@@ -51,6 +63,7 @@ class KuCoinAPI(BaseExchange):
                         result[symbol] = ticker
                 except Exception as e:
                     logger.error(f"Помилка при отриманні тікера для {symbol} на KuCoin: {e}")
+            result.update(streamed)
             return result
     
     async def get_orderbook(self, symbol: str, limit: int = 10) -> Dict:
@@ -106,8 +119,65 @@ class KuCoinAPI(BaseExchange):
             logger.error(f"Помилка при перевірці глибини ордербуку для {symbol} на KuCoin: {e}")
             return False, None
             
+    async def _get_ws_url(self) -> Optional[str]:
+        """
+        KuCoin видає адресу потоку разом з одноразовим токеном через bullet-public
+        """
+        if self.ws_url:
+            return self.ws_url
+        
+        response = await self.exchange.public_post_bullet_public()
+        data = response['data']
+        server = data['instanceServers'][0]
+        self.ws_ping_interval = server.get('pingInterval', 18000) / 1000
+        return f"{server['endpoint']}?token={data['token']}&connectId={uuid.uuid4().hex}"
+    
+    def _to_ws_symbol(self, symbol: str) -> str:
+        """
+        Перетворює 'BTC/USDT' у формат KuCoin ('BTC-USDT')
+        """
+        return symbol.replace('/', '-')
+    
+    def _build_subscribe_messages(self, ws_symbols: List[str]) -> List[Dict]:
+        """
+        Підписка на топік /market/ticker (не більше 100 пар в одному повідомленні)
+        """
+        messages = []
+        for i in range(0, len(ws_symbols), 100):
+            messages.append({
+                "id": str(i + 1),
+                "type": "subscribe",
+                "topic": "/market/ticker:" + ",".join(ws_symbols[i:i + 100]),
+                "response": True
+            })
+        return messages
+    
+    def _build_ping_message(self) -> Optional[Dict]:
+        """
+        KuCoin закриває з'єднання без прикладного ping
+        """
+        return {"id": uuid.uuid4().hex, "type": "ping"}
+    
+    def _parse_ws_message(self, data) -> List[Dict]:
+        """
+        Розбирає кадр {"type": "message", "topic": "/market/ticker:BTC-USDT", "data": {"bestBid", "bestAsk", ...}}
+        """
+        if not isinstance(data, dict) or data.get('type') != 'message':
+            return []
+        
+        topic = data.get('topic', '')
+        if not topic.startswith('/market/ticker:'):
+            return []
+        
+        ticker = data.get('data', {})
+        return self._make_stream_ticker(
+            topic.split(':', 1)[1], ticker.get('bestBid'), ticker.get('bestAsk'),
+            ticker.get('bestBidSize'), ticker.get('bestAskSize')
+        )
+    
     async def close(self):
         """
         Закрити з'єднання з біржею
         """
+        await self.stop_ticker_stream()
         await self.exchange.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# finder_bench.py
+import json
+import logging
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+import config
+from arbitrage.finder import ArbitrageFinder
+
+# Налаштовуємо логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('finder_bench')
+
+def make_tickers(symbols: int, exchanges: List[str], spread: float = 0.005, seed: int = 1) -> Dict[str, Dict[str, Dict]]:
+    """
+    Формує синтетичні тікери: ціни пари на різних біржах відрізняються в межах spread
+    """
+    rng = random.Random(seed)
+    tickers = {exchange_name: {} for exchange_name in exchanges}
+    for i in range(symbols):
+        symbol = f"C{i}/USDT"
+        base = rng.uniform(0.01, 1000.0)
+        for exchange_name in exchanges:
+            mid = base * (1 + rng.uniform(-spread, spread))
+            tickers[exchange_name][symbol] = {'bid': mid * 0.9999, 'ask': mid * 1.0001}
+    return tickers
+
+def legacy_cycle(finder: ArbitrageFinder, symbols: List[str], all_tickers: Dict[str, Dict[str, Dict]]) -> str:
+    """
+    Попередня реалізація для порівняння: f-рядок DEBUG на кожну комбінацію,
+    datetime.now() на кожну можливість і звіт, зібраний через +=
+    """
+    log = logging.getLogger('arbitrage')
+    all_possible_opportunities = []
+    for symbol in symbols:
+        symbol_prices = {name: tickers[symbol] for name, tickers in all_tickers.items() if symbol in tickers}
+        log.debug(f"Знайдено ціни для {symbol} на {len(symbol_prices)} біржах: {', '.join(symbol_prices.keys())}")
+        for buy_exchange in symbol_prices:
+            for sell_exchange in symbol_prices:
+                if buy_exchange == sell_exchange:
+                    continue
+                buy_price = symbol_prices[buy_exchange]['ask']
+                sell_price = symbol_prices[sell_exchange]['bid']
+                profit_percent = (sell_price - buy_price) / buy_price * 100
+                buy_fee = config.EXCHANGE_FEES.get(buy_exchange.lower(), {}).get(finder.buy_fee_type, 0.0)
+                sell_fee = config.EXCHANGE_FEES.get(sell_exchange.lower(), {}).get(finder.sell_fee_type, 0.0)
+                buy_with_fee = buy_price * (1 + buy_fee / 100)
+                sell_with_fee = sell_price * (1 - sell_fee / 100)
+                net_profit_percent = (sell_with_fee - buy_with_fee) / buy_with_fee * 100
+                net_profit_str = f"{net_profit_percent:.4f}"
+                log.debug(
+                    f"{symbol}: {buy_exchange} -> {sell_exchange}: "
+                    f"buy={buy_price:.8f}, sell={sell_price:.8f}, "
+                    f"profit={profit_percent:.4f}%, "
+                    f"net_profit={net_profit_str}%"
+                )
+                if profit_percent > 0:
+                    all_possible_opportunities.append({
+                        "symbol": symbol,
+                        "buy_exchange": buy_exchange,
+                        "sell_exchange": sell_exchange,
+                        "buy_price": buy_price,
+                        "sell_price": sell_price,
+                        "profit_percent": profit_percent,
+                        "buy_fee": buy_fee,
+                        "sell_fee": sell_fee,
+                        "net_profit_percent": net_profit_percent,
+                        "timestamp": datetime.now().isoformat()
+                    })
+
+    all_possible_opportunities.sort(key=lambda x: x['net_profit_percent'], reverse=True)
+    opportunity_log = f"===== ЗВІТ ПРО ВСІ МОЖЛИВОСТІ ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')}) =====\n"
+    opportunity_log += f"Всього знайдено {len(all_possible_opportunities)} потенційних можливостей:\n"
+    for i, opp in enumerate(all_possible_opportunities, 1):
+        opportunity_log += (
+            f"{i}. {opp['symbol']}: {opp['buy_exchange']} → {opp['sell_exchange']}, "
+            f"Прибуток {opp['profit_percent']:.4f}%, "
+            f"Чистий прибуток {opp['net_profit_percent']:.4f}%, "
+            f"Buy: {opp['buy_price']}, Sell: {opp['sell_price']}\n"
+        )
+    logging.getLogger('all_opportunities').info(opportunity_log)
+    return opportunity_log
+
+def current_cycle(finder: ArbitrageFinder, symbols: List[str], all_tickers: Dict[str, Dict[str, Dict]]):
+    """
+    Поточна реалізація: пошук _find_in_loop() і звіт одним структурованим записом
+    """
+    _, all_possible_opportunities = finder._find_in_loop(symbols, all_tickers)
+    all_possible_opportunities.sort(key=lambda x: x['net_profit_percent'], reverse=True)
+    logging.getLogger('all_opportunities').info(
+        "===== ЗВІТ ПРО ВСІ МОЖЛИВОСТІ (%s) =====\nВсього знайдено %d потенційних можливостей:",
+        datetime.now().strftime('%Y-%m-%d %H:%M:%S'), len(all_possible_opportunities),
+        extra={"data": all_possible_opportunities}
+    )
+    return all_possible_opportunities
+
+def measure(cycle, finder: ArbitrageFinder, symbols: List[str], all_tickers: Dict[str, Dict[str, Dict]],
+            cycles: int) -> Dict:
+    """
+    Вимірює середній час і пікове виділення пам'яті за цикл
+    """
+    cycle(finder, symbols, all_tickers)  # Прогрів
+
+    peaks = []
+    start_time = time.perf_counter()
+    for _ in range(cycles):
+        tracemalloc.start()
+        result = cycle(finder, symbols, all_tickers)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del result
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "cycle_ms": round(elapsed / cycles * 1000, 2),
+        "peak_kb": round(max(peaks) / 1024, 1)
+    }
+
+def run_benchmark(symbols: int = 2000, exchanges: int = 4, cycles: int = 5) -> Dict:
+    """
+    Порівнює виділення пам'яті за цикл пошуку (логер arbitrage на рівні INFO)
+
+    Обробники логів не підключаються: вимірюється лише те, що створює сам цикл
+    пошуку (форматування рядків звіту виконує потік запису логів).
+    """
+    # Біржі з налаштованими комісіями, решта - умовні біржі без комісій
+    exchange_names = list(config.EXCHANGE_FEES)[:exchanges]
+    exchange_names += [f"exchange{i}" for i in range(len(exchange_names), exchanges)]
+    all_tickers = make_tickers(symbols, exchange_names)
+    symbol_list = list(next(iter(all_tickers.values())))
+
+    logging.getLogger('arbitrage').setLevel(logging.INFO)
+    logging.getLogger('all_opportunities').addHandler(logging.NullHandler())
+    logging.getLogger('all_opportunities').propagate = False
+
+    finder = ArbitrageFinder(exchange_names, min_profit=100.0)
+    legacy = measure(legacy_cycle, finder, symbol_list, all_tickers, cycles)
+    current = measure(current_cycle, finder, symbol_list, all_tickers, cycles)
+
+    return {
+        "symbols": symbols,
+        "exchanges": exchanges,
+        "cycles": cycles,
+        "legacy": legacy,
+        "current": current,
+        "peak_reduction": round(1 - current["peak_kb"] / legacy["peak_kb"], 3) if legacy["peak_kb"] else None
+    }
+
+if __name__ == "__main__":
+    symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    exchanges = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    result = run_benchmark(symbols, exchanges)
+    logger.info(f"Результат: {json.dumps(result, ensure_ascii=False)}")
@@ -1,7 +1,15 @@
 # logger.py
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterable, List, Tuple
+
+import config
 
 # Створюємо директорію для логів, якщо вона не існує
 logs_dir = 'logs'
@@ -15,8 +23,62 @@ USERS_LOG_FILE = os.path.join(logs_dir, 'users.log')
 TRIANGULAR_LOG_FILE = os.path.join(logs_dir, 'triangular.log')  # Лог для трикутного арбітражу
 ALL_OPPORTUNITIES_LOG_FILE = os.path.join(logs_dir, 'all_opportunities.log')  # Новий лог для всіх можливостей
 
+class JsonFormatter(logging.Formatter):
+    """
+    Форматує запис як JSON-рядок (структуровані поля з extra={"data": ...} потрапляють у поле data)
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage()
+        }
+        data = getattr(record, "data", None)
+        if data is not None:
+            entry["data"] = data
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class DataRowsFormatter(logging.Formatter):
+    """
+    Текстовий формат, що дописує до повідомлення рядки зі структурованих даних запису
+
+    Кожен елемент extra={"data": [...]} форматується шаблоном row_template
+    (поле index - номер рядка з 1). Рядки формуються під час запису в файл,
+    тобто в потоці запису логів, а не в коді, що створив запис.
+    """
+    def __init__(self, fmt: str, row_template: str):
+        super().__init__(fmt)
+        self.row_template = row_template
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        data = getattr(record, "data", None)
+        if not data:
+            return text
+        rows = "\n".join(self.row_template.format(index=i, **row) for i, row in enumerate(data, 1))
+        return f"{text}\n{rows}"
+
+LOG_LINE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Рядок звіту про всі можливості
+ALL_OPPORTUNITIES_ROW_TEMPLATE = (
+    "{index}. {symbol}: {buy_exchange} → {sell_exchange}, "
+    "Прибуток {profit_percent:.4f}%, "
+    "Чистий прибуток {net_profit_percent:.4f}%, "
+    "Buy: {buy_price}, Sell: {sell_price}"
+)
+
 # Загальний формат логування
-log_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_format = logging.Formatter(LOG_LINE_FORMAT)
+# Формат файлів логів (текст або JSON)
+file_log_format = JsonFormatter() if config.LOG_FORMAT == "json" else log_format
+# Звіт про всі можливості в текстовому форматі містить рядки можливостей з поля data
+all_opportunities_log_format = (file_log_format if config.LOG_FORMAT == "json"
+                                else DataRowsFormatter(LOG_LINE_FORMAT, ALL_OPPORTUNITIES_ROW_TEMPLATE))
 
 # Налаштування основного логера
 main_logger = logging.getLogger('main')
@@ -26,7 +88,7 @@ main_handler = RotatingFileHandler(
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-main_handler.setFormatter(log_format)
+main_handler.setFormatter(file_log_format)
 main_logger.addHandler(main_handler)
 
 # Налаштування логера для Telegram
@@ -37,18 +99,19 @@ telegram_handler = RotatingFileHandler(
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-telegram_handler.setFormatter(log_format)
+telegram_handler.setFormatter(file_log_format)
 telegram_logger.addHandler(telegram_handler)
 
 # Налаштування логера для арбітражу
 arbitrage_logger = logging.getLogger('arbitrage')
-arbitrage_logger.setLevel(logging.INFO)
+# Рівень DEBUG вмикає діагностичні записи по кожній комбінації бірж у пошуку можливостей
+arbitrage_logger.setLevel(logging.DEBUG if config.ARBITRAGE_DEBUG_LOG else logging.INFO)
 arbitrage_handler = RotatingFileHandler(
     ARBITRAGE_LOG_FILE, 
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-arbitrage_handler.setFormatter(log_format)
+arbitrage_handler.setFormatter(file_log_format)
 arbitrage_logger.addHandler(arbitrage_handler)
 
 # Налаштування логера для користувачів
@@ -59,7 +122,7 @@ users_handler = RotatingFileHandler(
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-users_handler.setFormatter(log_format)
+users_handler.setFormatter(file_log_format)
 users_logger.addHandler(users_handler)
 
 # Налаштування логера для трикутного арбітражу
@@ -70,7 +133,7 @@ triangular_handler = RotatingFileHandler(
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-triangular_handler.setFormatter(log_format)
+triangular_handler.setFormatter(file_log_format)
 triangular_logger.addHandler(triangular_handler)
 
 # Новий логер для всіх арбітражних можливостей
@@ -81,12 +144,13 @@ all_opportunities_handler = RotatingFileHandler(
     maxBytes=20*1024*1024,  # 20MB
     backupCount=10
 )
-all_opportunities_handler.setFormatter(log_format)
+all_opportunities_handler.setFormatter(all_opportunities_log_format)
 all_opportunities_logger.addHandler(all_opportunities_handler)
 
 # Додамо також вивід в консоль для всіх логерів
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(log_format)
+console_handler.setLevel(logging.INFO)  # Діагностичні записи DEBUG пишуться лише у файли
 
 main_logger.addHandler(console_handler)
 telegram_logger.addHandler(console_handler)
@@ -94,3 +158,120 @@ arbitrage_logger.addHandler(console_handler)
 users_logger.addHandler(console_handler)
 triangular_logger.addHandler(console_handler)
 # Не додаємо консольний хендлер для all_opportunities, щоб не засмічувати консоль
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Передає записи в обмежену чергу фонового потоку запису, не блокуючи цикл подій
+
+    Якщо черга переповнена, новий запис рівня нижче WARNING відкидається,
+    а для WARNING і вище звільняється місце за рахунок найстарішого запису.
+    Відкинуті записи рахуються за рівнями.
+    """
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Текст повідомлення і трасування фіксуємо зараз (аргументи можуть змінитись),
+        # а форматування часу та рядка виконує потік запису
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = log_format.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+
+        dropped = record
+        if record.levelno >= logging.WARNING:
+            try:
+                dropped = self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                dropped = record
+        with self._lock:
+            self.dropped[dropped.levelname] = self.dropped.get(dropped.levelname, 0) + 1
+
+class RoutingFilter(logging.Filter):
+    """
+    Пропускає записи лише вказаних логерів (обробники спільного потоку запису належать різним логерам)
+    """
+    def __init__(self, names: Iterable[str]):
+        super().__init__()
+        self.names = frozenset(names)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.name in self.names
+
+queue_handler = None
+queue_listener = None
+
+def start_async_logging(routes: List[Tuple[logging.Logger, List[logging.Handler]]]):
+    """
+    Переводить логери на запис через чергу та один фоновий потік
+
+    Обробники залишаються тими самими, але викликаються лише з потоку QueueListener,
+    тож запис у файли та консоль не затримує цикл подій.
+
+    Args:
+        routes (List[Tuple[logging.Logger, List[logging.Handler]]]): Логери та їх обробники
+    """
+    global queue_handler, queue_listener
+
+    handler_loggers: Dict[logging.Handler, List[str]] = {}
+    for route_logger, handlers in routes:
+        for handler in handlers:
+            route_logger.removeHandler(handler)
+            handler_loggers.setdefault(handler, []).append(route_logger.name)
+
+    for handler, names in handler_loggers.items():
+        handler.addFilter(RoutingFilter(names))
+
+    queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE))
+    for route_logger, _ in routes:
+        route_logger.addHandler(queue_handler)
+
+    queue_listener = QueueListener(queue_handler.queue, *handler_loggers, respect_handler_level=True)
+    queue_listener.start()
+    atexit.register(stop_async_logging)
+
+def stop_async_logging():
+    """
+    Дописує записи, що залишились у черзі, і зупиняє потік запису
+    """
+    global queue_listener
+    if queue_listener:
+        queue_listener.stop()
+        queue_listener = None
+
+def get_logging_stats() -> Dict:
+    """
+    Повертає стан черги логування та кількість відкинутих записів
+    """
+    if not queue_handler:
+        return {"async": False}
+    with queue_handler._lock:
+        dropped = dict(queue_handler.dropped)
+    return {
+        "async": True,
+        "queue_size": queue_handler.queue.qsize(),
+        "queue_capacity": queue_handler.queue.maxsize,
+        "dropped": dropped
+    }
+
+if config.LOG_ASYNC:
+    start_async_logging([
+        (main_logger, [main_handler, console_handler]),
+        (telegram_logger, [telegram_handler, console_handler]),
+        (arbitrage_logger, [arbitrage_handler, console_handler]),
+        (users_logger, [users_handler, console_handler]),
+        (triangular_logger, [triangular_handler, console_handler]),
+        (all_opportunities_logger, [all_opportunities_handler])
+    ])
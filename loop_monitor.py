@@ -0,0 +1,202 @@
+# loop_monitor.py
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+from typing import Dict, List, Optional, Tuple
+
+import config
+import metrics
+
+logger = logging.getLogger('main')
+
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "Затримка запуску запланованого таймера в циклі подій",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+).labels()
+LOOP_STALLS = metrics.counter("event_loop_stalls_total", "Блокування циклу подій довші за поріг").labels()
+LOOP_STALL_DURATION = metrics.histogram("event_loop_stall_seconds", "Тривалість блокувань циклу подій").labels()
+
+# Код проєкту (не стандартна бібліотека і не залежності) - туди вказує місце блокування
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Місце, куди зводяться нові місця блокування, коли таблицю заповнено
+OTHER_LOCATION = "<інші>"
+
+def _record_stall_metrics(duration: float):
+    LOOP_STALLS.inc()
+    LOOP_STALL_DURATION.observe(duration)
+
+class LoopMonitor:
+    """
+    Вимірює затримку циклу подій і знаходить код, що його блокує
+
+    Корутина-пульс засинає на interval і фіксує, наскільки пізніше запланованого
+    вона прокинулась (метрика event_loop_lag_seconds). Фоновий потік кожні
+    sample_interval перевіряє, чи пульс не запізнюється більше ніж на threshold;
+    якщо так, цикл подій зайнятий синхронним кодом, і потік знімає стек потоку
+    циклу через sys._current_frames(). Зразки зводяться за місцем у коді
+    проєкту (найглибший кадр з файлів проєкту), тож видно, який саме виклик
+    тримає цикл. Кожне блокування логується зі стеком після свого завершення.
+
+    Пульс і перевірка не залежать від тривалості блокувань, тож у звичайному
+    режимі монітор лише прокидається і порівнює час.
+    """
+    def __init__(self, threshold: float = config.LOOP_MONITOR_THRESHOLD,
+                 interval: float = config.LOOP_MONITOR_INTERVAL,
+                 sample_interval: float = config.LOOP_MONITOR_SAMPLE_INTERVAL,
+                 max_offenders: int = config.LOOP_MONITOR_MAX_OFFENDERS):
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.max_offenders = max_offenders
+
+        self.max_lag = 0.0
+        self.stalls = 0
+        self.blocked_seconds = 0.0
+        self._offenders: Dict[str, Dict] = {}  # Місце в коді -> зведена статистика
+        self._lock = threading.Lock()  # Статистику пише потік монітора, а читає цикл подій
+
+        self._expected = time.monotonic()  # Коли пульс має прокинутись
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """
+        Запускає пульс у поточному циклі подій і потік перевірки
+        """
+        if self._task:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._expected = time.monotonic() + self.interval
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Монітор циклу подій запущено (поріг {self.threshold} с)")
+
+    async def stop(self):
+        """
+        Зупиняє пульс і потік перевірки
+        """
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._expected)
+            EVENT_LOOP_LAG.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def _watch(self):
+        """
+        Потік перевірки: знімає стек потоку циклу, поки пульс запізнюється
+        """
+        samples: Dict[str, int] = {}  # Зразки поточного блокування за місцем
+        stacks: Dict[str, str] = {}
+        overdue = 0.0
+        while not self._stop.wait(self.sample_interval):
+            late = time.monotonic() - self._expected
+            if late > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                location, stack = self._locate(frame)
+                del frame
+                samples[location] = samples.get(location, 0) + 1
+                stacks.setdefault(location, stack)
+                overdue = late
+            elif samples:
+                self._finish_stall(samples, stacks, overdue)
+                samples, stacks, overdue = {}, {}, 0.0
+
+    def _locate(self, frame: FrameType) -> Tuple[str, str]:
+        """
+        Визначає місце блокування та стек для звіту
+
+        Returns:
+            Tuple[str, str]: ("файл:рядок функція" найглибшого кадру проєкту, текст стека)
+        """
+        location = None
+        current = frame
+        while current is not None:
+            filename = current.f_code.co_filename
+            if filename.startswith(PROJECT_DIR) and "site-packages" not in filename:
+                location = f"{os.path.relpath(filename, PROJECT_DIR)}:{current.f_lineno} {current.f_code.co_name}"
+                break
+            current = current.f_back
+        if location is None:
+            location = f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+        stack = "".join(traceback.format_list(traceback.extract_stack(frame, limit=config.LOOP_MONITOR_STACK_DEPTH)))
+        return location, stack
+
+    def _finish_stall(self, samples: Dict[str, int], stacks: Dict[str, str], duration: float):
+        """
+        Зараховує завершене блокування до статистики і логує його
+        """
+        # Метрики оновлюються без блокувань лише з циклу подій, тож передаємо оновлення йому
+        try:
+            self._loop.call_soon_threadsafe(_record_stall_metrics, duration)
+        except RuntimeError:
+            pass  # Цикл подій уже закрито
+        total = sum(samples.values())
+        top_location = max(samples, key=samples.get)
+
+        with self._lock:
+            self.stalls += 1
+            self.blocked_seconds += duration
+            for location, count in samples.items():
+                if location not in self._offenders and len(self._offenders) >= self.max_offenders:
+                    location = OTHER_LOCATION
+                offender = self._offenders.setdefault(location, {
+                    "location": location, "stalls": 0, "samples": 0,
+                    "blocked_seconds": 0.0, "max_stall": 0.0, "stack": stacks.get(location, "")
+                })
+                # Час блокування ділиться між місцями пропорційно кількості зразків
+                share = duration * count / total
+                offender["stalls"] += 1
+                offender["samples"] += count
+                offender["blocked_seconds"] += share
+                offender["max_stall"] = max(offender["max_stall"], share)
+
+        logger.warning(f"Цикл подій заблоковано на {duration:.3f} с, найчастіше в {top_location} "
+                       f"({samples[top_location]} з {total} зразків):\n{stacks[top_location]}")
+
+    def get_stats(self, limit: int = 10) -> Dict:
+        """
+        Повертає затримку циклу і місця, що найдовше його блокували
+
+        Args:
+            limit (int): Кількість місць у звіті
+
+        Returns:
+            Dict: Статистика монітора
+        """
+        with self._lock:
+            offenders = sorted(self._offenders.values(), key=lambda item: item["blocked_seconds"], reverse=True)
+            top: List[Dict] = [dict(item, blocked_seconds=round(item["blocked_seconds"], 3),
+                                    max_stall=round(item["max_stall"], 3)) for item in offenders[:limit]]
+            return {
+                "threshold": self.threshold,
+                "max_lag": round(self.max_lag, 3),
+                "stalls": self.stalls,
+                "blocked_seconds": round(self.blocked_seconds, 3),
+                "offenders": top
+            }
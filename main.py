@@ -3,6 +3,7 @@ import asyncio
 import logging
 import signal
 import sys
+import time
 import traceback
 from datetime import datetime
 import json
@@ -10,10 +11,14 @@ import os
 
 import config
 import logger
+import metrics
+from loop_monitor import LoopMonitor
 from arbitrage.finder import ArbitrageFinder
 from arbitrage.triangular_finder import TriangularArbitrageFinder
+from arbitrage.opportunity_tracker import OpportunityTracker, EVENT_CLOSE
 from exchange_api.factory import ExchangeFactory
 from telegram_worker import TelegramWorker
+from web_server import start_web_server
 
 # Отримуємо логер
 main_logger = logging.getLogger('main')
@@ -23,16 +28,40 @@ running = True
 telegram_worker = None
 arbitrage_finder = None
 triangular_finders = []  # Зберігатимемо об'єкти пошуковиків трикутного арбітражу
+opportunity_tracker = None  # Відстеження можливостей між циклами (сповіщення лише про зміни)
+web_dashboard = None  # Веб-сервер моніторингу (і приймання webhook Telegram)
+loop_monitor = None  # Затримка циклу подій і місця, що його блокують
+
+SCAN_DURATION = metrics.histogram("scan_duration_seconds", "Тривалість пошуку можливостей", ("scan",))
+OPPORTUNITIES_PER_CYCLE = metrics.histogram(
+    "opportunities_per_cycle", "Кількість знайдених можливостей за цикл", ("scan",), buckets=metrics.COUNT_BUCKETS
+)
 
 async def check_arbitrage_opportunities():
     """
     Перевіряє арбітражні можливості та відправляє сповіщення
     """
-    global running, telegram_worker, arbitrage_finder, triangular_finders
+    global running, telegram_worker, arbitrage_finder, triangular_finders, opportunity_tracker, web_dashboard, loop_monitor
     
     try:
+        if config.LOOP_MONITOR_ENABLED:
+            loop_monitor = LoopMonitor()
+            loop_monitor.start()
+        
         # Ініціалізуємо Telegram Worker
         telegram_worker = TelegramWorker(config.TELEGRAM_BOT_TOKEN, config.TELEGRAM_CHAT_ID)
+        
+        # Запускаємо веб-сервер до воркера, щоб webhook був готовий приймати оновлення після реєстрації
+        try:
+            web_dashboard = await start_web_server(telegram_worker, loop_monitor)
+        except Exception as e:
+            main_logger.error(f"Не вдалося запустити веб-сервер: {e}")
+        
+        # Без веб-сервера webhook нікуди не веде - отримуємо оновлення довгим опитуванням
+        if telegram_worker.webhook_mode and not web_dashboard:
+            main_logger.error("Веб-сервер не запущено, webhook вимкнено: оновлення отримуються довгим опитуванням")
+            telegram_worker.webhook_mode = False
+            
         await telegram_worker.start()
         
         # Ініціалізуємо пошуковик крос-біржових арбітражних можливостей
@@ -45,20 +74,24 @@ async def check_arbitrage_opportunities():
         )
         await arbitrage_finder.initialize()
         
+        if config.TRACK_OPPORTUNITIES:
+            opportunity_tracker = OpportunityTracker()
+        
         # Ініціалізуємо пошуковики трикутного арбітражу для кожної біржі
         exchange_names = ['binance', 'kucoin', 'kraken']
         triangular_finders = []
         
         for exchange_name in exchange_names:
             try:
-                # Створюємо об'єкт біржі
+                # Отримуємо спільний об'єкт біржі (той самий, що й у крос-біржового пошуковика)
                 exchange = ExchangeFactory.create(exchange_name)
                 
                 # Створюємо пошуковик трикутного арбітражу
                 triangular_finder = TriangularArbitrageFinder(
                     exchange, 
                     base_currency="USDT",
-                    min_profit=config.TRIANGULAR_MIN_PROFIT_THRESHOLD
+                    min_profit=config.TRIANGULAR_MIN_PROFIT_THRESHOLD,
+                    exchange_key=exchange_name
                 )
                 
                 triangular_finders.append((exchange_name, triangular_finder, exchange))
@@ -89,71 +122,88 @@ async def check_arbitrage_opportunities():
         # Основний цикл роботи
         while running:
             try:
-                # Шукаємо арбітражні можливості
-                main_logger.info(f"Пошук арбітражних можливостей для {len(config.PAIRS)} пар...")
-                cross_opportunities = await arbitrage_finder.find_opportunities()
+                # Крос-біржовий і всі трикутні пошуки виконуються одночасно,
+                # тож тривалість циклу дорівнює найповільнішому пошуку, а не їх сумі
+                main_logger.info(f"Пошук арбітражних можливостей для {len(config.PAIRS)} пар та трикутних можливостей на {len(triangular_finders)} біржах...")
+                scan_results = await asyncio.gather(
+                    # Тікери кожної біржі крос-біржовий пошук обмежує SCAN_TIMEOUT окремо,
+                    # тому загальний ліміт більший, щоб повільна біржа не скасувала порівняння інших
+                    run_scan("крос-біржовий", arbitrage_finder.find_opportunities(), timeout=config.SCAN_TIMEOUT * 2),
+                    *[
+                        run_scan(f"трикутний ({exchange_name})", triangular_finder.find_opportunities(), scan_type="triangular")
+                        for exchange_name, triangular_finder, exchange in triangular_finders
+                    ]
+                )
+                
+                cross_opportunities = scan_results[0]
+                OPPORTUNITIES_PER_CYCLE.labels("cross").observe(len(cross_opportunities))
+                OPPORTUNITIES_PER_CYCLE.labels("triangular").observe(sum(len(result) for result in scan_results[1:]))
                 if cross_opportunities:
                     main_logger.info(f"Знайдено {len(cross_opportunities)} крос-біржових арбітражних можливостей")
+                    if config.ORDERBOOK_SIZING:
+                        # Ордербуки запитуємо лише для знайдених кандидатів
+                        cross_opportunities = await arbitrage_finder.size_opportunities(cross_opportunities)
                 else:
                     main_logger.info("Не знайдено жодної крос-біржової арбітражної можливості")
                 
-                # Логуємо пошук трикутних можливостей
-                main_logger.info("Пошук трикутних арбітражних можливостей...")
-                triangular_opportunities_count = 0
-                all_opportunities = cross_opportunities.copy() if cross_opportunities else []
+                all_opportunities = cross_opportunities.copy()
                 
-                # Шукаємо трикутні арбітражні можливості на кожній біржі
-                for exchange_name, triangular_finder, exchange in triangular_finders:
-                    try:
-                        main_logger.info(f"Шукаємо трикутні можливості на {exchange_name}...")
-                        triangular_opportunities = await triangular_finder.find_opportunities()
-                        if triangular_opportunities:
-                            all_opportunities.extend(triangular_opportunities)
-                            triangular_opportunities_count += len(triangular_opportunities)
-                            main_logger.info(f"Знайдено {len(triangular_opportunities)} трикутних можливостей на {exchange_name}")
-                        else:
-                            main_logger.info(f"Не знайдено трикутних можливостей на {exchange_name}")
-                    except Exception as e:
-                        main_logger.error(f"Помилка при пошуку трикутних можливостей на {exchange_name}: {e}")
-                        main_logger.error(traceback.format_exc())
+                for (exchange_name, _, _), triangular_opportunities in zip(triangular_finders, scan_results[1:]):
+                    if triangular_opportunities:
+                        all_opportunities.extend(triangular_opportunities)
+                        main_logger.info(f"Знайдено {len(triangular_opportunities)} трикутних можливостей на {exchange_name}")
+                    else:
+                        main_logger.info(f"Не знайдено трикутних можливостей на {exchange_name}")
+                
+                if not all_opportunities:
+                    main_logger.info("Не знайдено жодної арбітражної можливості")
+                
+                # Трекер залишає лише нові, суттєво змінені та закриті можливості
+                if opportunity_tracker:
+                    events = opportunity_tracker.update(all_opportunities)
+                    notified_states = {state.key: state for event, state in events if event != EVENT_CLOSE}
+                    opportunities_to_notify = [state.opportunity for state in notified_states.values()]
+                    closed_opportunities = [state for event, state in events if event == EVENT_CLOSE]
+                else:
+                    notified_states = None
+                    opportunities_to_notify = all_opportunities
+                    closed_opportunities = []
                 
                 # Якщо є можливості, відправляємо повідомлення
-                if all_opportunities:
-                    main_logger.info(f"Підготовка до відправки повідомлень про {len(all_opportunities)} можливостей...")
+                if opportunities_to_notify or closed_opportunities:
+                    main_logger.info(f"Підготовка до відправки повідомлень про {len(opportunities_to_notify)} можливостей "
+                                     f"та {len(closed_opportunities)} закритих...")
                     
-                    for index, opp in enumerate(all_opportunities):
-                        try:
-                            main_logger.info(f"Обробка можливості #{index+1}: {opp.symbol}, {opp.profit_percent:.2f}%")
-                            message = opp.to_message()
-                            main_logger.debug(f"Сформовано повідомлення для {opp.symbol}")
-                            
-                            # Надсилаємо повідомлення користувачам
-                            delivery_success = await telegram_worker.notify_about_opportunity(message)
-                            
-                            if delivery_success:
-                                main_logger.info(f"Повідомлення про можливість {opp.symbol} успішно надіслано")
-                            else:
-                                main_logger.warning(f"Не вдалося надіслати повідомлення про можливість {opp.symbol}")
-                                
-                        except Exception as e:
-                            main_logger.error(f"Помилка при обробці можливості {opp.symbol}: {e}")
-                            main_logger.error(traceback.format_exc())
-                else:
-                    main_logger.info("Не знайдено жодної арбітражної можливості")
+                    try:
+                        # Передаємо можливості як є: отримувачі визначаються за їх полями
+                        if opportunities_to_notify:
+                            delivered_count = await telegram_worker.notify_opportunities(opportunities_to_notify, notified_states)
+                            main_logger.info(f"Надіслано повідомлення про {delivered_count} з {len(opportunities_to_notify)} можливостей")
+                        if closed_opportunities:
+                            await telegram_worker.notify_closed_opportunities(closed_opportunities)
+                    except Exception as e:
+                        main_logger.error(f"Помилка при відправці повідомлень про можливості: {e}")
+                        main_logger.error(traceback.format_exc())
                 
                 # Зберігаємо статус у JSON-файл
                 status = {
                     "last_check": datetime.now().isoformat(),
                     "opportunities_found": len(all_opportunities),
-                    "cross_opportunities": len(cross_opportunities) if 'cross_opportunities' in locals() else 0,
-                    "triangular_opportunities": len(all_opportunities) - (len(cross_opportunities) if 'cross_opportunities' in locals() else 0),
+                    "cross_opportunities": len(cross_opportunities),
+                    "triangular_opportunities": len(all_opportunities) - len(cross_opportunities),
                     "running": running,
                     "include_fees": config.INCLUDE_FEES,
                     "buy_fee_type": config.BUY_FEE_TYPE,
                     "sell_fee_type": config.SELL_FEE_TYPE,
-                    "active_users": len(telegram_worker.user_manager.get_active_approved_users())
+                    "active_users": telegram_worker.user_manager.count_active_approved_users()
                 }
                 
+                if opportunity_tracker:
+                    status["opportunity_lifetimes"] = opportunity_tracker.get_stats()
+                    
+                # Стан черги логування (кількість відкинутих записів)
+                status["logging"] = logger.get_logging_stats()
+                
                 # Якщо є можливості, додаємо їх у статус
                 if all_opportunities:
                     status["top_opportunities"] = [opp.to_dict() for opp in all_opportunities[:5]]
@@ -182,21 +232,49 @@ async def check_arbitrage_opportunities():
         # Закриваємо всі ресурси
         await cleanup()
 
+async def run_scan(scan_name: str, scan, timeout: float = config.SCAN_TIMEOUT, scan_type: str = "cross") -> list:
+    """
+    Виконує один пошук можливостей з обмеженням часу
+    
+    Args:
+        scan_name (str): Назва пошуку для логів
+        scan: Корутина пошуку, що повертає список можливостей
+        timeout (float): Граничний час пошуку в секундах
+        scan_type (str): Тип пошуку для метрик ("cross" або "triangular")
+        
+    Returns:
+        list: Знайдені можливості або порожній список у разі помилки чи таймауту
+    """
+    start_time = time.perf_counter()
+    try:
+        return await asyncio.wait_for(scan, timeout=timeout) or []
+    except asyncio.TimeoutError:
+        main_logger.warning(f"Пошук {scan_name} не завершився за {timeout} с. Результати пропущено")
+    except Exception as e:
+        main_logger.error(f"Помилка при пошуку {scan_name}: {e}")
+        main_logger.error(traceback.format_exc())
+    finally:
+        SCAN_DURATION.labels(scan_type).observe(time.perf_counter() - start_time)
+    return []
+
 async def cleanup():
     """
     Закриває всі ресурси при зупинці програми
     """
+    global triangular_finders
+    
     main_logger.info(f"Зупинка {config.APP_NAME}...")
     
     if arbitrage_finder:
         await arbitrage_finder.close_exchanges()
     
-    # Закриваємо з'єднання з біржами для трикутного арбітражу
+    # Звільняємо спільні об'єкти бірж трикутного арбітражу
     for _, _, exchange in triangular_finders:
         try:
-            await exchange.close()
+            await ExchangeFactory.release(exchange)
         except Exception as e:
             main_logger.error(f"Помилка при закритті з'єднання з біржею: {e}")
+    triangular_finders = []
         
     if telegram_worker:
         # Повідомляємо адміністраторів про зупинку
@@ -211,6 +289,12 @@ async def cleanup():
             
         await telegram_worker.stop()
         
+    if web_dashboard:
+        await web_dashboard.stop()
+        
+    if loop_monitor:
+        await loop_monitor.stop()
+        
     main_logger.info(f"{config.APP_NAME} успішно зупинено")
 
 def signal_handler():
@@ -0,0 +1,195 @@
+# metrics.py
+import logging
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+logger = logging.getLogger('main')
+
+# Межі кошиків гістограм за замовчуванням (секунди)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Межі кошиків для кількостей (можливостей за цикл, довжини черги)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+class Counter:
+    """
+    Лічильник, що лише зростає
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [("", "", self.value)]
+
+class Gauge:
+    """
+    Поточне значення; з set_function() значення обчислюється лише під час зчитування метрик
+    """
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        self.function = function
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.warning(f"Помилка при обчисленні метрики: {e}")
+        return [("", "", value)]
+
+class Histogram:
+    """
+    Гістограма з фіксованими кошиками
+
+    observe() лише знаходить кошик бінарним пошуком і збільшує його лічильник;
+    накопичувальні значення для Prometheus рахуються під час зчитування.
+    """
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # Останній кошик - +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        result = []
+        total = 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            total += count
+            result.append(("_bucket", f'le="{_format_value(bound)}"', total))
+        result.append(("_sum", "", self.sum))
+        result.append(("_count", "", total))
+        return result
+
+class MetricFamily:
+    """
+    Метрика з набором міток: для кожного набору значень міток створюється окремий екземпляр
+
+    Екземпляр, отриманий через labels(), можна зберегти і використовувати повторно,
+    щоб гарячий шлях не шукав його в словнику при кожному спостереженні
+    (для метрики без міток - labels() без аргументів).
+    """
+    def __init__(self, name: str, documentation: str, metric_type: str,
+                 label_names: Sequence[str], factory: Callable[[], object]):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self._children[()] = factory()
+
+    def labels(self, *values: str):
+        """
+        Повертає екземпляр метрики для вказаних значень міток
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"Метрика {self.name} очікує мітки {self.label_names}, отримано {values}")
+            child = self._children[values] = self._factory()
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for values, child in list(self._children.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, values)]
+            for suffix, extra, value in child.samples():
+                sample_labels = labels + [extra] if extra else labels
+                label_text = "{" + ",".join(sample_labels) + "}" if sample_labels else ""
+                lines.append(f"{self.name}{suffix}{label_text} {_format_value(value)}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Реєстр метрик процесу
+
+    Як logging.getLogger(), повторний запит метрики з тією ж назвою повертає
+    вже зареєстровану, тож модулі оголошують свої метрики незалежно.
+    Запис виконується без блокувань: метрики оновлюються з циклу подій,
+    а зчитування (render) теж відбувається в ньому.
+    """
+    def __init__(self, prefix: str = config.METRICS_PREFIX):
+        self.prefix = prefix
+        self._families: Dict[str, MetricFamily] = {}
+
+    def _register(self, name: str, documentation: str, metric_type: str,
+                  label_names: Sequence[str], factory: Callable[[], object]) -> MetricFamily:
+        full_name = f"{self.prefix}_{name}" if self.prefix else name
+        family = self._families.get(full_name)
+        if family is None:
+            family = self._families[full_name] = MetricFamily(full_name, documentation, metric_type, label_names, factory)
+        elif family.metric_type != metric_type or family.label_names != tuple(label_names):
+            raise ValueError(f"Метрику {full_name} вже зареєстровано з іншим типом або мітками")
+        return family
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, documentation, "counter", label_names, Counter)
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, documentation, "gauge", label_names, Gauge)
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(name, documentation, "histogram", label_names, lambda: Histogram(buckets))
+
+    def render(self) -> str:
+        """
+        Формує всі метрики в текстовому форматі Prometheus
+        """
+        lines = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Спільний реєстр процесу
+REGISTRY = MetricsRegistry()
+
+def counter(name: str, documentation: str, label_names: Sequence[str] = ()) -> MetricFamily:
+    return REGISTRY.counter(name, documentation, label_names)
+
+def gauge(name: str, documentation: str, label_names: Sequence[str] = ()) -> MetricFamily:
+    return REGISTRY.gauge(name, documentation, label_names)
+
+def histogram(name: str, documentation: str, label_names: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+    return REGISTRY.histogram(name, documentation, label_names, buckets)
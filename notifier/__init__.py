@@ -1,5 +1,5 @@
 # notifier/__init__.py
 from notifier.base_notifier import BaseNotifier
-from notifier.telegram_notifier import TelegramNotifier
+from notifier.telegram_notifier import TelegramNotifier, PRIORITY_INTERACTIVE, PRIORITY_ALERT, PRIORITY_ADMIN
 
-__all__ = ['BaseNotifier', 'TelegramNotifier']
+__all__ = ['BaseNotifier', 'TelegramNotifier', 'PRIORITY_INTERACTIVE', 'PRIORITY_ALERT', 'PRIORITY_ADMIN']
@@ -0,0 +1,129 @@
+# notifier/digest.py
+import heapq
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import config
+
+# Максимальна довжина тексту одного повідомлення Telegram
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+class DigestBuffer:
+    """
+    Накопичувач сповіщень для користувачів у режимі дайджесту
+
+    Для кожного користувача тримається кільцевий буфер (deque з maxlen) пар
+    (ключ можливості, рядок). Рядок формується один раз на можливість і
+    спільний для всіх отримувачів, тож буфер зберігає лише посилання.
+    Користувач потрапляє в купу готовності лише тоді, коли його буфер стає
+    непорожнім, тож робота пропорційна кількості вікон, а не можливостей.
+    Запис купи дійсний, лише поки його час збігається з _deadlines[user_id]:
+    discard() прибирає час, і застарілий запис пропускається при вибірці.
+    """
+    def __init__(self, capacity: int = config.DIGEST_BUFFER_SIZE):
+        self.capacity = capacity
+        self._buffers: Dict[str, Deque[Tuple[str, str]]] = {}
+        self._dropped: Dict[str, int] = {}  # Записи, витіснені з переповненого буфера
+        self._due: List[Tuple[float, str]] = []  # Купа (час відправки, user_id)
+        self._deadlines: Dict[str, float] = {}  # Час відправки поточного дайджесту користувача
+
+    def add(self, user_id: str, key: str, line: str, interval: float, now: Optional[float] = None):
+        """
+        Додає рядок можливості до дайджесту користувача
+
+        Args:
+            user_id (str): ID користувача
+            key (str): Ключ можливості (повторні оновлення замінюють попередній рядок)
+            line (str): Рядок можливості
+            interval (float): Вікно дайджесту користувача (секунд)
+            now (Optional[float]): Поточний час (time.monotonic())
+        """
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            buffer = self._buffers[user_id] = deque(maxlen=self.capacity)
+            deadline = self._deadlines[user_id] = (now if now is not None else time.monotonic()) + interval
+            heapq.heappush(self._due, (deadline, user_id))
+        elif len(buffer) == self.capacity:
+            self._dropped[user_id] = self._dropped.get(user_id, 0) + 1
+        buffer.append((key, line))
+
+    def pop_due(self, now: Optional[float] = None) -> List[Tuple[str, List[str], int]]:
+        """
+        Забирає дайджести, вікно яких завершилось
+
+        Returns:
+            List[Tuple[str, List[str], int]]: (user_id, рядки, кількість витіснених записів)
+        """
+        now = now if now is not None else time.monotonic()
+        result = []
+        while self._due and self._due[0][0] <= now:
+            deadline, user_id = heapq.heappop(self._due)
+            # Запис дайджесту, видаленого через discard(), або попереднього вікна
+            if self._deadlines.get(user_id) != deadline:
+                continue
+            result.append(self._take(user_id))
+        return result
+
+    def pop_all(self) -> List[Tuple[str, List[str], int]]:
+        """
+        Забирає всі накопичені дайджести незалежно від вікна (при зупинці)
+
+        Returns:
+            List[Tuple[str, List[str], int]]: (user_id, рядки, кількість витіснених записів)
+        """
+        result = [self._take(user_id) for user_id in list(self._buffers)]
+        self._due = []
+        return result
+
+    def _take(self, user_id: str) -> Tuple[str, List[str], int]:
+        self._deadlines.pop(user_id, None)
+        buffer = self._buffers.pop(user_id)
+        # Для можливості, що оновлювалась у вікні, залишаємо останній рядок на місці першої появи
+        lines: Dict[str, str] = {}
+        for key, line in buffer:
+            lines[key] = line
+        return user_id, list(lines.values()), self._dropped.pop(user_id, 0)
+
+    def discard(self, user_id: str):
+        """
+        Видаляє накопичений дайджест користувача (наприклад, після переходу в режим instant)
+        """
+        self._buffers.pop(user_id, None)
+        self._dropped.pop(user_id, None)
+        self._deadlines.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+def render_digest(lines: List[str], dropped: int = 0, limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """
+    Формує текст дайджесту, розбитий на повідомлення не довші за limit символів
+
+    Args:
+        lines (List[str]): Рядки можливостей
+        dropped (int): Кількість записів, що не вмістились у буфер
+        limit (int): Максимальна довжина одного повідомлення
+
+    Returns:
+        List[str]: Тексти повідомлень
+    """
+    header = f"<b>📋 Дайджест: {len(lines)} можливостей</b>\n\n"
+    footer = f"\n…та ще {dropped} оновлень не вмістились у дайджест" if dropped else ""
+
+    messages = []
+    current = header
+    for line in lines:
+        if len(current) + len(line) + 1 > limit:
+            messages.append(current.rstrip("\n"))
+            current = ""
+        current += line + "\n"
+
+    if footer:
+        if len(current) + len(footer) > limit:
+            messages.append(current.rstrip("\n"))
+            current = ""
+        current += footer
+    if current.strip():
+        messages.append(current.rstrip("\n"))
+    return messages
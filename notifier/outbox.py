@@ -0,0 +1,353 @@
+# notifier/outbox.py
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+
+import config
+
+logger = logging.getLogger('telegram')
+
+class DurableOutbox:
+    """
+    Черга повідомлень Telegram, що зберігається на диску
+
+    Має той самий інтерфейс, що й asyncio.Queue (put, get, task_done, join, qsize),
+    тож передається в TelegramNotifier замість неї.
+
+    - outbox.log - журнал повідомлень, до якого лише дописується (JSON-рядок на повідомлення з id);
+    - outbox.acks - журнал id доставлених (або остаточно відхилених) повідомлень.
+
+    Записи скидаються на диск пакетами (один fsync на інтервал flush_interval).
+    У пам'яті тримається не більше window повідомлень, решта читається з журналу
+    в міру звільнення вікна. Коли підтверджених записів стає багато, журнал
+    переписується лише з непідтвердженими повідомленнями (компактація).
+    fsync і переписування журналу виконуються в окремому потоці, тож цикл подій
+    не чекає на диск; дописування в журнали не перетинаються зі скиданням
+    буферів завдяки _write_lock, а fsync і компактація не виконуються одночасно.
+    Після перезапуску open() відтворює всі непідтверджені повідомлення.
+    """
+    def __init__(self, directory: str = config.OUTBOX_DIR, window: int = config.OUTBOX_WINDOW,
+                 flush_interval: float = config.OUTBOX_FLUSH_INTERVAL,
+                 compact_threshold: int = config.OUTBOX_COMPACT_THRESHOLD):
+        self.directory = directory
+        self.window = window
+        self.flush_interval = flush_interval
+        self.compact_threshold = compact_threshold
+        self.log_path = os.path.join(directory, "outbox.log")
+        self.acks_path = os.path.join(directory, "outbox.acks")
+
+        self._log_file = None
+        self._acks_file = None
+        self._dirty = False
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()  # Дописування в журнали та скидання їх буферів
+        self._disk_lock = asyncio.Lock()  # fsync, компактація та закриття журналів
+        self._compacting = False
+
+        self._next_id = 1
+        self._memory: Deque[Dict] = deque()  # Завантажені, ще не видані get() повідомлення
+        self._in_flight: Dict[int, Dict] = {}  # Видані get(), але не підтверджені
+        # Вихідні рядки журналу повідомлень у пам'яті: записи змінюються відправником, а компактація
+        # має переносити саме те, що було передано в put()
+        self._lines: Dict[int, bytes] = {}
+        self._read_offset = 0  # Позиція в журналі, з якої починаються ще не завантажені повідомлення
+        self._valid_end = 0  # Кінець останнього повного рядка, прочитаного _iter_records()
+        self._acked: Set[int] = set()  # Підтверджені id, записи яких ще є в журналі
+        self._pending = 0  # Кількість непідтверджених повідомлень (у пам'яті та на диску)
+        self._unfinished = 0  # Лічильник для join(), як в asyncio.Queue
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._available = asyncio.Event()
+
+    async def open(self) -> int:
+        """
+        Відкриває журнали та відтворює непідтверджені повідомлення
+
+        Returns:
+            int: Кількість відтворених повідомлень
+        """
+        os.makedirs(self.directory, exist_ok=True)
+
+        if os.path.exists(self.acks_path):
+            with open(self.acks_path, "r", encoding="utf-8") as f:
+                self._acked = {int(line) for line in f if line.strip().isdigit()}
+
+        pending = 0
+        max_id = max(self._acked, default=0)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "r+b") as f:
+                for record in self._iter_records(f):
+                    max_id = max(max_id, record["outbox_id"])
+                    if record["outbox_id"] not in self._acked:
+                        pending += 1
+
+                # Обрізаємо неповний рядок, що міг залишитись після аварійної зупинки
+                valid_end = self._valid_end
+                if valid_end < os.path.getsize(self.log_path):
+                    logger.warning(f"Журнал {self.log_path} містить неповний запис, обрізаємо його")
+                    f.truncate(valid_end)
+
+        self._next_id = max_id + 1
+        self._pending = pending
+        self._unfinished = pending
+        if pending:
+            self._finished.clear()
+
+        self._log_file = open(self.log_path, "ab")
+        self._acks_file = open(self.acks_path, "a", encoding="utf-8")
+        self._read_offset = 0
+        self._refill()
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Черга повідомлень на диску відкрита: {pending} непідтверджених повідомлень")
+        return pending
+
+    async def close(self):
+        """
+        Скидає журнали на диск і закриває їх (непідтверджені повідомлення залишаються в журналі)
+        """
+        async with self._disk_lock:
+            if self._flush_task:
+                self._flush_task.cancel()
+                try:
+                    await self._flush_task
+                except asyncio.CancelledError:
+                    pass
+                self._flush_task = None
+
+            if self._log_file:
+                await asyncio.to_thread(self._sync)
+                self._log_file.close()
+                self._acks_file.close()
+                self._log_file = None
+                self._acks_file = None
+                logger.info(f"Черга повідомлень на диску закрита: {self._pending} непідтверджених повідомлень")
+
+    async def put(self, item: Dict):
+        """
+        Дописує повідомлення в журнал і, якщо є місце у вікні, у пам'ять
+        """
+        record = dict(item, outbox_id=self._next_id)
+        self._next_id += 1
+
+        line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+        with self._write_lock:
+            # Якщо в журналі немає незавантажених повідомлень, нове можна одразу взяти у вікно
+            # (під час компактації нові записи лише дописуються і будуть довантажені з нового журналу)
+            caught_up = not self._compacting and self._read_offset == self._log_file.tell()
+            self._log_file.write(line)
+            self._dirty = True
+            if caught_up and len(self._memory) < self.window:
+                self._memory.append(record)
+                self._lines[record["outbox_id"]] = line
+                self._read_offset = self._log_file.tell()
+                self._available.set()
+
+        self._pending += 1
+        self._unfinished += 1
+        self._finished.clear()
+
+    async def get(self) -> Dict:
+        """
+        Повертає наступне повідомлення (чекає, якщо черга порожня)
+        """
+        while not self._memory:
+            self._available.clear()
+            await self._available.wait()
+
+        record = self._memory.popleft()
+        self._in_flight[record["outbox_id"]] = record
+        if len(self._memory) < max(1, self.window // 2):
+            self._refill()
+        return record
+
+    def ack(self, item: Dict):
+        """
+        Позначає повідомлення як оброблене, щоб воно не відтворювалось після перезапуску
+        """
+        outbox_id = item.get("outbox_id")
+        if outbox_id is None or self._in_flight.pop(outbox_id, None) is None:
+            return
+
+        self._acked.add(outbox_id)
+        self._lines.pop(outbox_id, None)
+        with self._write_lock:
+            self._acks_file.write(f"{outbox_id}\n")
+            self._dirty = True
+        self._pending -= 1
+
+    def task_done(self):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    def qsize(self) -> int:
+        """
+        Кількість повідомлень, що очікують на видачу (у пам'яті та на диску)
+        """
+        return self._pending - len(self._in_flight)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def _iter_records(self, f):
+        """
+        Читає записи журналу з поточної позиції файлу (неповний останній рядок пропускається)
+        """
+        self._valid_end = f.tell()
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            self._valid_end += len(line)
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Пошкоджений запис у {self.log_path} пропущено")
+
+    def _refill(self):
+        """
+        Довантажує повідомлення з журналу у вікно пам'яті
+        """
+        if len(self._memory) >= self.window or self._compacting:
+            return
+
+        with self._write_lock:
+            self._log_file.flush()
+            end = self._log_file.tell()
+        if self._read_offset >= end:
+            return
+
+        with open(self.log_path, "rb") as f:
+            f.seek(self._read_offset)
+            while len(self._memory) < self.window:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                self._read_offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Пошкоджений запис у {self.log_path} пропущено")
+                    continue
+                if record["outbox_id"] not in self._acked:
+                    self._memory.append(record)
+                    self._lines[record["outbox_id"]] = line
+
+        if self._memory:
+            self._available.set()
+
+    async def _compact(self):
+        """
+        Переписує журнал лише з непідтвердженими повідомленнями та очищає журнал підтверджень
+
+        Новий журнал записується в окремому потоці за знімком стану; повідомлення,
+        дописані за цей час, переносяться в нього вже в циклі подій перед заміною файлу.
+        """
+        with self._write_lock:
+            self._log_file.flush()
+            end = self._log_file.tell()
+        # Записи у вікні пам'яті можуть змінюватись відправником, тож переносимо їх вихідні рядки
+        lines = [self._lines[record["outbox_id"]] for record in list(self._in_flight.values()) + list(self._memory)]
+        acked = set(self._acked)
+        temp_path = self.log_path + ".tmp"
+
+        self._compacting = True
+        try:
+            read_offset = await asyncio.to_thread(self._write_compacted, temp_path, lines, self._read_offset, end, acked)
+
+            with self._write_lock:
+                # Повідомлення, дописані під час компактації, переносимо без змін
+                self._log_file.flush()
+                with open(self.log_path, "rb") as f, open(temp_path, "ab") as out:
+                    f.seek(end)
+                    out.write(f.read())
+
+                self._log_file.close()
+                os.replace(temp_path, self.log_path)
+                self._log_file = open(self.log_path, "ab")
+                self._read_offset = read_offset
+
+                # Підтвердження, що залишились у старому журналі, більше не потрібні (id не повторюються);
+                # підтвердження, отримані під час компактації, стосуються записів нового журналу
+                self._acks_file.close()
+                self._acks_file = open(self.acks_path, "w", encoding="utf-8")
+                self._acked -= acked
+                for outbox_id in self._acked:
+                    self._acks_file.write(f"{outbox_id}\n")
+                self._dirty = True
+        finally:
+            self._compacting = False
+
+        logger.info(f"Журнал черги повідомлень стиснуто: видалено {len(acked)} підтверджених записів")
+        self._refill()
+
+    def _write_compacted(self, temp_path: str, lines: List[bytes], read_offset: int, end: int,
+                         acked: Set[int]) -> int:
+        """
+        Записує новий журнал: повідомлення вікна пам'яті та непідтверджені незавантажені записи
+
+        Returns:
+            int: Позиція в новому журналі, з якої починаються незавантажені повідомлення
+        """
+        with open(temp_path, "wb") as out:
+            out.writelines(lines)
+            new_read_offset = out.tell()
+
+            # Незавантажені повідомлення переносимо без змін
+            with open(self.log_path, "rb") as f:
+                f.seek(read_offset)
+                while f.tell() < end:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Пошкоджений запис у {self.log_path} пропущено")
+                        continue
+                    if record["outbox_id"] not in acked:
+                        out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        return new_read_offset
+
+    def _sync(self):
+        """
+        Скидає буфери журналів і виконує fsync (викликається в окремому потоці)
+        """
+        with self._write_lock:
+            self._dirty = False
+            self._log_file.flush()
+            self._acks_file.flush()
+            log_fd = self._log_file.fileno()
+            acks_fd = self._acks_file.fileno()
+        try:
+            os.fsync(log_fd)
+            os.fsync(acks_fd)
+        except Exception:
+            self._dirty = True
+            raise
+
+    async def _flush_loop(self):
+        """
+        Періодично скидає журнали на диск одним fsync на пакет записів і стискає журнал
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            async with self._disk_lock:
+                try:
+                    if len(self._acked) >= self.compact_threshold:
+                        await self._compact()
+                    elif self._dirty:
+                        await asyncio.to_thread(self._sync)
+                except Exception as e:
+                    logger.error(f"Помилка при збереженні черги повідомлень на диск: {e}")
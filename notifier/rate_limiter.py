@@ -0,0 +1,63 @@
+# notifier/rate_limiter.py
+import asyncio
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Відро токенів для обмеження частоти запитів
+
+    Токени відновлюються зі швидкістю rate за секунду до ємності capacity.
+    Після відповіді 429 відро можна призупинити на retry_after секунд.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready_at(self) -> float:
+        """
+        Повертає момент (time.monotonic()), коли буде доступний наступний токен
+        """
+        now = time.monotonic()
+        self._refill(now)
+        ready = now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+        return max(ready, self.paused_until)
+
+    def try_consume(self) -> bool:
+        """
+        Забирає токен, якщо він доступний
+        """
+        if self.ready_at() > time.monotonic():
+            return False
+        self.tokens -= 1
+        return True
+
+    async def acquire(self):
+        """
+        Чекає на токен і забирає його
+        """
+        while not self.try_consume():
+            await asyncio.sleep(max(self.ready_at() - time.monotonic(), 0.001))
+
+    def pause(self, seconds: float):
+        """
+        Призупиняє видачу токенів (наприклад, на retry_after з відповіді 429)
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def is_idle(self) -> bool:
+        """
+        Чи відро повне і не призупинене (його можна видалити без втрати стану)
+        """
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and self.paused_until <= now
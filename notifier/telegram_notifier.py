@@ -1,30 +1,87 @@
 # notifier/telegram_notifier.py
 import logging
 import asyncio
+import heapq
+import itertools
 import time
-from typing import Any, Dict, Optional
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
 import aiohttp
 
 from notifier.base_notifier import BaseNotifier
+from notifier.rate_limiter import TokenBucket
+from notifier.outbox import DurableOutbox
 import config
+import metrics
 
 logger = logging.getLogger('telegram')
 
+QUEUE_DEPTH = metrics.histogram(
+    "telegram_queue_depth", "Довжина черги повідомлень на момент додавання", buckets=metrics.COUNT_BUCKETS
+).labels()
+QUEUE_SIZE = metrics.gauge("telegram_queue_size", "Поточна довжина черги повідомлень").labels()
+SEND_LATENCY = metrics.histogram("telegram_api_seconds", "Час відповіді Bot API", ("method",))
+THROTTLED = metrics.counter("telegram_throttled_total", "Відповіді 429 від Bot API").labels()
+RETRIES = metrics.counter("telegram_retries_total", "Повторні спроби відправки після помилки").labels()
+
+# Пріоритети повідомлень (менше значення - раніше відправляється)
+PRIORITY_INTERACTIVE = 0  # Відповіді на команди користувачів
+PRIORITY_ALERT = 1  # Сповіщення про арбітражні можливості (застарілі відкидаються)
+PRIORITY_ADMIN = 2  # Службові повідомлення адміністраторам
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_ALERT, PRIORITY_ADMIN)
+
 class TelegramNotifier(BaseNotifier):
     """
     Клас для надсилання повідомлень у Telegram
     """
-    def __init__(self, bot_token: str, default_chat_id: str, queue: asyncio.Queue):
+    def __init__(self, bot_token: str, default_chat_id: str, queue: Union[asyncio.Queue, DurableOutbox],
+                 workers: int = config.TELEGRAM_SENDER_WORKERS,
+                 global_rate: float = config.TELEGRAM_GLOBAL_RATE,
+                 chat_rate: float = config.TELEGRAM_CHAT_RATE,
+                 api_url: str = config.TELEGRAM_API_URL,
+                 alert_ttl: float = config.ALERT_TTL,
+                 backlog_limit: int = config.TELEGRAM_BACKLOG_LIMIT,
+                 edit_cache_size: int = config.TELEGRAM_EDIT_CACHE_SIZE):
         self.bot_token = bot_token
         self.default_chat_id = default_chat_id
         self.queue = queue
+        QUEUE_SIZE.set_function(queue.qsize)
+        self.api_url = api_url.rstrip("/")
         self.session: Optional[aiohttp.ClientSession] = None
-        self.last_sent_time = 0  # Час останньої відправки повідомлення
-        self.rate_limit = 0.5  # Мінімальний інтервал між повідомленнями в секундах
+        self.workers = workers  # Кількість одночасних відправників
+        self.chat_rate = chat_rate  # Повідомлень за секунду в один чат
+        self.global_bucket = TokenBucket(global_rate, 1)  # Загальний ліміт бота на всі чати (рівномірно, без сплесків)
+        self.alert_ttl = alert_ttl  # Сповіщення, старші за цей час (секунд), не відправляються
+        self.backlog_limit = backlog_limit  # Максимум повідомлень з черги в планувальнику одночасно
         self.retry_count = 3  # Кількість повторних спроб
         self.retry_delay = 2  # Затримка між повторними спробами в секундах
         self.messages_sent = 0  # Лічильник відправлених повідомлень
         self.messages_failed = 0  # Лічильник невдалих відправок
+        self.messages_throttled = 0  # Лічильник відповідей 429
+        self.messages_expired = 0  # Лічильник відкинутих застарілих сповіщень
+        self.messages_edited = 0  # Лічильник відредагованих повідомлень
+        self.messages_coalesced = 0  # Лічильник оновлень, злитих з ще не відправленим повідомленням
+        
+        # message_id надісланих сповіщень за (чат, ключ можливості) для editMessageText (LRU)
+        self.edit_cache_size = edit_cache_size
+        self._message_ids: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._pending_edits: Dict[Tuple[str, str], Dict] = {}  # Ще не відправлені повідомлення з ключем
+        # id(повідомлення) -> злиті з ним повідомлення; зберігається окремо, щоб запис у черзі на диску не змінювався
+        self._merged: Dict[int, List[Dict]] = {}
+        
+        # Планувальник: у кожного чату свої черги за пріоритетами та відро токенів.
+        # Для кожного пріоритету є heap чатів, впорядкованих за моментом готовності;
+        # чат потрапляє в heap пріоритету свого першого повідомлення. Чат, що очікує
+        # на свій ліміт, не займає відправника, тож інші чати не блокуються.
+        self._chat_lanes: Dict[str, List[Deque[Dict]]] = {}
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._ready: List[List[Tuple[float, int, str]]] = [[] for _ in PRIORITIES]
+        self._scheduled: Dict[str, Tuple[int, int]] = {}  # чат -> (seq, пріоритет) його дійсного запису в heap
+        self._in_flight = set()  # Чати, повідомлення яких зараз відправляється
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._backlog = 0  # Повідомлення з черги, що зараз у планувальнику
+        self._backlog_freed = asyncio.Event()
         
     async def initialize(self):
         """
@@ -42,111 +99,353 @@ class TelegramNotifier(BaseNotifier):
             self.session = None
             logger.info("HTTP-сесію закрито")
             
-    async def send_message(self, message: str, chat_id: Optional[str] = None) -> bool:
+    async def send_message(self, message: str, chat_id: Optional[str] = None,
+                           priority: int = PRIORITY_ADMIN, edit_key: Optional[str] = None,
+                           final: bool = False) -> bool:
         """
         Ставить повідомлення в чергу на відправку
         """
-        if chat_id is None:
-            chat_id = self.default_chat_id
-            
-        await self.queue.put({"message": message, "parse_mode": None, "chat_id": chat_id})
-        logger.debug(f"Повідомлення для {chat_id} додано в чергу. Поточна довжина черги: {self.queue.qsize()}")
-        return True
+        return await self._enqueue(message, None, chat_id, priority, edit_key, final)
         
-    async def send_formatted_message(self, message: str, chat_id: Optional[str] = None, parse_mode: str = "HTML") -> bool:
+    async def send_formatted_message(self, message: str, chat_id: Optional[str] = None, parse_mode: str = "HTML",
+                                     priority: int = PRIORITY_ADMIN, edit_key: Optional[str] = None,
+                                     final: bool = False) -> bool:
         """
         Ставить форматоване повідомлення в чергу на відправку
         """
+        return await self._enqueue(message, parse_mode, chat_id, priority, edit_key, final)
+        
+    async def _enqueue(self, message: str, parse_mode: Optional[str], chat_id: Optional[str], priority: int,
+                       edit_key: Optional[str] = None, final: bool = False) -> bool:
+        """
+        Додає повідомлення до черги
+        
+        Відповіді на команди одразу потрапляють у планувальник, оминаючи загальну чергу,
+        тож їх не затримує велика розсилка, що стоїть у черзі перед ними.
+        
+        Повідомлення з edit_key редагує (editMessageText) останнє надіслане в цей чат
+        повідомлення з тим самим ключем, а якщо його немає - надсилається як нове.
+        Після повідомлення з final=True ключ забувається.
+        """
         if chat_id is None:
             chat_id = self.default_chat_id
             
-        await self.queue.put({"message": message, "parse_mode": parse_mode, "chat_id": chat_id})
-        logger.debug(f"Форматоване повідомлення для {chat_id} додано в чергу. Поточна довжина черги: {self.queue.qsize()}")
+        message_data = {
+            "message": message,
+            "parse_mode": parse_mode,
+            "chat_id": chat_id,
+            "priority": priority,
+            "created_at": time.time()
+        }
+        if edit_key:
+            message_data["edit_key"] = edit_key
+            message_data["final"] = final
+        
+        if priority == PRIORITY_INTERACTIVE:
+            message_data["direct"] = True
+            self._schedule(message_data)
+        else:
+            QUEUE_DEPTH.observe(self.queue.qsize())
+            await self.queue.put(message_data)
+            
+        logger.debug(f"Повідомлення для {chat_id} (пріоритет {priority}) додано в чергу. Поточна довжина черги: {self.queue.qsize()}")
         return True
         
     async def process_queue(self):
         """
-        Обробляє чергу повідомлень
+        Обробляє чергу повідомлень пулом відправників
         """
         if not self.session:
             await self.initialize()
             
-        logger.info("Обробник черги Telegram запущено")
+        logger.info(f"Обробник черги Telegram запущено ({self.workers} відправників)")
         
-        while True:
-            try:
-                # Отримуємо повідомлення з черги
+        senders = [asyncio.create_task(self._sender(i)) for i in range(self.workers)]
+        try:
+            while True:
+                # Тримаємо в планувальнику обмежену кількість повідомлень - решта чекає в черзі
+                while self._backlog >= self.backlog_limit:
+                    self._backlog_freed.clear()
+                    await self._backlog_freed.wait()
+                    
                 message_data = await self.queue.get()
+                self._backlog += 1
+                self._schedule(message_data)
+        except asyncio.CancelledError:
+            logger.info("Обробник черги Telegram зупинено")
+        finally:
+            for sender in senders:
+                sender.cancel()
+            await asyncio.gather(*senders, return_exceptions=True)
+            
+    def _task_done(self, message_data: Dict):
+        """
+        Позначає повідомлення як оброблене (і підтверджує його в черзі на диску)
+        """
+        # Повідомлення, злиті з цим, теж оброблені
+        for merged in self._merged.pop(id(message_data), []):
+            self._task_done(merged)
+            
+        if message_data.get("direct"):
+            return
+            
+        if isinstance(self.queue, DurableOutbox):
+            self.queue.ack(message_data)
+        self.queue.task_done()
+        
+        self._backlog -= 1
+        self._backlog_freed.set()
+        
+    def _schedule(self, message_data: Dict):
+        """
+        Додає повідомлення до черги його чату
+        """
+        chat_id = str(message_data.get("chat_id") or self.default_chat_id)
+        message_data["chat_id"] = chat_id
+        priority = message_data.get("priority", PRIORITY_ADMIN)
+        if priority not in PRIORITIES:
+            priority = PRIORITY_ADMIN
+        message_data["priority"] = priority
+        
+        # Оновлення повідомлення, яке ще чекає на відправку, замінює його текст замість окремого виклику
+        edit_key = message_data.get("edit_key")
+        if edit_key:
+            pending = self._pending_edits.get((chat_id, edit_key))
+            if pending is not None:
+                pending["message"] = message_data["message"]
+                pending["parse_mode"] = message_data.get("parse_mode")
+                pending["created_at"] = message_data.get("created_at", pending.get("created_at"))
+                pending["final"] = pending.get("final", False) or message_data.get("final", False)
+                self._merged.setdefault(id(pending), []).append(message_data)
+                self.messages_coalesced += 1
+                return
+            self._pending_edits[(chat_id, edit_key)] = message_data
+        
+        lanes = self._chat_lanes.get(chat_id)
+        if lanes is None:
+            lanes = self._chat_lanes[chat_id] = [deque() for _ in PRIORITIES]
+        lanes[priority].append(message_data)
+        
+        # Чат, що зараз відправляє, буде заплановано після завершення відправки
+        if chat_id in self._in_flight:
+            return
+        scheduled = self._scheduled.get(chat_id)
+        if scheduled is None or scheduled[1] > priority:
+            self._push_ready(chat_id)
+        
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= 10000:
+                self._prune_chat_buckets()
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+        return bucket
+        
+    def _prune_chat_buckets(self):
+        """
+        Видаляє відра чатів без повідомлень, які вже повністю відновились
+        """
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items()
+                        if chat_id not in self._chat_lanes and bucket.is_idle()]:
+            del self._chat_buckets[chat_id]
+            
+    def _push_ready(self, chat_id: str, not_before: float = 0.0):
+        """
+        Додає чат до heap пріоритету його першого повідомлення на момент, коли дозволить ліміт чату
+        
+        Попередній запис чату в іншому heap стає недійсним і пропускається при вибірці.
+        """
+        priority = next(p for p in PRIORITIES if self._chat_lanes[chat_id][p])
+        ready_at = max(self._chat_bucket(chat_id).ready_at(), not_before)
+        seq = next(self._sequence)
+        heapq.heappush(self._ready[priority], (ready_at, seq, chat_id))
+        self._scheduled[chat_id] = (seq, priority)
+        self._wakeup.set()
+        
+    async def _next_chat(self) -> str:
+        """
+        Чекає на готовий чат з найвищим пріоритетом
+        """
+        while True:
+            timeout = None
+            now = time.monotonic()
+            for heap in self._ready:
+                # Пропускаємо записи, замінені пізнішим плануванням чату
+                while heap and self._scheduled.get(heap[0][2], (None,))[0] != heap[0][1]:
+                    heapq.heappop(heap)
+                if not heap:
+                    continue
+                    
+                ready_at, _, chat_id = heap[0]
+                if ready_at <= now:
+                    heapq.heappop(heap)
+                    del self._scheduled[chat_id]
+                    if self._chat_bucket(chat_id).try_consume():
+                        return chat_id
+                    # Ліміт чату змінився (наприклад, через 429) - переплановуємо
+                    self._push_ready(chat_id)
+                    break
+                    
+                wait = ready_at - now
+                timeout = wait if timeout is None else min(timeout, wait)
+            else:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                    
+    def _is_expired(self, message_data: Dict) -> bool:
+        return (message_data["priority"] == PRIORITY_ALERT and self.alert_ttl > 0
+                and time.time() - message_data.get("created_at", time.time()) > self.alert_ttl)
                 
-                # Обмеження швидкості відправки повідомлень
-                current_time = time.time()
-                time_since_last = current_time - self.last_sent_time
-                
-                if time_since_last < self.rate_limit:
-                    delay = self.rate_limit - time_since_last
-                    logger.debug(f"Обмеження швидкості: очікування {delay:.2f} секунд")
-                    await asyncio.sleep(delay)
-                
-                # Отримуємо ID чату (якщо не вказано, використовуємо ID за замовчуванням)
-                chat_id = message_data.get("chat_id", self.default_chat_id)
-                
-                # Відправляємо повідомлення з повторними спробами
-                start_time = time.time()
-                success = False
-                
-                for attempt in range(self.retry_count):
-                    try:
-                        success = await self._send_telegram_message(
-                            message_data["message"], 
-                            chat_id,
-                            message_data.get("parse_mode")
-                        )
+    async def _sender(self, index: int):
+        """
+        Відправник пулу: бере готовий чат з найвищим пріоритетом і відправляє його перше повідомлення
+        
+        Глобальний токен береться лише після вибору чату і перевірки TTL, тож
+        відправники без роботи не накопичують токени, а застарілі сповіщення
+        відкидаються без витрати загального ліміту. Поки повідомлення чату
+        відправляється, чат відсутній у планувальнику, тож повідомлення одного
+        чату йдуть по черзі.
+        """
+        while True:
+            chat_id = await self._next_chat()
+            self._in_flight.add(chat_id)
+            lanes = self._chat_lanes[chat_id]
+            lane = next(lanes[p] for p in PRIORITIES if lanes[p])
+            message_data = lane[0]
+            retry_at = 0.0
+            
+            try:
+                expired = self._is_expired(message_data)
+                if not expired:
+                    await self.global_bucket.acquire()
+                    
+                # Після початку відправки нові оновлення з тим самим ключем вже не зливаються з цим повідомленням
+                if message_data.get("edit_key"):
+                    key = (chat_id, message_data["edit_key"])
+                    if self._pending_edits.get(key) is message_data:
+                        del self._pending_edits[key]
                         
-                        if success:
-                            self.messages_sent += 1
-                            self.last_sent_time = time.time()
-                            send_time = time.time() - start_time
-                            logger.info(f"Повідомлення для {chat_id} успішно відправлено (спроба {attempt+1}, час: {send_time:.2f}с)")
-                            break
-                        else:
-                            logger.warning(f"Не вдалося відправити повідомлення для {chat_id} (спроба {attempt+1})")
-                            await asyncio.sleep(self.retry_delay * (attempt + 1))
-                    except Exception as e:
-                        logger.error(f"Помилка при відправці повідомлення для {chat_id} (спроба {attempt+1}): {e}")
-                        await asyncio.sleep(self.retry_delay * (attempt + 1))
-                
-                if not success:
-                    self.messages_failed += 1
-                    logger.error(f"Всі спроби відправити повідомлення для {chat_id} вичерпано. Повідомлення не відправлено.")
+                if expired:
+                    self.messages_expired += 1
+                    logger.info(f"Сповіщення для {chat_id} застаріло (старше {self.alert_ttl} с) і не буде відправлено")
+                    done = True
+                else:
+                    attempt = message_data.get("attempt", 0)
+                    start_time = time.time()
+                    success, retry_after = await self._deliver(message_data, chat_id)
                     
-                # Позначаємо задачу як виконану
-                self.queue.task_done()
-                
-                # Логуємо статистику
-                if (self.messages_sent + self.messages_failed) % 10 == 0:
-                    logger.info(f"Статистика відправки: успішно - {self.messages_sent}, невдало - {self.messages_failed}")
-                
+                    if success:
+                        self.messages_sent += 1
+                        logger.info(f"Повідомлення для {chat_id} успішно відправлено (спроба {attempt+1}, час: {time.time() - start_time:.2f}с)")
+                        done = True
+                    elif retry_after is not None:
+                        # Обмеження Telegram не вважається невдалою спробою: чекаємо retry_after лише для цього чату
+                        self.messages_throttled += 1
+                        THROTTLED.inc()
+                        self._chat_bucket(chat_id).pause(retry_after)
+                        logger.warning(f"Telegram обмежив відправку для {chat_id}, повтор через {retry_after} с")
+                        done = False
+                    else:
+                        attempt += 1
+                        message_data["attempt"] = attempt
+                        done = attempt >= self.retry_count
+                        if done:
+                            self.messages_failed += 1
+                            logger.error(f"Всі спроби відправити повідомлення для {chat_id} вичерпано. Повідомлення не відправлено.")
+                        else:
+                            logger.warning(f"Не вдалося відправити повідомлення для {chat_id} (спроба {attempt})")
+                            RETRIES.inc()
+                            retry_at = time.monotonic() + self.retry_delay * attempt
             except asyncio.CancelledError:
-                logger.info("Обробник черги Telegram зупинено")
-                break
+                raise
             except Exception as e:
                 logger.error(f"Помилка при обробці черги Telegram: {e}")
+                done = True
+                self.messages_failed += 1
+            finally:
+                self._in_flight.discard(chat_id)
+                
+            if done:
+                lane.popleft()
+                # Помилка підтвердження одного запису не повинна зупиняти відправника
+                try:
+                    self._task_done(message_data)
+                except Exception as e:
+                    logger.error(f"Помилка при підтвердженні повідомлення для {chat_id}: {e}")
                 
-                # Позначаємо задачу як виконану, навіть якщо сталася помилка
-                self.queue.task_done()
+                # Логуємо статистику
+                if (self.messages_sent + self.messages_failed) % 10 == 0:
+                    logger.info(f"Статистика відправки: успішно - {self.messages_sent}, невдало - {self.messages_failed}, "
+                                f"обмежено - {self.messages_throttled}, застаріло - {self.messages_expired}")
                 
-                # Невелика затримка перед наступною спробою
-                await asyncio.sleep(1)
+            if any(lanes):
+                self._push_ready(chat_id, retry_at)
+            else:
+                del self._chat_lanes[chat_id]
     
     async def _send_telegram_message(self, message: str, chat_id: str, parse_mode: Optional[str] = None) -> bool:
         """
         Безпосередньо відправляє повідомлення в Telegram
         """
-        if not self.session:
-            await self.initialize()
+        success, _, _ = await self._post_message(message, chat_id, parse_mode)
+        return success
+        
+    async def _deliver(self, message_data: Dict, chat_id: str) -> Tuple[bool, Optional[float]]:
+        """
+        Відправляє повідомлення або редагує раніше надіслане з тим самим ключем
+        
+        Returns:
+            Tuple[bool, Optional[float]]: (успіх, retry_after з відповіді 429 або None)
+        """
+        edit_key = message_data.get("edit_key")
+        map_key = (chat_id, edit_key)
+        message_id = self._message_ids.get(map_key) if edit_key else None
+        
+        if message_id is not None:
+            self._message_ids.move_to_end(map_key)
+            success, retry_after, data = await self._post_message(
+                message_data["message"], chat_id, message_data.get("parse_mode"), message_id
+            )
+            description = str(data.get("description", "")).lower()
             
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
+            # Незмінений текст означає, що повідомлення вже актуальне
+            if success or "message is not modified" in description:
+                if success:
+                    self.messages_edited += 1
+                if message_data.get("final"):
+                    self._message_ids.pop(map_key, None)
+                return True, None
+            if retry_after is not None or ("not found" not in description and "can't be edited" not in description):
+                return False, retry_after
+                
+            # Повідомлення видалене або застаріле для редагування - надсилаємо нове
+            self._message_ids.pop(map_key, None)
+                
+        success, retry_after, data = await self._post_message(
+            message_data["message"], chat_id, message_data.get("parse_mode")
+        )
+        
+        # Запам'ятовуємо message_id, щоб наступні оновлення цієї можливості редагували повідомлення
+        if success and edit_key and not message_data.get("final"):
+            sent_id = (data.get("result") or {}).get("message_id")
+            if sent_id is not None:
+                self._message_ids[map_key] = sent_id
+                while len(self._message_ids) > self.edit_cache_size:
+                    self._message_ids.popitem(last=False)
+                    
+        return success, retry_after
         
+    async def _post_message(self, message: str, chat_id: str, parse_mode: Optional[str] = None,
+                            message_id: Optional[int] = None) -> Tuple[bool, Optional[float], Dict]:
+        """
+        Відправляє повідомлення (або редагує message_id) через Bot API
+        
+        Returns:
+            Tuple[bool, Optional[float], Dict]: (успіх, retry_after з відповіді 429 або None, відповідь API)
+        """
         params: Dict[str, Any] = {
             "chat_id": chat_id,
             "text": message
@@ -155,20 +454,51 @@ class TelegramNotifier(BaseNotifier):
         if parse_mode:
             params["parse_mode"] = parse_mode
             
+        if message_id is not None:
+            params["message_id"] = message_id
+            return await self._call_api("editMessageText", params)
+        return await self._call_api("sendMessage", params)
+        
+    async def _call_api(self, method: str, params: Dict[str, Any]) -> Tuple[bool, Optional[float], Dict]:
+        """
+        Викликає метод Bot API
+        
+        Returns:
+            Tuple[bool, Optional[float], Dict]: (успіх, retry_after з відповіді 429 або None, відповідь API)
+        """
+        if not self.session:
+            await self.initialize()
+            
+        url = f"{self.api_url}/bot{self.bot_token}/{method}"
+        chat_id = params.get("chat_id")
+        
         try:
             start_time = time.time()
             
             async with self.session.post(url, json=params) as response:
                 response_time = time.time() - start_time
+                SEND_LATENCY.labels(method).observe(response_time)
+                
+                try:
+                    data = await response.json(content_type=None)
+                except Exception:
+                    data = {}
+                if not isinstance(data, dict):
+                    data = {}
                 
                 if response.status == 200:
-                    logger.debug(f"Telegram API відповів за {response_time:.3f} секунд")
-                    return True
-                else:
-                    response_text = await response.text()
-                    logger.error(f"Помилка при відправці повідомлення для {chat_id}: {response.status} - {response_text}")
-                    return False
+                    logger.debug(f"Telegram API ({method}) відповів за {response_time:.3f} секунд")
+                    return True, None, data
+                    
+                if response.status == 429:
+                    retry_after = float((data.get("parameters") or {}).get("retry_after", 1))
+                    return False, retry_after, data
+                    
+                # Незмінений текст при редагуванні - очікувана ситуація, не помилка
+                if "message is not modified" not in str(data.get("description", "")):
+                    logger.error(f"Помилка при відправці повідомлення ({method}) для {chat_id}: {response.status} - {data}")
+                return False, None, data
                     
         except Exception as e:
-            logger.error(f"Виняток при відправці повідомлення для {chat_id}: {e}")
-            return False
+            logger.error(f"Виняток при відправці повідомлення ({method}) для {chat_id}: {e}")
+            return False, None, {}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# outbox_replay.py
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+from notifier.outbox import DurableOutbox
+
+# Налаштовуємо логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('outbox_replay')
+
+async def reopen(directory: str, **kwargs) -> Tuple[DurableOutbox, List[Dict]]:
+    """
+    Відкриває чергу заново і забирає всі відтворені повідомлення (без підтвердження)
+
+    Returns:
+        Tuple[DurableOutbox, List[Dict]]: Відкрита черга та відтворені записи
+    """
+    outbox = DurableOutbox(directory, **kwargs)
+    replayed = await outbox.open()
+    records = [await outbox.get() for _ in range(replayed)]
+    return outbox, records
+
+def count_log_lines(directory: str) -> int:
+    with open(os.path.join(directory, "outbox.log"), "rb") as f:
+        return sum(1 for _ in f)
+
+async def wait_for_condition(condition, timeout: float = 5.0):
+    """
+    Чекає, поки condition() стане істинною (не довше timeout секунд)
+    """
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+def replay_matches(records: List[Dict], expected: List[int], unfinished: int) -> bool:
+    """
+    Кожне непідтверджене повідомлення відтворено рівно один раз, і join() чекає саме на них
+    """
+    numbers = [record["n"] for record in records]
+    return numbers == expected and unfinished == len(expected)
+
+async def check_round_trip(directory: str, messages: int = 100) -> Dict:
+    """
+    put/get/ack без компактації: після перезапуску відтворюються лише непідтверджені повідомлення
+    """
+    outbox = DurableOutbox(directory, window=10)
+    await outbox.open()
+    for i in range(messages):
+        await outbox.put({"n": i})
+
+    expected = []
+    for _ in range(messages):
+        record = await outbox.get()
+        if record["n"] % 3:
+            outbox.ack(record)
+        else:
+            expected.append(record["n"])
+        outbox.task_done()
+    await asyncio.wait_for(outbox.join(), timeout=5)
+    await outbox.close()
+
+    outbox, records = await reopen(directory, window=10)
+    unfinished = outbox._unfinished
+    await outbox.close()
+    return {
+        "ok": replay_matches(records, expected, unfinished),
+        "expected": len(expected),
+        "replayed": len(records),
+        "unfinished": unfinished
+    }
+
+async def check_compaction(directory: str, messages: int = 3000, seed: int = 1) -> Dict:
+    """
+    Компактація під час одночасних put() та ack(), перезапуск і повне відтворення залишку
+    """
+    rng = random.Random(seed)
+    outbox = DurableOutbox(directory, window=16, flush_interval=0.001, compact_threshold=50)
+    await outbox.open()
+    acked = set()
+    consumed = messages * 5 // 6
+
+    async def producer():
+        for i in range(messages):
+            await outbox.put({"n": i})
+            if i % 7 == 0:
+                await asyncio.sleep(0)
+
+    async def consumer():
+        for _ in range(consumed):
+            record = await outbox.get()
+            if rng.random() < 0.9:
+                outbox.ack(record)
+                acked.add(record["n"])
+            outbox.task_done()
+            if rng.random() < 0.1:
+                await asyncio.sleep(0.001)
+
+    await asyncio.gather(producer(), consumer())
+    await asyncio.sleep(0.05)
+    await outbox.close()
+    log_lines = count_log_lines(directory)
+
+    expected = [i for i in range(messages) if i not in acked]
+    outbox, records = await reopen(directory, window=16)
+    unfinished = outbox._unfinished
+    records.sort(key=lambda record: record["n"])
+
+    # Після підтвердження всього відтвореного черга порожня і після наступного перезапуску
+    for record in records:
+        outbox.ack(record)
+        outbox.task_done()
+    await asyncio.wait_for(outbox.join(), timeout=5)
+    await outbox.close()
+    outbox, leftover = await reopen(directory)
+    await outbox.close()
+
+    return {
+        "ok": replay_matches(records, expected, unfinished) and not leftover and log_lines < messages,
+        "expected": len(expected),
+        "replayed": len(records),
+        "unfinished": unfinished,
+        "log_lines": log_lines,
+        "leftover": len(leftover)
+    }
+
+async def check_notifier(directory: str) -> Dict:
+    """
+    Злиття оновлень у TelegramNotifier, компактація до їх відправки, перезапуск і доставка
+
+    Перше повідомлення з ключем відправляється, три наступні чекають на ліміт чату
+    (два з них зливаються з першим очікуючим), а тим часом доставка повідомлення
+    в інший чат запускає компактацію журналу.
+    Після перезапуску всі три відтворюються по одному разу з вихідним текстом і
+    доставляються одним повідомленням без помилок task_done().
+    """
+    from notifier.telegram_notifier import TelegramNotifier, PRIORITY_ALERT
+    from telegram_bench import FakeBotApiServer
+
+    server = FakeBotApiServer(global_rate=1000, chat_rate=1000, latency=0.0)
+    await server.start()
+    logging.getLogger('telegram').setLevel(logging.WARNING)
+    try:
+        outbox = DurableOutbox(directory, flush_interval=0.01, compact_threshold=1)
+        await outbox.open()
+        notifier = TelegramNotifier("check", "0", outbox, api_url=server.url, chat_rate=0.2)
+        await notifier.initialize()
+        worker = asyncio.create_task(notifier.process_queue())
+
+        await notifier.send_message("Оновлення #0", "1", priority=PRIORITY_ALERT, edit_key="k")
+        await wait_for_condition(lambda: server.accepted == 1)
+        for i in range(1, 4):
+            await notifier.send_message(f"Оновлення #{i}", "1", priority=PRIORITY_ALERT, edit_key="k")
+        await wait_for_condition(lambda: notifier.messages_coalesced == 2)
+        # Підтвердження повідомлення іншому чату запускає компактацію, поки злиті оновлення очікують
+        await notifier.send_message("Інший чат", "2", priority=PRIORITY_ALERT)
+        await wait_for_condition(lambda: server.accepted == 2)
+        await asyncio.sleep(0.2)
+        coalesced = notifier.messages_coalesced
+        log_lines = count_log_lines(directory)
+
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await notifier.close()
+        await outbox.close()
+
+        outbox, records = await reopen(directory)
+        texts = [record["message"] for record in records]
+        unfinished = outbox._unfinished
+        await outbox.close()
+
+        # Доставка відтвореного: злиті повідомлення підтверджуються разом з тим, з яким злились
+        outbox = DurableOutbox(directory, flush_interval=0.01)
+        replayed = await outbox.open()
+        notifier = TelegramNotifier("check", "0", outbox, api_url=server.url)
+        await notifier.initialize()
+        worker = asyncio.create_task(notifier.process_queue())
+        try:
+            await asyncio.wait_for(outbox.join(), timeout=10)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await notifier.close()
+        await outbox.close()
+
+        outbox, leftover = await reopen(directory)
+        await outbox.close()
+    finally:
+        await server.stop()
+
+    expected = ["Оновлення #1", "Оновлення #2", "Оновлення #3"]
+    return {
+        "ok": (coalesced == 2 and log_lines == 3 and texts == expected and unfinished == 3
+               and replayed == 3 and drained and not leftover),
+        "coalesced": coalesced,
+        "log_lines": log_lines,
+        "replayed_texts": texts,
+        "unfinished": unfinished,
+        "drained": drained,
+        "leftover": len(leftover)
+    }
+
+async def run_checks() -> Dict[str, Dict]:
+    """
+    Запускає всі перевірки, кожну в окремому тимчасовому каталозі
+    """
+    results = {}
+    for name, check in (("round_trip", check_round_trip), ("compaction", check_compaction),
+                        ("notifier", check_notifier)):
+        with tempfile.TemporaryDirectory(prefix="outbox_") as directory:
+            results[name] = await check(directory)
+        logger.info(f"{name}: {json.dumps(results[name], ensure_ascii=False)}")
+    return results
+
+if __name__ == "__main__":
+    results = asyncio.run(run_checks())
+
+    if all(result["ok"] for result in results.values()):
+        logger.info("✅ Черга повідомлень на диску відтворюється рівно один раз")
+        sys.exit(0)
+    else:
+        failed = ", ".join(name for name, result in results.items() if not result["ok"])
+        logger.error(f"❌ Перевірки не пройдено: {failed}")
+        sys.exit(1)
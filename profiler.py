@@ -0,0 +1,164 @@
+# profiler.py
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from types import CodeType
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger('main')
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class SamplingProfiler:
+    """
+    Вибірковий профайлер процесу, що запускається на вимогу
+
+    Поки профілювання не запущено, профайлер не має потоку і нічого не робить.
+    Під час профілювання фоновий потік кожні interval секунд знімає стеки всіх
+    потоків через sys._current_frames() і рахує однакові стеки. Результат
+    записується у data/ у форматі collapsed stacks ("потік;зовнішня;...;внутрішня N"),
+    з якого flamegraph.pl, speedscope чи inferno будують flamegraph.
+    """
+    def __init__(self, output_dir: str = config.PROFILER_DIR,
+                 interval: float = config.PROFILER_INTERVAL,
+                 max_duration: float = config.PROFILER_MAX_DURATION):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_duration = max_duration
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._done.set()
+        self._frame_names: Dict[CodeType, str] = {}  # Кеш назв кадрів на час одного профілювання
+
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def running(self) -> bool:
+        return not self._done.is_set()
+
+    def start(self, duration: float) -> bool:
+        """
+        Запускає профілювання на duration секунд (не довше max_duration)
+
+        Returns:
+            bool: False, якщо профілювання вже виконується
+        """
+        if self.running:
+            return False
+        self.duration = max(self.interval, min(float(duration), self.max_duration))
+        self.started_at = time.time()
+        self._stop.clear()
+        self._done.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Профілювання запущено на {self.duration:.0f} с (інтервал {self.interval * 1000:.0f} мс)")
+        return True
+
+    def stop(self):
+        """
+        Достроково завершує профілювання (результат записується)
+        """
+        self._stop.set()
+
+    async def wait(self) -> Optional[Dict]:
+        """
+        Чекає завершення поточного профілювання
+
+        Returns:
+            Optional[Dict]: Результат останнього профілювання
+        """
+        await asyncio.to_thread(self._done.wait)
+        return self.last_result
+
+    def status(self) -> Dict:
+        """
+        Повертає стан профайлера і результат останнього профілювання
+        """
+        status = {"running": self.running, "last_result": self.last_result}
+        if self.running:
+            status["elapsed"] = round(time.time() - self.started_at, 1)
+            status["duration"] = self.duration
+        return status
+
+    def _run(self):
+        stacks: Counter = Counter()
+        samples = 0
+        own_thread = threading.get_ident()
+        deadline = time.monotonic() + self.duration
+        try:
+            while time.monotonic() < deadline and not self._stop.wait(self.interval):
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_thread:
+                        stacks[self._collapse(thread_names.get(thread_id, str(thread_id)), frame)] += 1
+                samples += 1
+            self.last_result = self._write(stacks, samples)
+        except Exception as e:
+            logger.error(f"Помилка при профілюванні: {e}")
+            self.last_result = {"error": str(e)}
+        finally:
+            self._frame_names.clear()
+            self._done.set()
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        """
+        Формує рядок стека від зовнішнього кадру до внутрішнього
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            name = self._frame_names.get(code)
+            if name is None:
+                filename = code.co_filename
+                if filename.startswith(PROJECT_DIR):
+                    filename = os.path.relpath(filename, PROJECT_DIR)
+                else:
+                    filename = os.path.basename(filename)
+                name = self._frame_names[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+            names.append(name)
+            frame = frame.f_back
+        names.append(thread_name)
+        names.reverse()
+        return ";".join(names)
+
+    def _write(self, stacks: Counter, samples: int) -> Dict:
+        """
+        Записує зібрані стеки у файл і повертає короткий підсумок
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Власний час функцій - кількість зразків, у яких вона була найглибшим кадром
+        leaf_counts: Counter = Counter()
+        for stack, count in stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        total = sum(stacks.values())
+        top: List[Tuple[str, float]] = [
+            (name, round(count / total * 100, 1)) for name, count in leaf_counts.most_common(config.PROFILER_TOP_FUNCTIONS)
+        ] if total else []
+
+        logger.info(f"Профілювання завершено: {samples} зрізів, {len(stacks)} унікальних стеків, записано у {path}")
+        return {
+            "file": path,
+            "samples": samples,
+            "stacks": len(stacks),
+            "finished_at": datetime.now().isoformat(),
+            "top": top
+        }
+
+# Спільний профайлер процесу (веб-сервер і команда /profile)
+PROFILER = SamplingProfiler()
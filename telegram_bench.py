@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# telegram_bench.py
+import asyncio
+import json
+import logging
+import sys
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+from aiohttp import web
+
+# Налаштовуємо логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('telegram_bench')
+
+class FakeBotApiServer:
+    """
+    Локальний сервер, що імітує sendMessage та editMessageText Bot API з його обмеженнями
+
+    Повертає 429 з parameters.retry_after, якщо перевищено global_rate повідомлень
+    за секунду на всі чати або chat_rate повідомлень за секунду в один чат.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8081, global_rate: int = 30,
+                 chat_rate: int = 1, latency: float = 0.05):
+        self.host = host
+        self.port = port
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.latency = latency  # Імітація часу відповіді API
+        self.accepted = 0
+        self.edited = 0
+        self._texts: Dict[Tuple[str, int], str] = {}  # Тексти надісланих повідомлень за (чат, message_id)
+        self.throttled = 0
+        self._global_window = deque()  # Час прийнятих повідомлень за останню секунду
+        self._chat_windows: Dict[str, deque] = {}
+        self.app = web.Application()
+        self.app.router.add_post('/bot{token}/sendMessage', self.send_message_handler)
+        self.app.router.add_post('/bot{token}/editMessageText', self.edit_message_handler)
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        """
+        Запускає сервер
+        """
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Імітацію Bot API запущено на {self.url}")
+
+    async def stop(self):
+        """
+        Зупиняє сервер
+        """
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    def _over_limit(self, window: deque, limit: int, now: float) -> bool:
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        return len(window) >= limit
+
+    def _throttle(self, chat_id: str):
+        """
+        Повертає відповідь 429, якщо перевищено ліміт, інакше враховує запит у вікнах
+        """
+        now = time.monotonic()
+        chat_window = self._chat_windows.setdefault(chat_id, deque())
+        if self._over_limit(self._global_window, self.global_rate, now) or \
+                self._over_limit(chat_window, self.chat_rate, now):
+            self.throttled += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1}
+            }, status=429)
+
+        self._global_window.append(now)
+        chat_window.append(now)
+        return None
+
+    async def send_message_handler(self, request):
+        """
+        Обробляє sendMessage
+        """
+        data = await request.json()
+        chat_id = str(data.get("chat_id"))
+        await asyncio.sleep(self.latency)
+
+        throttled = self._throttle(chat_id)
+        if throttled is not None:
+            return throttled
+
+        self.accepted += 1
+        self._texts[(chat_id, self.accepted)] = data.get("text", "")
+        return web.json_response({"ok": True, "result": {"message_id": self.accepted, "chat": {"id": chat_id}}})
+
+    async def edit_message_handler(self, request):
+        """
+        Обробляє editMessageText
+        """
+        data = await request.json()
+        chat_id = str(data.get("chat_id"))
+        key = (chat_id, int(data.get("message_id", 0)))
+        await asyncio.sleep(self.latency)
+
+        throttled = self._throttle(chat_id)
+        if throttled is not None:
+            return throttled
+
+        if key not in self._texts:
+            return web.json_response({"ok": False, "error_code": 400,
+                                      "description": "Bad Request: message to edit not found"}, status=400)
+        if self._texts[key] == data.get("text", ""):
+            return web.json_response({"ok": False, "error_code": 400,
+                                      "description": "Bad Request: message is not modified"}, status=400)
+
+        self._texts[key] = data.get("text", "")
+        self.edited += 1
+        return web.json_response({"ok": True, "result": {"message_id": key[1], "chat": {"id": chat_id}}})
+
+async def run_benchmark(messages: int = 300, chats: int = 100) -> Dict:
+    """
+    Вимірює швидкість відправки черги TelegramNotifier через імітацію Bot API
+
+    Args:
+        messages (int): Кількість повідомлень
+        chats (int): Кількість різних чатів, між якими розподілено повідомлення
+
+    Returns:
+        Dict: Результати вимірювання
+    """
+    from notifier.telegram_notifier import TelegramNotifier
+
+    server = FakeBotApiServer()
+    await server.start()
+
+    queue = asyncio.Queue()
+    notifier = TelegramNotifier("bench", "0", queue, api_url=server.url)
+    await notifier.initialize()
+    logging.getLogger('telegram').setLevel(logging.WARNING)
+
+    for i in range(messages):
+        await notifier.send_message(f"Повідомлення #{i}", str(i % chats))
+
+    start_time = time.monotonic()
+    worker = asyncio.create_task(notifier.process_queue())
+    try:
+        await queue.join()
+        elapsed = time.monotonic() - start_time
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        await notifier.close()
+        await server.stop()
+
+    return {
+        "messages": messages,
+        "chats": chats,
+        "workers": notifier.workers,
+        "elapsed": round(elapsed, 2),
+        "rate": round(messages / elapsed, 2) if elapsed else None,
+        "sent": notifier.messages_sent,
+        "failed": notifier.messages_failed,
+        "throttled": server.throttled
+    }
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    result = asyncio.run(run_benchmark(messages, chats))
+    logger.info(f"Результат: {json.dumps(result, ensure_ascii=False)}")
+    sys.exit(0 if result["sent"] == messages else 1)
@@ -1,17 +1,27 @@
 # telegram_worker.py
 import asyncio
+import hmac
+import html
 import logging
 import time
 import re
 import json
-from typing import Optional, Dict, List, Any, Tuple
+import secrets
+from typing import Optional, Dict, List, Any, Tuple, Union
 import aiohttp
+from aiohttp import web
 import traceback
 from datetime import datetime
 
 import config
-from notifier.telegram_notifier import TelegramNotifier
-from user_manager import UserManager
+from notifier.telegram_notifier import TelegramNotifier, PRIORITY_INTERACTIVE, PRIORITY_ALERT, PRIORITY_ADMIN
+from notifier.outbox import DurableOutbox
+from notifier.digest import DigestBuffer, render_digest
+from user_manager import UserManager, DELIVERY_INSTANT
+from update_dispatcher import UpdateDispatcher
+from profiler import PROFILER
+from arbitrage.opportunity import ArbitrageOpportunity
+from arbitrage.opportunity_tracker import OpportunityKey, OpportunityState, opportunity_key
 
 logger = logging.getLogger('telegram')
 users_logger = logging.getLogger('users')
@@ -24,14 +34,23 @@ class TelegramWorker:
     def __init__(self, bot_token: str, admin_chat_id: str):
         self.bot_token = bot_token
         self.admin_chat_id = admin_chat_id
-        self.queue: Optional[asyncio.Queue] = None
+        self.queue: Optional[Union[asyncio.Queue, DurableOutbox]] = None
         self.notifier: Optional[TelegramNotifier] = None
         self.worker_task: Optional[asyncio.Task] = None
         self.monitor_task: Optional[asyncio.Task] = None
         self.command_handler_task: Optional[asyncio.Task] = None
         self.health_check_task: Optional[asyncio.Task] = None
+        self.digest_task: Optional[asyncio.Task] = None
+        self.profile_task: Optional[asyncio.Task] = None  # Очікування підсумку профілювання (/profile)
+        self.digest = DigestBuffer()  # Сповіщення для користувачів у режимі дайджесту
         self.last_update_id = 0
         self.user_manager = UserManager()
+        # Оновлення (з getUpdates або webhook) обробляються пулом з порядком у межах користувача
+        self.dispatcher = UpdateDispatcher(self._process_update)
+        self.webhook_mode = bool(config.TELEGRAM_WEBHOOK_URL)
+        # Без секрету будь-хто міг би надіслати на webhook підроблене оновлення від імені адміністратора,
+        # тож якщо його не задано, генеруємо випадковий на час роботи процесу
+        self.webhook_secret = config.TELEGRAM_WEBHOOK_SECRET or secrets.token_urlsafe(32)
         self.running = True
         self.session: Optional[aiohttp.ClientSession] = None
         
@@ -39,8 +58,14 @@ class TelegramWorker:
         """
         Запускає воркер
         """
-        # Створюємо чергу повідомлень
-        self.queue = asyncio.Queue()
+        # Створюємо чергу повідомлень (на диску вона відтворює те, що не встигли відправити до зупинки)
+        if config.USE_DURABLE_OUTBOX:
+            self.queue = DurableOutbox()
+            replayed = await self.queue.open()
+            if replayed:
+                logger.info(f"Відновлено {replayed} невідправлених повідомлень з попереднього запуску")
+        else:
+            self.queue = asyncio.Queue()
         
         # Створюємо HTTP сесію
         self.session = aiohttp.ClientSession()
@@ -55,12 +80,20 @@ class TelegramWorker:
         # Запускаємо моніторинг черги
         self.monitor_task = asyncio.create_task(self.monitor_queue())
         
-        # Запускаємо обробник команд
-        self.command_handler_task = asyncio.create_task(self.handle_commands())
+        # Запускаємо обробник команд: оновлення надходять через webhook або довге опитування
+        self.dispatcher.start()
+        if self.webhook_mode and not await self.set_webhook():
+            logger.error("Webhook не встановлено, оновлення отримуються довгим опитуванням")
+            self.webhook_mode = False
+        if not self.webhook_mode:
+            self.command_handler_task = asyncio.create_task(self.handle_commands())
         
         # Запускаємо перевірку стану бота
         self.health_check_task = asyncio.create_task(self.health_check())
         
+        # Запускаємо відправку дайджестів
+        self.digest_task = asyncio.create_task(self.send_digests())
+        
         # Відправляємо повідомлення про старт бота
         await self.notifier.send_formatted_message(config.START_MESSAGE)
         
@@ -89,6 +122,8 @@ class TelegramWorker:
             except asyncio.CancelledError:
                 pass
             self.command_handler_task = None
+            
+        await self.dispatcher.stop()
         
         if self.monitor_task:
             self.monitor_task.cancel()
@@ -98,6 +133,31 @@ class TelegramWorker:
                 pass
             self.monitor_task = None
         
+        if self.digest_task:
+            self.digest_task.cancel()
+            try:
+                await self.digest_task
+            except asyncio.CancelledError:
+                pass
+            self.digest_task = None
+        
+        # Незавершені дайджести відправляємо одразу, а не втрачаємо (з чергою на диску вони переживуть перезапуск)
+        if self.notifier and len(self.digest):
+            logger.info(f"Відправка {len(self.digest)} незавершених дайджестів перед зупинкою")
+            try:
+                await self._send_digest_batch(self.digest.pop_all())
+            except Exception as e:
+                logger.error(f"Помилка при відправці дайджестів перед зупинкою: {e}")
+        
+        if self.profile_task:
+            PROFILER.stop()
+            self.profile_task.cancel()
+            try:
+                await self.profile_task
+            except asyncio.CancelledError:
+                pass
+            self.profile_task = None
+        
         # Чекаємо завершення відправки всіх повідомлень
         if self.queue:
             try:
@@ -106,6 +166,8 @@ class TelegramWorker:
                 logger.info("Всі повідомлення у черзі оброблено")
             except asyncio.TimeoutError:
                 logger.warning(f"Не всі повідомлення було відправлено. Залишилось {self.queue.qsize()} повідомлень")
+                if isinstance(self.queue, DurableOutbox):
+                    logger.info("Невідправлені повідомлення збережено на диску і будуть відправлені після запуску")
             
         if self.worker_task:
             self.worker_task.cancel()
@@ -115,6 +177,12 @@ class TelegramWorker:
                 pass
             self.worker_task = None
             
+        if isinstance(self.queue, DurableOutbox):
+            await self.queue.close()
+            
+        # Записуємо незбережені зміни користувачів
+        await self.user_manager.flush()
+            
         if self.notifier:
             await self.notifier.close()
             self.notifier = None
@@ -125,9 +193,20 @@ class TelegramWorker:
             
         logger.info("Telegram Worker успішно зупинено")
         
-    async def send_message(self, message: str, chat_id: Optional[str] = None, parse_mode: Optional[str] = None):
+    async def send_message(self, message: str, chat_id: Optional[str] = None, parse_mode: Optional[str] = None,
+                           priority: int = PRIORITY_ADMIN, edit_key: Optional[str] = None,
+                           final: bool = False):
         """
         Додає повідомлення до черги на відправку
+        
+        Args:
+            message (str): Текст повідомлення
+            chat_id (Optional[str]): ID чату (за замовчуванням - адміністратор)
+            parse_mode (Optional[str]): Режим форматування
+            priority (int): Пріоритет: PRIORITY_INTERACTIVE (відповіді на команди),
+                PRIORITY_ALERT (сповіщення про можливості) або PRIORITY_ADMIN (службові)
+            edit_key (Optional[str]): Ключ для редагування раніше надісланого повідомлення з тим самим ключем
+            final (bool): Останнє оновлення повідомлення з цим ключем
         """
         if not self.notifier:
             logger.error("Спроба відправити повідомлення, але Telegram Worker не запущено")
@@ -138,9 +217,11 @@ class TelegramWorker:
             chat_id = self.admin_chat_id
             
         if parse_mode:
-            return await self.notifier.send_formatted_message(message, chat_id, parse_mode)
+            return await self.notifier.send_formatted_message(message, chat_id, parse_mode, priority=priority,
+                                                              edit_key=edit_key, final=final)
         else:
-            return await self.notifier.send_message(message, chat_id)
+            return await self.notifier.send_message(message, chat_id, priority=priority,
+                                                    edit_key=edit_key, final=final)
             
     async def broadcast_message(self, message: str, parse_mode: Optional[str] = None, 
                                only_admins: bool = False):
@@ -165,7 +246,7 @@ class TelegramWorker:
         # Відправляємо повідомлення всім вибраним користувачам
         for user_id, user_data in users_to_notify.items():
             try:
-                await self.send_message(message, user_id, parse_mode)
+                await self.send_message(message, user_id, parse_mode, priority=PRIORITY_ADMIN)
                 # Збільшуємо лічильник повідомлень
                 self.user_manager.increment_notifications(user_id)
             except Exception as e:
@@ -173,6 +254,131 @@ class TelegramWorker:
                 
         return True
             
+    async def notify_opportunities(self, opportunities: List[ArbitrageOpportunity],
+                                   states: Optional[Dict[OpportunityKey, OpportunityState]] = None) -> int:
+        """
+        Повідомляє користувачів про арбітражні можливості
+        
+        Отримувачі визначаються за полями можливості (пара/шлях та прибуток),
+        а повідомлення формується один раз для кожної можливості, а не для кожного отримувача.
+        Користувачам у режимі дайджесту можливість додається до їх дайджесту.
+        
+        Args:
+            opportunities (List[ArbitrageOpportunity]): Знайдені можливості
+            states (Optional[Dict[OpportunityKey, OpportunityState]]): Стани можливостей з трекера,
+                у яких запам'ятовуються отримувачі для сповіщення про закриття
+            
+        Returns:
+            int: Кількість можливостей, про які повідомлено хоча б одного користувача
+        """
+        if not self.notifier:
+            logger.error("Спроба відправити повідомлення, але Telegram Worker не запущено")
+            return 0
+            
+        active_count = self.user_manager.count_active_approved_users()
+        delivered_count = 0
+        report_lines = []
+        
+        for opp in opportunities:
+            try:
+                recipients = self.user_manager.get_subscribers(opp.symbol, opp.profit_percent)
+                logger.info(f"Можливість {opp.symbol} ({opp.profit_percent:.2f}%): {len(recipients)} отримувачів "
+                            f"серед {active_count} активних схвалених користувачів")
+                
+                if not recipients:
+                    report_lines.append(f"⚠️ {opp.symbol}: не надіслано жодному користувачу")
+                    continue
+                
+                message = None
+                digest_line = None
+                state = states.get(opportunity_key(opp)) if states else None
+                key = "|".join(opportunity_key(opp))
+                edit_key = self._edit_key(opportunity_key(opp))
+                notified_count = 0
+                digest_count = 0
+                for user_id in recipients:
+                    interval = self.user_manager.get_digest_interval(user_id)
+                    if interval:
+                        if digest_line is None:
+                            digest_line = opp.to_digest_line()
+                        self.digest.add(user_id, key, digest_line, interval)
+                        digest_count += 1
+                        continue
+                        
+                    if message is None:
+                        message = opp.to_message()
+                    try:
+                        await self.send_message(message, user_id, parse_mode="HTML", priority=PRIORITY_ALERT,
+                                                edit_key=edit_key)
+                        self.user_manager.increment_notifications(user_id)
+                        notified_count += 1
+                        if state is not None:
+                            state.recipients.add(user_id)
+                    except Exception as e:
+                        logger.error(f"Помилка при відправці повідомлення користувачу {user_id}: {e}")
+                
+                if notified_count or digest_count:
+                    delivered_count += 1
+                logger.info(f"Повідомлено {notified_count} користувачів про арбітражну можливість для {opp.symbol}, "
+                            f"додано до {digest_count} дайджестів")
+                report_lines.append(f"✅ {opp.symbol}: надіслано {notified_count} користувачам, у дайджест - {digest_count}")
+            except Exception as e:
+                logger.error(f"Помилка при обробці можливості {opp.symbol}: {e}")
+                logger.error(traceback.format_exc())
+        
+        # Один підсумок для адміністратора на весь цикл замість повідомлення на кожну можливість
+        if report_lines:
+            await self.send_message(
+                f"Розсилка про {len(opportunities)} можливостей:\n" + "\n".join(report_lines),
+                chat_id=self.admin_chat_id,
+                priority=PRIORITY_ADMIN
+            )
+            
+        return delivered_count
+        
+    def _edit_key(self, key: OpportunityKey) -> Optional[str]:
+        """
+        Ключ повідомлення про можливість, за яким оновлення редагують уже надіслане сповіщення
+        """
+        return "|".join(key) if config.TELEGRAM_EDIT_ALERTS else None
+        
+    async def notify_closed_opportunities(self, states: List[OpportunityState]) -> int:
+        """
+        Повідомляє користувачів про закриття можливостей, про які їм надсилались сповіщення
+        
+        Args:
+            states (List[OpportunityState]): Стани закритих можливостей
+            
+        Returns:
+            int: Кількість надісланих повідомлень
+        """
+        if not self.notifier:
+            logger.error("Спроба відправити повідомлення, але Telegram Worker не запущено")
+            return 0
+            
+        sent_count = 0
+        for state in states:
+            # Закриття отримують саме ті, кому надсилались сповіщення про цю можливість
+            recipients = state.recipients
+            if not recipients:
+                continue
+                
+            message = state.to_closed_message()
+            edit_key = self._edit_key(state.key)
+            for user_id in recipients:
+                # Дайджест містить лише знайдені можливості
+                if self.user_manager.get_digest_interval(user_id):
+                    continue
+                try:
+                    await self.send_message(message, user_id, parse_mode="HTML", priority=PRIORITY_ALERT,
+                                            edit_key=edit_key, final=True)
+                    sent_count += 1
+                except Exception as e:
+                    logger.error(f"Помилка при відправці повідомлення користувачу {user_id}: {e}")
+                    
+        logger.info(f"Надіслано {sent_count} повідомлень про закриття {len(states)} можливостей")
+        return sent_count
+        
     async def notify_about_opportunity(self, opportunity_message: str):
         """
         Повідомляє користувачів про арбітражну можливість
@@ -194,7 +400,8 @@ class TelegramWorker:
             await self.send_message(
                 f"❌ Помилка: не вдалося визначити пару з повідомлення про арбітражну можливість.\n\n"
                 f"Повідомлення:\n{opportunity_message}",
-                chat_id=self.admin_chat_id
+                chat_id=self.admin_chat_id,
+                priority=PRIORITY_ADMIN
             )
             return False
             
@@ -215,60 +422,27 @@ class TelegramWorker:
         
         logger.info(f"Виявлено арбітражну можливість: {symbol} з прибутком {profit_percent}%")
         
-        # Отримуємо список активних схвалених користувачів
-        active_users = self.user_manager.get_active_approved_users()
-        logger.info(f"Знайдено {len(active_users)} активних схвалених користувачів")
-        
-        # Для трикутного арбітражу або специфічних шляхів
-        # Розбиваємо symbol на складові: може бути "BTC/USDT" або "USDT -> BTC -> ETH -> USDT"
-        symbol_parts = [part.strip() for part in re.split(r'[/\->]', symbol)]
+        # Отримуємо з індексу підписок лише тих користувачів, яких цікавить ця пара/шлях
+        # і чий поріг прибутку не перевищує прибуток можливості
+        recipients = self.user_manager.get_subscribers(symbol, profit_percent)
+        active_count = self.user_manager.count_active_approved_users()
+        logger.info(f"Знайдено {len(recipients)} отримувачів серед {active_count} активних схвалених користувачів")
         
         # Кількість повідомлених користувачів
         notified_count = 0
-        skipped_count = 0
+        skipped_count = active_count - len(recipients)
         
-        for user_id, user_data in active_users.items():
+        for user_id in recipients:
+            # Відправляємо повідомлення
+            logger.info(f"Відправка повідомлення про можливість {symbol} користувачу {user_id}")
             try:
-                # Отримуємо список пар користувача
-                user_pairs = user_data.get("pairs", [])
-                logger.debug(f"Користувач {user_id} підписаний на {len(user_pairs)} пар: {user_pairs}")
-                
-                # Перевіряємо, чи користувача цікавить ця пара
-                # 1. Пряма перевірка повного символу
-                found_match = symbol in user_pairs
-                
-                # 2. Перевірка для компонентів символу (для трикутних шляхів)
-                if not found_match and "/" not in symbol:
-                    # Перевіряємо, чи є хоч одна з криптовалют у парах користувача
-                    for part in symbol_parts:
-                        if part and any(part in pair for pair in user_pairs):
-                            found_match = True
-                            break
-                
-                if not found_match:
-                    logger.debug(f"Користувач {user_id} не підписаний на пару {symbol}. Його пари: {user_pairs}")
-                    skipped_count += 1
-                    continue
-                
-                # Перевіряємо мінімальний поріг прибутку
-                user_min_profit = user_data.get("min_profit", config.DEFAULT_MIN_PROFIT)
-                if profit_percent < user_min_profit:
-                    logger.debug(f"Прибуток {profit_percent}% менший за поріг користувача {user_id} ({user_min_profit}%)")
-                    skipped_count += 1
-                    continue
-                
-                # Відправляємо повідомлення
-                logger.info(f"Відправка повідомлення про можливість {symbol} користувачу {user_id}")
-                try:
-                    await self.send_message(opportunity_message, user_id, parse_mode="HTML")
-                    # Збільшуємо лічильник повідомлень
-                    self.user_manager.increment_notifications(user_id)
-                    notified_count += 1
-                    logger.info(f"Повідомлення успішно надіслано користувачу {user_id}")
-                except Exception as e:
-                    logger.error(f"Помилка при відправці повідомлення користувачу {user_id}: {e}")
+                await self.send_message(opportunity_message, user_id, parse_mode="HTML", priority=PRIORITY_ALERT)
+                # Збільшуємо лічильник повідомлень
+                self.user_manager.increment_notifications(user_id)
+                notified_count += 1
+                logger.info(f"Повідомлення успішно надіслано користувачу {user_id}")
             except Exception as e:
-                logger.error(f"Помилка при обробці користувача {user_id}: {e}")
+                logger.error(f"Помилка при відправці повідомлення користувачу {user_id}: {e}")
                 
         # Також відправляємо повідомлення адміністратору
         if notified_count == 0:
@@ -276,17 +450,54 @@ class TelegramWorker:
             await self.send_message(
                 f"⚠️ Повідомлення про арбітражну можливість для {symbol} не надіслано жодному користувачу.\n"
                 f"Пропущено {skipped_count} користувачів.",
-                chat_id=self.admin_chat_id
+                chat_id=self.admin_chat_id,
+                priority=PRIORITY_ADMIN
             )
         else:
             logger.info(f"Повідомлено {notified_count} користувачів про арбітражну можливість для {symbol} (пропущено {skipped_count})")
             await self.send_message(
                 f"✅ Повідомлення про арбітражну можливість для {symbol} надіслано {notified_count} користувачам.",
-                chat_id=self.admin_chat_id
+                chat_id=self.admin_chat_id,
+                priority=PRIORITY_ADMIN
             )
             
         return notified_count > 0
             
+    async def send_digests(self):
+        """
+        Надсилає дайджести, вікно яких завершилось
+        
+        Кожен дайджест - одне повідомлення (або кілька, якщо текст довший за ліміт Telegram)
+        незалежно від кількості можливостей у ньому.
+        """
+        logger.info("Запущено відправку дайджестів")
+        
+        while self.running:
+            try:
+                await asyncio.sleep(config.DIGEST_CHECK_INTERVAL)
+                await self._send_digest_batch(self.digest.pop_due())
+                    
+            except asyncio.CancelledError:
+                logger.info("Відправку дайджестів зупинено")
+                break
+            except Exception as e:
+                logger.error(f"Помилка при відправці дайджестів: {e}")
+                logger.error(traceback.format_exc())
+                
+    async def _send_digest_batch(self, digests: List[Tuple[str, List[str], int]]):
+        """
+        Ставить у чергу дайджести, забрані з DigestBuffer
+        """
+        for user_id, lines, dropped in digests:
+            # Користувач міг перейти в режим instant або стати неактивним, поки збирався дайджест
+            if not self.user_manager.get_digest_interval(user_id):
+                continue
+                
+            for message in render_digest(lines, dropped):
+                await self.send_message(message, user_id, parse_mode="HTML", priority=PRIORITY_ALERT)
+            self.user_manager.increment_notifications(user_id)
+            logger.info(f"Надіслано дайджест з {len(lines)} можливостей користувачу {user_id}")
+            
     async def monitor_queue(self):
         """
         Моніторить стан черги повідомлень
@@ -313,16 +524,19 @@ class TelegramWorker:
                 
     async def handle_commands(self):
         """
-        Обробляє команди від користувачів через Telegram API
+        Отримує команди від користувачів через Telegram API (довге опитування getUpdates)
         """
         logger.info("Запущено обробник команд Telegram")
         
         # Базовий URL для Telegram Bot API
         base_url = f"https://api.telegram.org/bot{self.bot_token}"
         
+        # getUpdates не працює, поки встановлено webhook (наприклад, після запуску в режимі webhook)
+        await self.delete_webhook()
+        
         while self.running:
             try:
-                # Отримуємо оновлення
+                # Отримуємо оновлення (Telegram тримає запит до 30 секунд, поки немає нових)
                 url = f"{base_url}/getUpdates?offset={self.last_update_id + 1}&timeout=30"
                 
                 if not self.session:
@@ -344,13 +558,14 @@ class TelegramWorker:
                                     if update["update_id"] > self.last_update_id:
                                         self.last_update_id = update["update_id"]
                                     
-                                    await self._process_update(update)
+                                    # Передаємо оновлення пулу обробників, не чекаючи завершення обробки
+                                    while not self.dispatcher.submit(update):
+                                        await asyncio.sleep(0.1)
                     else:
                         logger.error(f"Помилка при отриманні оновлень: {response.status}")
                         logger.error(f"Відповідь: {await response.text()}")
-                
-                # Невелика затримка між запитами, щоб уникнути надмірного навантаження
-                await asyncio.sleep(1)
+                        # Затримка перед повторним запитом лише після помилки
+                        await asyncio.sleep(1)
                 
             except asyncio.CancelledError:
                 logger.info("Обробник команд зупинено")
@@ -360,6 +575,64 @@ class TelegramWorker:
                 logger.error(traceback.format_exc())
                 # Чекаємо трохи перед повторною спробою
                 await asyncio.sleep(5)
+                
+    async def set_webhook(self) -> bool:
+        """
+        Реєструє webhook, на який Telegram надсилатиме оновлення
+        """
+        url = f"https://api.telegram.org/bot{self.bot_token}/setWebhook"
+        params = {
+            "url": config.TELEGRAM_WEBHOOK_URL,
+            "allowed_updates": ["message", "callback_query"],
+            "max_connections": config.TELEGRAM_UPDATE_WORKERS,
+            "secret_token": self.webhook_secret
+        }
+        
+        try:
+            async with self.session.post(url, json=params) as response:
+                if response.status == 200:
+                    logger.info(f"Webhook встановлено: {config.TELEGRAM_WEBHOOK_URL}")
+                    return True
+                logger.error(f"Помилка при встановленні webhook: {response.status} - {await response.text()}")
+        except Exception as e:
+            logger.error(f"Помилка при встановленні webhook: {e}")
+        return False
+        
+    async def delete_webhook(self) -> bool:
+        """
+        Видаляє webhook, щоб оновлення можна було отримувати через getUpdates
+        """
+        url = f"https://api.telegram.org/bot{self.bot_token}/deleteWebhook"
+        try:
+            async with self.session.post(url) as response:
+                return response.status == 200
+        except Exception as e:
+            logger.error(f"Помилка при видаленні webhook: {e}")
+            return False
+            
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        """
+        Приймає оновлення від Telegram через webhook (маршрут веб-сервера)
+        
+        Оновлення лише передається пулу обробників, тож відповідь повертається одразу.
+        """
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if not hmac.compare_digest(token.encode(), self.webhook_secret.encode()):
+            logger.warning(f"Запит на webhook з невірним секретним токеном від {request.remote}")
+            return web.Response(status=401)
+            
+        try:
+            update = await request.json()
+        except Exception:
+            return web.Response(status=400)
+            
+        if not isinstance(update, dict) or "update_id" not in update:
+            return web.Response(status=400)
+            
+        # Якщо пул переповнений, Telegram повторить доставку пізніше
+        if not self.dispatcher.submit(update):
+            return web.Response(status=503)
+        return web.Response(status=200)
     
     async def _process_update(self, update):
         """
@@ -398,16 +671,21 @@ class TelegramWorker:
                         await self._handle_pairs_command(chat_id, user_id, args)
                     elif command == '/threshold':
                         await self._handle_threshold_command(chat_id, user_id, args)
+                    elif command == '/digest':
+                        await self._handle_digest_command(chat_id, user_id, args)
                     elif command == '/approve' and user_id in config.ADMIN_USER_IDS:
                         await self._handle_admin_approve_command(chat_id, user_id, args)
                     elif command == '/block' and user_id in config.ADMIN_USER_IDS:
                         await self._handle_admin_block_command(chat_id, user_id, args)
                     elif command == '/users' and user_id in config.ADMIN_USER_IDS:
                         await self._handle_admin_users_command(chat_id)
+                    elif command == '/profile' and user_id in config.ADMIN_USER_IDS:
+                        await self._handle_admin_profile_command(chat_id, args)
                     else:
                         await self.send_message(
                             f"Невідома команда: {command}\nВикористайте /help для перегляду доступних команд",
-                            chat_id
+                            chat_id,
+                            priority=PRIORITY_INTERACTIVE
                         )
                 else:
                     # Звичайне повідомлення
@@ -467,7 +745,7 @@ class TelegramWorker:
             f"Використовуйте команду /help щоб дізнатися більше про доступні команди."
         )
         
-        await self.send_message(welcome_message, chat_id)
+        await self.send_message(welcome_message, chat_id, priority=PRIORITY_INTERACTIVE)
         logger.info(f"Відправлено привітальне повідомлення користувачу {user_id}")
 
     async def _handle_help_command(self, chat_id):
@@ -479,7 +757,7 @@ class TelegramWorker:
         for command, description in config.BOT_COMMANDS.items():
             help_message += f"{command} - {description}\n"
         
-        await self.send_message(help_message, chat_id, parse_mode="HTML")
+        await self.send_message(help_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
 
     async def _handle_status_command(self, chat_id, user_id):
         """
@@ -488,7 +766,7 @@ class TelegramWorker:
         user = self.user_manager.get_user(user_id)
         
         if not user:
-            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id)
+            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         status_message = (
@@ -498,6 +776,7 @@ class TelegramWorker:
             f"<b>Схвалений:</b> {'✅' if user.get('is_approved', False) else '❌'}\n"
             f"<b>Підписки на пари:</b> {len(user.get('pairs', []))}\n"
             f"<b>Мінімальний прибуток:</b> {user.get('min_profit', config.DEFAULT_MIN_PROFIT)}%\n"
+            f"<b>Режим доставки:</b> {user.get('delivery_mode', DELIVERY_INSTANT)}\n"
             f"<b>Отримано повідомлень:</b> {user.get('notifications_count', 0)}\n"
         )
         
@@ -511,7 +790,7 @@ class TelegramWorker:
             if len(pairs) > 10:
                 status_message += f"...та ще {len(pairs) - 10}\n"
         
-        await self.send_message(status_message, chat_id, parse_mode="HTML")
+        await self.send_message(status_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
 
     async def _handle_pairs_command(self, chat_id, user_id, args):
         """
@@ -520,7 +799,7 @@ class TelegramWorker:
         user = self.user_manager.get_user(user_id)
         
         if not user:
-            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id)
+            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         # Якщо є аргументи, то це можуть бути пари для додавання/видалення
@@ -547,14 +826,16 @@ class TelegramWorker:
                     await self.send_message(
                         f"✅ Додано {len(valid_pairs)} пар до ваших підписок.\n\n"
                         f"Використайте /status щоб переглянути ваші поточні підписки.",
-                        chat_id
+                        chat_id,
+                        priority=PRIORITY_INTERACTIVE
                     )
                 else:
                     await self.send_message(
                         f"⚠️ Жодної валідної пари не знайдено серед {len(args[1:])} вказаних.\n\n"
                         f"Доступні пари: {', '.join(config.ALL_PAIRS[:5])}...\n"
                         f"Використайте /pairs без аргументів для перегляду всіх доступних пар.",
-                        chat_id
+                        chat_id,
+                        priority=PRIORITY_INTERACTIVE
                     )
             
             elif action == "remove" and len(args) > 1:
@@ -577,7 +858,8 @@ class TelegramWorker:
                 await self.send_message(
                     f"✅ Видалено {removed_count} пар з ваших підписок.\n\n"
                     f"Використайте /status щоб переглянути ваші поточні підписки.",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
             
             elif action == "all":
@@ -587,7 +869,8 @@ class TelegramWorker:
                 await self.send_message(
                     f"✅ Ви підписані на всі {len(config.ALL_PAIRS)} доступних пар.\n\n"
                     f"Використайте /status щоб переглянути ваші поточні підписки.",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
             
             elif action == "clear":
@@ -597,7 +880,8 @@ class TelegramWorker:
                 await self.send_message(
                     "✅ Всі підписки видалено.\n\n"
                     "Використайте /pairs all щоб підписатися на всі доступні пари.",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
             
             else:
@@ -609,7 +893,8 @@ class TelegramWorker:
                     "/pairs all - підписатися на всі пари\n"
                     "/pairs clear - видалити всі підписки\n"
                     "/pairs - переглянути доступні пари",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
         
         else:
@@ -634,7 +919,7 @@ class TelegramWorker:
             pairs_message += "/pairs all - підписатися на всі пари\n"
             pairs_message += "/pairs clear - видалити всі підписки\n"
             
-            await self.send_message(pairs_message, chat_id, parse_mode="HTML")
+            await self.send_message(pairs_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
 
     async def _handle_threshold_command(self, chat_id, user_id, args):
         """
@@ -643,7 +928,7 @@ class TelegramWorker:
         user = self.user_manager.get_user(user_id)
         
         if not user:
-            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id)
+            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         # Якщо є аргументи, то це може бути новий поріг
@@ -653,11 +938,11 @@ class TelegramWorker:
                 
                 # Перевіряємо чи поріг у допустимих межах
                 if new_threshold < 0.1:
-                    await self.send_message("⚠️ Поріг не може бути меншим за 0.1%", chat_id)
+                    await self.send_message("⚠️ Поріг не може бути меншим за 0.1%", chat_id, priority=PRIORITY_INTERACTIVE)
                     return
                 
                 if new_threshold > 10.0:
-                    await self.send_message("⚠️ Поріг не може бути більшим за 10.0%", chat_id)
+                    await self.send_message("⚠️ Поріг не може бути більшим за 10.0%", chat_id, priority=PRIORITY_INTERACTIVE)
                     return
                 
                 # Встановлюємо новий поріг
@@ -666,13 +951,15 @@ class TelegramWorker:
                 await self.send_message(
                     f"✅ Встановлено новий мінімальний поріг прибутку: {new_threshold}%\n\n"
                     f"Тепер ви будете отримувати сповіщення лише про можливості з прибутком не менше {new_threshold}%.",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
                 
             except ValueError:
                 await self.send_message(
                     "⚠️ Невірний формат порогу. Використайте число з десятковою крапкою, наприклад: /threshold 0.8",
-                    chat_id
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
                 )
         
         else:
@@ -686,27 +973,71 @@ class TelegramWorker:
                 f"/threshold 1.0 - для отримання сповіщень про можливості з прибутком від 1.0%\n"
             )
             
-            await self.send_message(threshold_message, chat_id, parse_mode="HTML")
+            await self.send_message(threshold_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
+
+    async def _handle_digest_command(self, chat_id, user_id, args):
+        """
+        Обробляє команду /digest для вибору режиму доставки сповіщень
+        """
+        user = self.user_manager.get_user(user_id)
+        
+        if not user:
+            await self.send_message("⚠️ Ваш профіль не знайдено. Будь ласка, використайте команду /start для реєстрації.", chat_id, priority=PRIORITY_INTERACTIVE)
+            return
+        
+        if args:
+            value = args[0].lower()
+            
+            if value in ("off", DELIVERY_INSTANT):
+                self.user_manager.set_user_delivery_mode(user_id, DELIVERY_INSTANT)
+                self.digest.discard(user_id)
+                await self.send_message("✅ Сповіщення надходитимуть одразу після виявлення можливості.", chat_id, priority=PRIORITY_INTERACTIVE)
+                return
+            
+            if not value.isdigit() or int(value) < config.DIGEST_MIN_INTERVAL:
+                await self.send_message(
+                    f"⚠️ Вкажіть вікно дайджесту в секундах (не менше {config.DIGEST_MIN_INTERVAL}), наприклад: /digest 300",
+                    chat_id,
+                    priority=PRIORITY_INTERACTIVE
+                )
+                return
+            
+            self.user_manager.set_user_delivery_mode(user_id, f"digest:{int(value)}")
+            await self.send_message(
+                f"✅ Сповіщення збиратимуться в дайджест і надходитимуть не частіше ніж раз на {int(value)} с.\n\n"
+                f"Використайте /digest off щоб повернутись до миттєвих сповіщень.",
+                chat_id,
+                priority=PRIORITY_INTERACTIVE
+            )
+        
+        else:
+            digest_message = (
+                f"<b>📋 Поточний режим доставки:</b> {user.get('delivery_mode', DELIVERY_INSTANT)}\n\n"
+                f"/digest 300 - отримувати один дайджест усіх можливостей за 5 хвилин\n"
+                f"/digest off - отримувати кожне сповіщення одразу\n"
+            )
+            
+            await self.send_message(digest_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
 
     async def _handle_admin_approve_command(self, chat_id, admin_id, args):
         """
         Обробляє команду /approve для схвалення користувача (лише для адміністраторів)
         """
         if not args:
-            await self.send_message("⚠️ Потрібно вказати ID користувача для схвалення", chat_id)
+            await self.send_message("⚠️ Потрібно вказати ID користувача для схвалення", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         user_id = args[0]
         user = self.user_manager.get_user(user_id)
         
         if not user:
-            await self.send_message(f"⚠️ Користувача з ID {user_id} не знайдено", chat_id)
+            await self.send_message(f"⚠️ Користувача з ID {user_id} не знайдено", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         # Схвалюємо користувача
         self.user_manager.approve_user(user_id)
         
-        await self.send_message(f"✅ Користувача {user_id} схвалено", chat_id)
+        await self.send_message(f"✅ Користувача {user_id} схвалено", chat_id, priority=PRIORITY_INTERACTIVE)
         
         # Також повідомляємо користувача про схвалення
         try:
@@ -723,20 +1054,20 @@ class TelegramWorker:
         Обробляє команду /block для блокування користувача (лише для адміністраторів)
         """
         if not args:
-            await self.send_message("⚠️ Потрібно вказати ID користувача для блокування", chat_id)
+            await self.send_message("⚠️ Потрібно вказати ID користувача для блокування", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         user_id = args[0]
         user = self.user_manager.get_user(user_id)
         
         if not user:
-            await self.send_message(f"⚠️ Користувача з ID {user_id} не знайдено", chat_id)
+            await self.send_message(f"⚠️ Користувача з ID {user_id} не знайдено", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         # Блокуємо користувача
         self.user_manager.block_user(user_id)
         
-        await self.send_message(f"✅ Користувача {user_id} заблоковано", chat_id)
+        await self.send_message(f"✅ Користувача {user_id} заблоковано", chat_id, priority=PRIORITY_INTERACTIVE)
         
         # Також повідомляємо користувача про блокування
         try:
@@ -753,9 +1084,9 @@ class TelegramWorker:
         Обробляє команду /users для перегляду списку користувачів (лише для адміністраторів)
         """
         # Отримуємо різні категорії користувачів
-        all_users = self.user_manager.get_all_users()
+        all_users = await self.user_manager.get_all_users()
         active_users = self.user_manager.get_active_approved_users()
-        pending_users = self.user_manager.get_pending_users()
+        pending_users = await self.user_manager.get_pending_users()
         admin_users = self.user_manager.get_admin_users()
         
         users_message = (
@@ -783,7 +1114,56 @@ class TelegramWorker:
                 users_message += f"{user_info}\n"
                 users_message += f"  /approve {user_id} - схвалити | /block {user_id} - заблокувати\n"
         
-        await self.send_message(users_message, chat_id, parse_mode="HTML")
+        await self.send_message(users_message, chat_id, parse_mode="HTML", priority=PRIORITY_INTERACTIVE)
+
+    async def _handle_admin_profile_command(self, chat_id, args):
+        """
+        Обробляє команду /profile [секунд|stop] для профілювання процесу (лише для адміністраторів)
+        """
+        if args and args[0].lower() == "stop":
+            if PROFILER.running:
+                PROFILER.stop()
+            else:
+                await self.send_message("⚠️ Профілювання не виконується", chat_id, priority=PRIORITY_INTERACTIVE)
+            return
+        
+        try:
+            seconds = float(args[0]) if args else config.PROFILER_DEFAULT_DURATION
+        except ValueError:
+            await self.send_message("⚠️ Використання: /profile [секунд] або /profile stop", chat_id, priority=PRIORITY_INTERACTIVE)
+            return
+        
+        if not PROFILER.start(seconds):
+            status = PROFILER.status()
+            await self.send_message(
+                f"⚠️ Профілювання вже виконується ({status['elapsed']:.0f} з {status['duration']:.0f} с)", chat_id, priority=PRIORITY_INTERACTIVE
+            )
+            return
+        
+        await self.send_message(f"⏱ Профілювання запущено на {PROFILER.duration:.0f} с", chat_id, priority=PRIORITY_INTERACTIVE)
+        # Підсумок надсилається після завершення, не затримуючи обробку інших команд
+        self.profile_task = asyncio.create_task(self._report_profile(chat_id))
+
+    async def _report_profile(self, chat_id):
+        """
+        Надсилає адміністратору підсумок профілювання після його завершення
+        """
+        result = await PROFILER.wait()
+        if not result or "error" in result:
+            await self.send_message(f"❌ Помилка при профілюванні: {(result or {}).get('error')}", chat_id)
+            return
+        
+        profile_message = (
+            f"<b>📊 Профілювання завершено</b>\n\n"
+            f"<b>Зрізів:</b> {result['samples']}\n"
+            f"<b>Унікальних стеків:</b> {result['stacks']}\n"
+            f"<b>Файл:</b> <code>{result['file']}</code>\n\n"
+            f"<b>Найбільше власного часу:</b>\n"
+        )
+        for name, percent in result["top"]:
+            profile_message += f"{percent}% - <code>{html.escape(name)}</code>\n"
+        
+        await self.send_message(profile_message, chat_id, parse_mode="HTML")
 
     async def _handle_regular_message(self, chat_id, user_id, text):
         """
@@ -797,7 +1177,8 @@ class TelegramWorker:
             await self.send_message(
                 "⚠️ Ваш обліковий запис ще не схвалено.\n"
                 "Будь ласка, зачекайте на схвалення адміністратором або зв'яжіться з ним для прискорення процесу.",
-                chat_id
+                chat_id,
+                priority=PRIORITY_INTERACTIVE
             )
             
             # Сповіщаємо адміністраторів про нового користувача
@@ -810,7 +1191,8 @@ class TelegramWorker:
                         f"Логін: {user.get('username', 'відсутній')}\n\n"
                         f"Для схвалення: /approve {user_id}\n"
                         f"Для блокування: /block {user_id}",
-                        admin_id
+                        admin_id,
+                        priority=PRIORITY_ADMIN
                     )
                 except Exception as e:
                     logger.error(f"Помилка при сповіщенні адміністратора {admin_id}: {e}")
@@ -826,7 +1208,7 @@ class TelegramWorker:
             "Використайте /help, щоб дізнатися про доступні команди."
         )
         
-        await self.send_message(response, chat_id)
+        await self.send_message(response, chat_id, priority=PRIORITY_INTERACTIVE)
 
     async def _handle_pair_selection(self, query_id, chat_id, user_id, data):
         """
@@ -841,7 +1223,7 @@ class TelegramWorker:
         # Отримуємо поточні пари користувача
         user = self.user_manager.get_user(user_id)
         if not user:
-            await self.send_message("⚠️ Ваш профіль не знайдено", chat_id)
+            await self.send_message("⚠️ Ваш профіль не знайдено", chat_id, priority=PRIORITY_INTERACTIVE)
             return
         
         user_pairs = user.get('pairs', [])
@@ -857,7 +1239,7 @@ class TelegramWorker:
         # Оновлюємо пари користувача
         self.user_manager.update_user_pairs(user_id, user_pairs)
         
-        await self.send_message(f"✅ Пару {pair} {action} ваших підписок", chat_id)
+        await self.send_message(f"✅ Пару {pair} {action} ваших підписок", chat_id, priority=PRIORITY_INTERACTIVE)
 
     async def _handle_threshold_selection(self, query_id, chat_id, user_id, data):
         """
@@ -875,10 +1257,10 @@ class TelegramWorker:
             # Встановлюємо новий поріг
             self.user_manager.set_user_min_profit(user_id, threshold)
             
-            await self.send_message(f"✅ Встановлено новий мінімальний поріг прибутку: {threshold}%", chat_id)
+            await self.send_message(f"✅ Встановлено новий мінімальний поріг прибутку: {threshold}%", chat_id, priority=PRIORITY_INTERACTIVE)
             
         except ValueError:
-            await self.send_message("⚠️ Невірний формат порогу", chat_id)
+            await self.send_message("⚠️ Невірний формат порогу", chat_id, priority=PRIORITY_INTERACTIVE)
 
     async def health_check(self):
         """
@@ -0,0 +1,136 @@
+# update_dispatcher.py
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Set
+
+import config
+
+logger = logging.getLogger('telegram')
+
+class UpdateDispatcher:
+    """
+    Розподіляє оновлення Telegram між пулом обробників
+
+    - оновлення з update_id, що вже зустрічався серед останніх dedup_window, відкидаються
+      (Telegram повторює доставку webhook, якщо не отримав відповіді вчасно);
+    - оновлення одного користувача обробляються строго по черзі, а різних
+      користувачів - паралельно до workers одночасно, тож повільний обробник
+      затримує лише свого користувача;
+    - загальна кількість оновлень в очікуванні обмежена max_pending.
+    """
+    def __init__(self, handler: Callable[[Dict], Awaitable[None]],
+                 workers: int = config.TELEGRAM_UPDATE_WORKERS,
+                 dedup_window: int = config.TELEGRAM_UPDATE_DEDUP_WINDOW,
+                 max_pending: int = config.TELEGRAM_UPDATE_MAX_PENDING):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+
+        self._seen: Set[int] = set()
+        self._seen_order: Deque[int] = deque(maxlen=max(1, dedup_window))
+
+        self._user_queues: Dict[str, Deque[Dict]] = {}  # Оновлення, що чекають, за користувачем
+        self._ready: asyncio.Queue = asyncio.Queue()  # Користувачі з оновленнями, яких зараз ніхто не обробляє
+        self._pending = 0
+        self._tasks = []
+
+        self.updates_processed = 0
+        self.updates_duplicated = 0
+        self.updates_rejected = 0
+
+    def start(self):
+        """
+        Запускає пул обробників
+        """
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            logger.info(f"Обробник оновлень Telegram запущено ({self.workers} обробників)")
+
+    async def stop(self):
+        """
+        Зупиняє пул обробників (оновлення в очікуванні відкидаються)
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._pending:
+            logger.warning(f"Обробник оновлень зупинено, не оброблено {self._pending} оновлень")
+
+    def submit(self, update: Dict) -> bool:
+        """
+        Додає оновлення до черги його користувача
+
+        Args:
+            update (Dict): Оновлення Telegram
+
+        Returns:
+            bool: False, якщо черга переповнена (оновлення слід доставити пізніше)
+        """
+        update_id = update.get("update_id")
+        if update_id is not None:
+            if update_id in self._seen:
+                self.updates_duplicated += 1
+                logger.debug(f"Повторне оновлення {update_id} пропущено")
+                return True
+
+        if self._pending >= self.max_pending:
+            self.updates_rejected += 1
+            logger.warning(f"Черга оновлень переповнена ({self._pending}), оновлення {update_id} відкладено")
+            return False
+
+        if update_id is not None:
+            if len(self._seen_order) == self._seen_order.maxlen:
+                self._seen.discard(self._seen_order[0])
+            self._seen_order.append(update_id)
+            self._seen.add(update_id)
+
+        user_key = self._user_key(update)
+        queue = self._user_queues.get(user_key)
+        if queue is None:
+            # Користувача ніхто не обробляє - він одразу готовий
+            queue = self._user_queues[user_key] = deque()
+            self._ready.put_nowait(user_key)
+        queue.append(update)
+        self._pending += 1
+        return True
+
+    def qsize(self) -> int:
+        return self._pending
+
+    def _user_key(self, update: Dict) -> str:
+        """
+        Визначає користувача, від якого надійшло оновлення
+        """
+        for field in ("message", "edited_message", "callback_query"):
+            sender = (update.get(field) or {}).get("from")
+            if sender and "id" in sender:
+                return str(sender["id"])
+        return ""
+
+    async def _worker(self, index: int):
+        """
+        Обробник пулу: бере готового користувача і обробляє його найстаріше оновлення
+        """
+        while True:
+            user_key = await self._ready.get()
+            queue = self._user_queues[user_key]
+            update = queue.popleft()
+
+            try:
+                await self.handler(update)
+                self.updates_processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка при обробці оновлення {update.get('update_id')}: {e}")
+            finally:
+                self._pending -= 1
+
+            # Наступне оновлення користувача стає в кінець черги готових, щоб не затримувати інших
+            if queue:
+                self._ready.put_nowait(user_key)
+            else:
+                del self._user_queues[user_key]
@@ -1,28 +1,73 @@
 # user_manager.py
+import asyncio
 import logging
 import json
-from typing import Dict, List, Optional, Any
+import bisect
+import re
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Optional, Any, Set, Tuple
 import datetime
 import config
+from user_storage import UserStorage, create_user_storage
 
 logger = logging.getLogger('main')
 users_logger = logging.getLogger('users')
 
+DELIVERY_INSTANT = "instant"
+
+def parse_delivery_mode(mode: str) -> Optional[int]:
+    """
+    Розбирає режим доставки сповіщень
+    
+    Args:
+        mode (str): "instant" або "digest:N" (N - вікно дайджесту в секундах)
+        
+    Returns:
+        Optional[int]: Вікно дайджесту в секундах або None для миттєвої доставки
+        
+    Raises:
+        ValueError: Якщо режим має невірний формат
+    """
+    if not mode or mode == DELIVERY_INSTANT:
+        return None
+    
+    name, _, seconds = mode.partition(":")
+    if name != "digest" or not seconds.isdigit():
+        raise ValueError(f"Невідомий режим доставки: {mode}")
+    return int(seconds)
+
 class UserManager:
     """
     Клас для керування користувачами та їх доступом
     """
-    def __init__(self, users_file: str = config.USERS_FILE):
+    def __init__(self, users_file: str = config.USERS_FILE, storage: Optional[UserStorage] = None):
         self.users_file = users_file
+        self.storage = storage or create_user_storage()
+        # Користувачі в пам'яті: усі (json) або активні схвалені, адміністратори та ті, до кого зверталися (sqlite)
         self.users = {}
+        # Порядок останнього звернення до користувачів (sqlite): давно не потрібні витісняються з пам'яті
+        self._recent: "OrderedDict[str, None]" = OrderedDict()
+        # Інвертований індекс підписок активних схвалених користувачів:
+        # пара/валюта -> список (min_profit, user_id), відсортований за порогом
+        self._pair_index: Dict[str, List[Tuple[float, str]]] = {}
+        self._currency_index: Dict[str, List[Tuple[float, str]]] = {}
+        self._indexed: Dict[str, Tuple[float, List[str], List[str]]] = {}  # user_id -> (поріг, пари, валюти) в індексі
+        self._digest_intervals: Dict[str, int] = {}  # user_id -> вікно дайджесту (секунд) для користувачів у режимі digest
+        # Відкладене збереження: змінені користувачі записуються разом після паузи або накопичення змін
+        self._dirty: Set[str] = set()
+        self._flushing: Set[str] = set()  # Користувачі, що записуються зараз
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_task: Optional[asyncio.Task] = None
         self.load_users()
         
     def load_users(self) -> bool:
         """
-        Завантажує користувачів з файлу
+        Завантажує користувачів зі сховища
         """
         try:
-            self.users = config.load_users()
+            self.users = self.storage.load_initial()
+            self._rebuild_index()
             users_logger.info(f"Завантажено {len(self.users)} користувачів")
             return True
         except Exception as e:
@@ -31,24 +76,104 @@ class UserManager:
             
     def save_users(self) -> bool:
         """
-        Зберігає користувачів у файл
+        Одразу зберігає користувачів у сховище
         """
         try:
-            result = config.save_users(self.users)
-            if result:
-                users_logger.info(f"Збережено {len(self.users)} користувачів")
-            return result
+            self._cancel_scheduled_flush()
+            self._dirty.clear()
+            self.storage.write(self.storage.prepare(self.users, set(self.users)))
+            users_logger.info(f"Збережено {len(self.users)} користувачів")
+            return True
         except Exception as e:
             users_logger.error(f"Помилка при збереженні користувачів: {e}")
             return False
             
+    def mark_dirty(self, user_id: str):
+        """
+        Позначає користувача як зміненого; збереження виконується пізніше одним записом
+        
+        Файл записується через USERS_FLUSH_INTERVAL секунд після першої незбереженої зміни
+        або одразу, якщо змінено USERS_FLUSH_THRESHOLD користувачів. Поза циклом подій
+        (скрипти) користувачі зберігаються одразу.
+        """
+        self._dirty.add(user_id)
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save_users()
+            return
+            
+        if self._flush_task and not self._flush_task.done():
+            # Поточний запис перевірить нові зміни після завершення
+            return
+            
+        if len(self._dirty) >= config.USERS_FLUSH_THRESHOLD:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(config.USERS_FLUSH_INTERVAL, self._start_flush)
+            
+    async def flush(self) -> bool:
+        """
+        Записує незбережені зміни (викликається також при зупинці)
+        
+        Returns:
+            bool: True, якщо незбережених змін не залишилось
+        """
+        self._cancel_scheduled_flush()
+        if self._flush_task and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._cancel_scheduled_flush()
+        if self._dirty:
+            self._flush_task = asyncio.create_task(self._flush())
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._cancel_scheduled_flush()
+        return not self._dirty
+        
+    def _cancel_scheduled_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+            
+    def _start_flush(self):
+        self._flush_handle = None
+        if self._dirty and not (self._flush_task and not self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self._flush())
+            
+    async def _flush(self):
+        """
+        Записує змінених користувачів у сховище в окремому потоці
+        
+        Знімок знімається в циклі подій (тож він узгоджений), а запис на диск
+        виконується в потоці.
+        """
+        dirty, self._dirty = self._dirty, set()
+        payload = self.storage.prepare(self.users, dirty)
+        self._flushing = dirty
+        
+        try:
+            await asyncio.to_thread(self.storage.write, payload)
+            users_logger.info(f"Збережено {len(self.users)} користувачів ({len(dirty)} змінених)")
+        except Exception as e:
+            users_logger.error(f"Помилка при збереженні користувачів: {e}")
+            # Зміни не втрачено - вони будуть записані наступного разу
+            self._dirty |= dirty
+        finally:
+            self._flushing = set()
+        # Збережених користувачів тепер можна витіснити
+        self._evict()
+            
+        # Зміни, що надійшли під час запису, зберігаються після наступного інтервалу
+        if self._dirty and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(config.USERS_FLUSH_INTERVAL, self._start_flush)
+            
     def add_user(self, user_id: str, username: str = "", first_name: str = "", 
                   last_name: str = "") -> bool:
         """
         Додає нового користувача або оновлює існуючого
         """
         try:
-            is_new = user_id not in self.users
+            is_new = self._get(user_id) is None
             
             # Визначаємо тип користувача (адмін чи звичайний)
             is_admin = user_id in config.ADMIN_USER_IDS
@@ -66,25 +191,35 @@ class UserManager:
                     "last_activity": datetime.datetime.now().isoformat(),
                     "pairs": config.ALL_PAIRS[:],
                     "min_profit": config.DEFAULT_MIN_PROFIT,
+                    "delivery_mode": DELIVERY_INSTANT,
                     "notifications_count": 0
                 }
                 users_logger.info(f"Додано нового користувача: {user_id} (admin: {is_admin})")
+                self._touch(user_id)
             else:
                 # Оновлюємо існуючого користувача
-                self.users[user_id]["username"] = username
-                self.users[user_id]["first_name"] = first_name
-                self.users[user_id]["last_name"] = last_name
-                self.users[user_id]["last_activity"] = datetime.datetime.now().isoformat()
+                user_data = self.users[user_id]
+                changed = (user_data.get("username"), user_data.get("first_name"), user_data.get("last_name")) != \
+                    (username, first_name, last_name)
+                user_data["username"] = username
+                user_data["first_name"] = first_name
+                user_data["last_name"] = last_name
+                user_data["last_activity"] = datetime.datetime.now().isoformat()
                 
                 # Якщо користувач став адміном, оновлюємо його статус
-                if is_admin and not self.users[user_id].get("is_admin", False):
-                    self.users[user_id]["is_admin"] = True
-                    self.users[user_id]["is_approved"] = True
+                if is_admin and not user_data.get("is_admin", False):
+                    user_data["is_admin"] = True
+                    user_data["is_approved"] = True
+                    changed = True
                     users_logger.info(f"Користувача {user_id} підвищено до адміністратора")
                 
+                # Зміна лише часу активності не потребує перезапису файлу
+                if not changed:
+                    return True
                 users_logger.info(f"Оновлено дані користувача: {user_id}")
                 
-            self.save_users()
+            self._index_user(user_id)
+            self.mark_dirty(user_id)
             return True
         except Exception as e:
             users_logger.error(f"Помилка при додаванні/оновленні користувача {user_id}: {e}")
@@ -94,13 +229,58 @@ class UserManager:
         """
         Отримує дані користувача
         """
-        return self.users.get(user_id)
+        return self._get(user_id)
+        
+    def _get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Повертає користувача з пам'яті, а якщо сховище завантажує не всіх - читає його зі сховища
+        """
+        user_data = self.users.get(user_id)
+        if self.storage.complete:
+            return user_data
+        if user_data is None:
+            user_data = self.storage.load_user(user_id)
+            if user_data is None:
+                return None
+            self.users[user_id] = user_data
+        self._touch(user_id)
+        return user_data
+        
+    def _touch(self, user_id: str):
+        """
+        Позначає звернення до користувача і витісняє з пам'яті найдавніше потрібних (sqlite)
+        
+        Активні схвалені користувачі та адміністратори завжди залишаються в пам'яті
+        (вони потрібні для розсилки), як і користувачі з незбереженими змінами.
+        """
+        if self.storage.complete:
+            return
+        self._recent[user_id] = None
+        self._recent.move_to_end(user_id)
+        self._evict()
+        
+    def _evict(self):
+        """
+        Витісняє з пам'яті найдавніше потрібних користувачів понад USERS_CACHE_SIZE
+        """
+        excess = len(self._recent) - max(1, config.USERS_CACHE_SIZE)
+        if excess <= 0:
+            return
+        for candidate in list(islice(self._recent, excess)):
+            if candidate in self._dirty or candidate in self._flushing:
+                continue
+            del self._recent[candidate]
+            user_data = self.users.get(candidate)
+            if user_data is not None and candidate not in self._indexed and not user_data.get("is_admin", False):
+                del self.users[candidate]
         
     def update_user_activity(self, user_id: str) -> bool:
         """
         Оновлює час останньої активності користувача
+        
+        Сама по собі не зберігає файл: час активності записується разом з іншими змінами.
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         self.users[user_id]["last_activity"] = datetime.datetime.now().isoformat()
@@ -110,12 +290,13 @@ class UserManager:
         """
         Активує або деактивує користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         self.users[user_id]["active"] = active
         self.update_user_activity(user_id)
-        self.save_users()
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
         
         status = "активовано" if active else "деактивовано"
         users_logger.info(f"Користувача {user_id} {status}")
@@ -125,12 +306,13 @@ class UserManager:
         """
         Схвалює користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         self.users[user_id]["is_approved"] = True
         self.update_user_activity(user_id)
-        self.save_users()
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
         
         users_logger.info(f"Користувача {user_id} схвалено")
         return True
@@ -139,12 +321,13 @@ class UserManager:
         """
         Блокує користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         self.users[user_id]["is_approved"] = False
         self.update_user_activity(user_id)
-        self.save_users()
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
         
         users_logger.info(f"Користувача {user_id} заблоковано")
         return True
@@ -153,7 +336,7 @@ class UserManager:
         """
         Оновлює список пар для користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
         
         # Перевіряємо, що всі пари підтримуються
@@ -164,7 +347,8 @@ class UserManager:
             
         self.users[user_id]["pairs"] = valid_pairs
         self.update_user_activity(user_id)
-        self.save_users()
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
         
         users_logger.info(f"Оновлено список пар для користувача {user_id}: {len(valid_pairs)} пар")
         return True
@@ -173,59 +357,215 @@ class UserManager:
         """
         Встановлює мінімальний поріг прибутку для користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         self.users[user_id]["min_profit"] = min_profit
         self.update_user_activity(user_id)
-        self.save_users()
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
         
         users_logger.info(f"Встановлено мінімальний поріг прибутку {min_profit}% для користувача {user_id}")
         return True
         
+    def set_user_delivery_mode(self, user_id: str, mode: str) -> bool:
+        """
+        Встановлює режим доставки сповіщень для користувача
+        
+        Args:
+            user_id (str): ID користувача
+            mode (str): "instant" або "digest:N" (N - вікно дайджесту в секундах)
+            
+        Returns:
+            bool: True, якщо режим встановлено
+        """
+        if self._get(user_id) is None:
+            return False
+        
+        try:
+            interval = parse_delivery_mode(mode)
+        except ValueError as e:
+            users_logger.warning(f"{e} (користувач {user_id})")
+            return False
+        
+        if interval is not None and interval < config.DIGEST_MIN_INTERVAL:
+            users_logger.warning(f"Вікно дайджесту {interval} с для користувача {user_id} менше мінімального")
+            return False
+            
+        self.users[user_id]["delivery_mode"] = mode
+        self.update_user_activity(user_id)
+        self._index_user(user_id)
+        self.mark_dirty(user_id)
+        
+        users_logger.info(f"Встановлено режим доставки {mode} для користувача {user_id}")
+        return True
+        
+    def get_digest_interval(self, user_id: str) -> Optional[int]:
+        """
+        Повертає вікно дайджесту користувача (секунд) або None, якщо сповіщення доставляються миттєво
+        """
+        return self._digest_intervals.get(user_id)
+        
     def increment_notifications(self, user_id: str) -> bool:
         """
         Збільшує лічильник повідомлень для користувача
         """
-        if user_id not in self.users:
+        if self._get(user_id) is None:
             return False
             
         if "notifications_count" not in self.users[user_id]:
             self.users[user_id]["notifications_count"] = 0
             
         self.users[user_id]["notifications_count"] += 1
+        self.mark_dirty(user_id)
         
-        # Зберігаємо тільки кожні 10 нотифікацій, щоб уникнути частого запису на диск
         if self.users[user_id]["notifications_count"] % 10 == 0:
-            self.save_users()
             users_logger.info(f"Користувач {user_id} отримав {self.users[user_id]['notifications_count']} повідомлень")
             
         return True
     
     def get_admin_users(self) -> Dict[str, Dict[str, Any]]:
         """
-        Повертає словник адміністраторів
+        Повертає словник адміністраторів (вони завжди в пам'яті)
         """
         return {uid: data for uid, data in self.users.items() 
                 if data.get("is_admin", False)}
     
     def get_active_approved_users(self) -> Dict[str, Dict[str, Any]]:
         """
-        Повертає словник активних схвалених користувачів
+        Повертає словник активних схвалених користувачів (вони завжди в пам'яті)
         """
         return {uid: data for uid, data in self.users.items() 
                 if data.get("active", False) and data.get("is_approved", False)}
     
-    def get_pending_users(self) -> Dict[str, Dict[str, Any]]:
+    def get_subscribers(self, symbol: str, profit_percent: float) -> List[str]:
+        """
+        Повертає користувачів, яких слід повідомити про можливість
+        
+        Для пари (BTC/USDT) - підписників саме цієї пари, для трикутного шляху
+        (USDT -> BTC -> ETH) - підписників хоча б однієї пари з валютою шляху.
+        Враховуються лише активні схвалені користувачі з порогом не вище profit_percent,
+        тож вартість пропорційна кількості отримувачів, а не всіх користувачів.
+        
+        Args:
+            symbol (str): Пара або шлях можливості
+            profit_percent (float): Прибуток можливості (%)
+            
+        Returns:
+            List[str]: Ідентифікатори користувачів
+        """
+        # Межа, що йде після всіх записів з порогом profit_percent
+        bound = (profit_percent, "\U0010ffff")
+        
+        if "/" in symbol:
+            entries = self._pair_index.get(symbol, [])
+            return [user_id for _, user_id in entries[:bisect.bisect_right(entries, bound)]]
+        
+        recipients = {}
+        for currency in re.findall(r'\w+', symbol):
+            entries = self._currency_index.get(currency, [])
+            for _, user_id in entries[:bisect.bisect_right(entries, bound)]:
+                recipients[user_id] = True
+        return list(recipients)
+    
+    def count_active_approved_users(self) -> int:
+        """
+        Повертає кількість активних схвалених користувачів
+        """
+        return len(self._indexed)
+    
+    def _rebuild_index(self):
+        """
+        Повністю перебудовує індекс підписок (після завантаження користувачів)
+        """
+        self._pair_index = {}
+        self._currency_index = {}
+        self._indexed = {}
+        self._digest_intervals = {}
+        for user_id in self.users:
+            self._index_user(user_id)
+    
+    def _index_user(self, user_id: str):
+        """
+        Оновлює записи користувача в індексі підписок після зміни його даних
+        """
+        self._unindex_user(user_id)
+        
+        user_data = self.users.get(user_id)
+        if not user_data or not user_data.get("active", False) or not user_data.get("is_approved", False):
+            return
+        
+        min_profit = float(user_data.get("min_profit", config.DEFAULT_MIN_PROFIT))
+        pairs = list(dict.fromkeys(user_data.get("pairs", [])))
+        currencies = list(dict.fromkeys(
+            currency for pair in pairs for currency in pair.split("/") if currency
+        ))
+        
+        entry = (min_profit, user_id)
+        for pair in pairs:
+            bisect.insort(self._pair_index.setdefault(pair, []), entry)
+        for currency in currencies:
+            bisect.insort(self._currency_index.setdefault(currency, []), entry)
+        self._indexed[user_id] = (min_profit, pairs, currencies)
+        
+        try:
+            interval = parse_delivery_mode(user_data.get("delivery_mode", DELIVERY_INSTANT))
+        except ValueError:
+            interval = None
+        if interval:
+            self._digest_intervals[user_id] = interval
+    
+    def _unindex_user(self, user_id: str):
+        """
+        Видаляє користувача з індексу підписок
+        """
+        self._digest_intervals.pop(user_id, None)
+        indexed = self._indexed.pop(user_id, None)
+        if indexed is None:
+            return
+        
+        min_profit, pairs, currencies = indexed
+        entry = (min_profit, user_id)
+        for index, keys in ((self._pair_index, pairs), (self._currency_index, currencies)):
+            for key in keys:
+                entries = index.get(key)
+                if not entries:
+                    continue
+                position = bisect.bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+                if not entries:
+                    del index[key]
+    
+    async def get_pending_users(self) -> Dict[str, Dict[str, Any]]:
         """
         Повертає словник користувачів, які очікують схвалення
         """
-        return {uid: data for uid, data in self.users.items() 
+        users = self._with_stored(await self._find(active=True, is_approved=False, is_admin=False))
+        return {uid: data for uid, data in users.items() 
                 if data.get("active", False) and not data.get("is_approved", False) 
                 and not data.get("is_admin", False)}
     
-    def get_all_users(self) -> Dict[str, Dict[str, Any]]:
+    async def get_all_users(self) -> Dict[str, Dict[str, Any]]:
         """
         Повертає словник всіх користувачів
         """
-        return self.users.copy()
+        return self._with_stored(await self._find())
+    
+    async def _find(self, **flags) -> Dict[str, Dict[str, Any]]:
+        """
+        Шукає користувачів у сховищі в окремому потоці (повне сканування не блокує цикл подій)
+        """
+        if self.storage.complete:
+            return {}
+        return await asyncio.to_thread(self.storage.find, **flags)
+    
+    def _with_stored(self, stored: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Доповнює користувачів у пам'яті знайденими у сховищі (дані в пам'яті новіші)
+        """
+        if self.storage.complete:
+            return self.users.copy()
+        users = dict(stored)
+        users.update(self.users)
+        return users
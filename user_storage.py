@@ -0,0 +1,278 @@
+# user_storage.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import config
+
+users_logger = logging.getLogger('users')
+
+class UserStorage(ABC):
+    """
+    Абстрактне сховище користувачів для UserManager
+
+    Запис розділено на два кроки: prepare() знімає дані змінених користувачів
+    у циклі подій (тож знімок узгоджений), а write() виконується в потоці.
+    """
+    # Чи завантажує load_initial() усіх користувачів (інакше решта читається на вимогу)
+    complete = True
+
+    @abstractmethod
+    def load_initial(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Повертає користувачів, які мають бути в пам'яті від запуску
+        """
+        pass
+
+    def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Повертає користувача, якого немає в пам'яті (для неповних сховищ)
+        """
+        return None
+
+    def find(self, active: Optional[bool] = None, is_approved: Optional[bool] = None,
+             is_admin: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Повертає користувачів зі вказаними прапорцями (для неповних сховищ; може виконуватись в окремому потоці)
+        """
+        return {}
+
+    def count(self) -> Optional[int]:
+        """
+        Повертає загальну кількість збережених користувачів (None - невідомо)
+        """
+        return None
+
+    @abstractmethod
+    def prepare(self, users: Dict[str, Dict[str, Any]], dirty: Set[str]) -> Any:
+        """
+        Знімає дані для запису (викликається в циклі подій)
+
+        Args:
+            users (Dict[str, Dict[str, Any]]): Користувачі в пам'яті
+            dirty (Set[str]): ID змінених користувачів
+        """
+        pass
+
+    @abstractmethod
+    def write(self, payload: Any):
+        """
+        Записує знімок, отриманий від prepare() (може виконуватись в окремому потоці)
+        """
+        pass
+
+    def close(self):
+        pass
+
+class JsonUserStorage(UserStorage):
+    """
+    Усі користувачі в одному JSON-файлі, що повністю переписується при кожному збереженні
+    """
+    def load_initial(self) -> Dict[str, Dict[str, Any]]:
+        return config.load_users()
+
+    def prepare(self, users: Dict[str, Dict[str, Any]], dirty: Set[str]) -> str:
+        return json.dumps(users)
+
+    def write(self, payload: str):
+        config.write_users_file(payload)
+
+# Поля користувача, що зберігаються в окремих колонках (решта - в колонці extra як JSON)
+USER_COLUMNS = ("username", "first_name", "last_name", "is_admin", "is_approved", "active",
+                "created_at", "last_activity", "min_profit", "delivery_mode", "notifications_count")
+BOOL_COLUMNS = ("is_admin", "is_approved", "active")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    username TEXT,
+    first_name TEXT,
+    last_name TEXT,
+    is_admin INTEGER NOT NULL DEFAULT 0,
+    is_approved INTEGER NOT NULL DEFAULT 0,
+    active INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT,
+    last_activity TEXT,
+    min_profit REAL,
+    delivery_mode TEXT,
+    notifications_count INTEGER NOT NULL DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_active_approved ON users (active, is_approved);
+CREATE INDEX IF NOT EXISTS idx_users_admin ON users (is_admin) WHERE is_admin = 1;
+CREATE TABLE IF NOT EXISTS user_pairs (
+    user_id TEXT NOT NULL,
+    pair TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (user_id, pair)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_pairs_pair ON user_pairs (pair);
+"""
+
+@contextmanager
+def _snapshot(conn: sqlite3.Connection):
+    """
+    Транзакція читання: усі запити в ній бачать той самий стан бази
+    """
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+class SqliteUserStorage(UserStorage):
+    """
+    Користувачі в SQLite (режим WAL)
+
+    Прапорці active/is_approved/is_admin проіндексовані, пари підписок зберігаються
+    в таблиці user_pairs. При запуску завантажуються лише активні схвалені користувачі
+    та адміністратори, решта читається за первинним ключем на вимогу. Збереження
+    оновлює лише рядки змінених користувачів. Якщо база порожня, а users.json існує,
+    користувачі переносяться з нього.
+
+    Читання не чекає на запис: load_user() використовує окреме з'єднання циклу
+    подій, а find() відкриває власне з'єднання (у WAL читачі не блокуються записом).
+    """
+    complete = False
+
+    def __init__(self, db_file: str = config.USERS_DB_FILE, json_file: str = config.USERS_FILE):
+        self.db_file = db_file
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        # З'єднання запису використовується потоком запису, доступ захищено блокуванням
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate_from_json(json_file)
+        # З'єднання для читання окремих користувачів з циклу подій
+        self._read_conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _migrate_from_json(self, json_file: str):
+        """
+        Переносить користувачів з users.json у порожню базу
+        """
+        if self.count() or not os.path.exists(json_file):
+            return
+
+        with open(json_file, "r") as f:
+            users = json.load(f)
+        if not users:
+            return
+
+        self.write(self.prepare(users, set(users)))
+        users_logger.info(f"Перенесено {len(users)} користувачів з {json_file} у {self.db_file}")
+
+    def _row_to_user(self, row: sqlite3.Row, pairs: List[str]) -> Dict[str, Any]:
+        user = json.loads(row["extra"]) if row["extra"] else {}
+        for column in USER_COLUMNS:
+            value = row[column]
+            if value is None:
+                continue
+            user[column] = bool(value) if column in BOOL_COLUMNS else value
+        user["pairs"] = pairs
+        return user
+
+    def _select(self, conn: sqlite3.Connection, where: str = "", params: Tuple = ()) -> Dict[str, Dict[str, Any]]:
+        with _snapshot(conn):
+            rows = conn.execute(f"SELECT * FROM users {where}", params).fetchall()
+            pairs: Dict[str, List[str]] = {}
+            if rows:
+                # Пари вибраних користувачів одним запитом з тією ж умовою
+                for user_id, pair in conn.execute(
+                        f"SELECT p.user_id, p.pair FROM user_pairs p JOIN users u ON u.user_id = p.user_id "
+                        f"{where} ORDER BY p.user_id, p.position", params):
+                    pairs.setdefault(user_id, []).append(pair)
+        return {row["user_id"]: self._row_to_user(row, pairs.get(row["user_id"], [])) for row in rows}
+
+    def load_initial(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self._select(self._conn, "WHERE (active = 1 AND is_approved = 1) OR is_admin = 1")
+
+    def load_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        # Пошук за первинним ключем; з'єднання читання не ділить блокування з потоком запису
+        with _snapshot(self._read_conn) as conn:
+            row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None:
+                return None
+            pairs = [pair for (pair,) in conn.execute(
+                "SELECT pair FROM user_pairs WHERE user_id = ? ORDER BY position", (user_id,))]
+        return self._row_to_user(row, pairs)
+
+    def find(self, active: Optional[bool] = None, is_approved: Optional[bool] = None,
+             is_admin: Optional[bool] = None) -> Dict[str, Dict[str, Any]]:
+        conditions = []
+        params = []
+        for column, value in (("active", active), ("is_approved", is_approved), ("is_admin", is_admin)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(int(value))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = self._connect()
+        try:
+            return self._select(conn, where, tuple(params))
+        finally:
+            conn.close()
+
+    def count(self) -> Optional[int]:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def prepare(self, users: Dict[str, Dict[str, Any]], dirty: Set[str]) -> List[Tuple]:
+        rows = []
+        for user_id in dirty:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            values = []
+            for column in USER_COLUMNS:
+                value = user.get(column)
+                values.append(int(value) if column in BOOL_COLUMNS and value is not None else value)
+            extra = {key: value for key, value in user.items() if key not in USER_COLUMNS and key != "pairs"}
+            rows.append((user_id, tuple(values), json.dumps(extra) if extra else None,
+                         list(dict.fromkeys(user.get("pairs", [])))))
+        return rows
+
+    def write(self, payload: List[Tuple]):
+        placeholders = ", ".join("?" for _ in range(len(USER_COLUMNS) + 2))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in USER_COLUMNS + ("extra",))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO users (user_id, {', '.join(USER_COLUMNS)}, extra) VALUES ({placeholders}) "
+                f"ON CONFLICT(user_id) DO UPDATE SET {updates}",
+                ((user_id,) + values + (extra,) for user_id, values, extra, _ in payload)
+            )
+            self._conn.executemany("DELETE FROM user_pairs WHERE user_id = ?",
+                                   ((user_id,) for user_id, _, _, _ in payload))
+            self._conn.executemany(
+                "INSERT INTO user_pairs (user_id, pair, position) VALUES (?, ?, ?)",
+                ((user_id, pair, position) for user_id, _, _, pairs in payload for position, pair in enumerate(pairs))
+            )
+
+    def close(self):
+        self._read_conn.close()
+        with self._lock:
+            self._conn.close()
+
+def create_user_storage(backend: str = config.USERS_STORAGE) -> UserStorage:
+    """
+    Створює сховище користувачів за назвою ("json" або "sqlite")
+    """
+    if backend == "sqlite":
+        return SqliteUserStorage()
+    if backend != "json":
+        users_logger.warning(f"Невідоме сховище користувачів {backend}, використовується json")
+    return JsonUserStorage()
@@ -2,23 +2,30 @@
 from aiohttp import web
 import json
 import asyncio
+import hmac
 import os
 import logging
 from datetime import datetime
 import traceback
 
 import config
+import metrics
+from profiler import PROFILER
 from arbitrage.pair_analyzer import ArbitragePairAnalyzer
 
 logger = logging.getLogger('main')
 
+# Адреси, з яких до веб-сервера можна звернутись лише з цієї ж машини
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
 class WebDashboard:
     """
     Клас для веб-інтерфейсу моніторингу бота
     """
-    def __init__(self, host=config.WEB_SERVER_HOST, port=config.WEB_SERVER_PORT):
+    def __init__(self, host=config.WEB_SERVER_HOST, port=config.WEB_SERVER_PORT, telegram_worker=None, loop_monitor=None):
         self.host = host
         self.port = port
+        self.loop_monitor = loop_monitor
         self.app = web.Application()
         self.site = None
         self.runner = None
@@ -28,9 +35,24 @@ class WebDashboard:
         self.app.router.add_get('/api/status', self.status_handler)
         self.app.router.add_get('/api/opportunities', self.opportunities_handler)
         self.app.router.add_get('/api/stats', self.stats_handler)
+        self.app.router.add_get('/api/loop', self.loop_handler)
+        self.app.router.add_get('/api/profile', self.profile_status_handler)
+        # Запуск профілювання навантажує процес, тож без токена доступний лише на localhost
+        if config.PROFILER_TOKEN or host in LOCAL_HOSTS:
+            self.app.router.add_post('/api/profile', self.profile_start_handler)
+            self.app.router.add_post('/api/profile/stop', self.profile_stop_handler)
+        else:
+            logger.warning(f"PROFILER_TOKEN не задано, керування профайлером через {host} вимкнено")
+        self.app.router.add_get('/metrics', self.metrics_handler)
+        
+        # Приймання оновлень Telegram через webhook
+        if telegram_worker and telegram_worker.webhook_mode:
+            self.app.router.add_post(config.TELEGRAM_WEBHOOK_PATH, telegram_worker.handle_webhook)
         
-        # Додаємо обробку статичних файлів
-        self.app.router.add_static('/static/', path=os.path.join(os.path.dirname(__file__), 'static'), name='static')
+        # Додаємо обробку статичних файлів (aiohttp не створює маршрут для відсутнього каталогу)
+        static_dir = os.path.join(os.path.dirname(__file__), 'static')
+        if os.path.isdir(static_dir):
+            self.app.router.add_static('/static/', path=static_dir, name='static')
         
     async def start(self):
         """
@@ -163,6 +185,11 @@ class WebDashboard:
                         <div id="stats-content">Завантаження...</div>
                     </div>
                     
+                    <div class="card">
+                        <h2>Цикл подій</h2>
+                        <div id="loop-content">Завантаження...</div>
+                    </div>
+                    
                     <div class="footer">
                         &copy; {datetime.now().year} {config.APP_NAME} - Криптоарбітражний бот
                     </div>
@@ -210,7 +237,7 @@ class WebDashboard:
                             }}
                             
                             document.getElementById('status-content').innerHTML = statusHtml;
-                        })
+                        }})
                         .catch(error => {{
                             document.getElementById('status-content').innerHTML = `<p>Помилка при завантаженні даних: ${{error}}</p>`;
                         }});
@@ -272,7 +299,7 @@ class WebDashboard:
                             }}
                             
                             document.getElementById('opportunities-content').innerHTML = opportunitiesHtml;
-                        })
+                        }})
                         .catch(error => {{
                             document.getElementById('opportunities-content').innerHTML = `<p>Помилка при завантаженні даних: ${{error}}</p>`;
                         }});
@@ -369,11 +396,63 @@ class WebDashboard:
                             }}
                             
                             document.getElementById('stats-content').innerHTML = statsHtml;
-                        })
+                        }})
                         .catch(error => {{
                             document.getElementById('stats-content').innerHTML = `<p>Помилка при завантаженні даних: ${{error}}</p>`;
                         }});
                         
+                    // Завантаження даних про блокування циклу подій
+                    fetch('/api/loop')
+                        .then(response => response.json())
+                        .then(data => {{
+                            let loopHtml = '';
+                            
+                            if (data.error) {{
+                                loopHtml = `<p>Помилка: ${{data.error}}</p>`;
+                            }} else {{
+                                loopHtml = `
+                                    <p><strong>Максимальна затримка:</strong> ${{data.max_lag}}с</p>
+                                    <p><strong>Блокувань довших за ${{data.threshold}}с:</strong> ${{data.stalls}} (загалом ${{data.blocked_seconds}}с)</p>
+                                `;
+                                
+                                if (data.offenders && data.offenders.length > 0) {{
+                                    loopHtml += `
+                                        <table>
+                                            <thead>
+                                                <tr>
+                                                    <th>Місце в коді</th>
+                                                    <th>Блокувань</th>
+                                                    <th>Загалом</th>
+                                                    <th>Найдовше</th>
+                                                </tr>
+                                            </thead>
+                                            <tbody>
+                                    `;
+                                    
+                                    data.offenders.forEach(offender => {{
+                                        loopHtml += `
+                                            <tr title="${{offender.stack.replace(/"/g, '&quot;')}}">
+                                                <td>${{offender.location}}</td>
+                                                <td>${{offender.stalls}}</td>
+                                                <td>${{offender.blocked_seconds}}с</td>
+                                                <td>${{offender.max_stall}}с</td>
+                                            </tr>
+                                        `;
+                                    }});
+                                    
+                                    loopHtml += `
+                                            </tbody>
+                                        </table>
+                                    `;
+                                }}
+                            }}
+                            
+                            document.getElementById('loop-content').innerHTML = loopHtml;
+                        }})
+                        .catch(error => {{
+                            document.getElementById('loop-content').innerHTML = `<p>Помилка при завантаженні даних: ${{error}}</p>`;
+                        }});
+                        
                     // Оновлення даних кожні 30 секунд
                     setInterval(() => {{
                         fetch('/api/status')
@@ -416,6 +495,63 @@ class WebDashboard:
             logger.error(f"Помилка при обробці status_handler: {e}")
             return web.json_response({"error": str(e)})
     
+    async def loop_handler(self, request):
+        """
+        API для отримання затримки циклу подій і місць у коді, що його блокують
+        """
+        if not self.loop_monitor:
+            return web.json_response({"error": "Монітор циклу подій вимкнено"})
+        return web.json_response(self.loop_monitor.get_stats())
+    
+    async def profile_status_handler(self, request):
+        """
+        API для отримання стану профайлера і результату останнього профілювання
+        """
+        return web.json_response(PROFILER.status())
+    
+    async def profile_start_handler(self, request):
+        """
+        API для запуску профілювання (?seconds=N, за замовчуванням PROFILER_DEFAULT_DURATION)
+        """
+        if not self._profiler_authorized(request):
+            return web.json_response({"error": "Невірний токен профайлера"}, status=401)
+        try:
+            seconds = float(request.query.get("seconds", config.PROFILER_DEFAULT_DURATION))
+        except ValueError:
+            return web.json_response({"error": "Некоректна тривалість профілювання"}, status=400)
+        if not PROFILER.start(seconds):
+            return web.json_response({"error": "Профілювання вже виконується", **PROFILER.status()}, status=409)
+        return web.json_response(PROFILER.status())
+    
+    async def profile_stop_handler(self, request):
+        """
+        API для дострокового завершення профілювання
+        """
+        if not self._profiler_authorized(request):
+            return web.json_response({"error": "Невірний токен профайлера"}, status=401)
+        if not PROFILER.running:
+            return web.json_response({"error": "Профілювання не виконується"}, status=409)
+        PROFILER.stop()
+        return web.json_response(await PROFILER.wait())
+    
+    def _profiler_authorized(self, request) -> bool:
+        """
+        Перевіряє заголовок X-Profiler-Token, якщо задано PROFILER_TOKEN
+        """
+        if not config.PROFILER_TOKEN:
+            return True
+        token = request.headers.get("X-Profiler-Token", "")
+        return hmac.compare_digest(token.encode(), config.PROFILER_TOKEN.encode())
+    
+    async def metrics_handler(self, request):
+        """
+        Метрики процесу в текстовому форматі Prometheus
+        """
+        return web.Response(
+            text=metrics.REGISTRY.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+        )
+    
     async def opportunities_handler(self, request):
         """
         API для отримання поточних арбітражних можливостей
@@ -472,12 +608,12 @@ class WebDashboard:
             return web.json_response({"error": str(e)})
 
 # Функція для запуску веб-сервера
-async def start_web_server():
+async def start_web_server(telegram_worker=None, loop_monitor=None):
     """
-    Запускає веб-сервер для моніторингу
+    Запускає веб-сервер для моніторингу (і для webhook Telegram, якщо він увімкнений)
     """
-    if config.WEB_SERVER_ENABLED:
-        dashboard = WebDashboard()
+    if config.WEB_SERVER_ENABLED or (telegram_worker and telegram_worker.webhook_mode):
+        dashboard = WebDashboard(telegram_worker=telegram_worker, loop_monitor=loop_monitor)
         await dashboard.start()
         return dashboard
     return None
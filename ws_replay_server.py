@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# ws_replay_server.py
+import asyncio
+import json
+import logging
+import sys
+from typing import List, Optional
+
+from aiohttp import web
+
+# Налаштовуємо логування
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('ws_replay')
+
+# Записані кадри потоку bookTicker Binance для перевірки без доступу до біржі
+SAMPLE_BINANCE_FRAMES = [
+    {"result": None, "id": 1},
+    {"u": 400900217, "s": "BTCUSDT", "b": "64250.10", "B": "1.204", "a": "64250.20", "A": "0.512"},
+    {"u": 400900218, "s": "ETHUSDT", "b": "3120.55", "B": "14.10", "a": "3120.56", "A": "9.03"},
+    {"u": 400900219, "s": "BTCUSDT", "b": "64251.00", "B": "0.930", "a": "64251.10", "A": "2.001"},
+]
+
+class WebSocketReplayServer:
+    """
+    Локальний WebSocket-сервер, який відтворює записані кадри біржового потоку
+
+    Після першого повідомлення клієнта (підписки) сервер надсилає всі кадри
+    з інтервалом frame_delay і тримає з'єднання відкритим до закриття клієнтом.
+    """
+    def __init__(self, frames: List, host: str = "127.0.0.1", port: int = 8765, frame_delay: float = 0.0):
+        self.frames = frames
+        self.host = host
+        self.port = port
+        self.frame_delay = frame_delay
+        self.received_messages = []  # Повідомлення від клієнтів (для перевірки підписки)
+        self.app = web.Application()
+        self.app.router.add_get('/ws', self.ws_handler)
+        self.runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "WebSocketReplayServer":
+        """
+        Створює сервер з файлу записаних кадрів (один JSON-кадр на рядок)
+        """
+        with open(path, "r") as f:
+            frames = [json.loads(line) for line in f if line.strip()]
+        return cls(frames, **kwargs)
+
+    async def start(self):
+        """
+        Запускає сервер
+        """
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        logger.info(f"Сервер відтворення запущено на {self.url} ({len(self.frames)} кадрів)")
+
+    async def stop(self):
+        """
+        Зупиняє сервер
+        """
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def ws_handler(self, request):
+        """
+        Обробляє WebSocket-з'єднання клієнта
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        # Чекаємо на підписку перед відтворенням
+        msg = await ws.receive()
+        if msg.type == web.WSMsgType.TEXT:
+            self.received_messages.append(json.loads(msg.data))
+
+        for frame in self.frames:
+            await ws.send_str(json.dumps(frame))
+            if self.frame_delay:
+                await asyncio.sleep(self.frame_delay)
+
+        # Тримаємо з'єднання, відповідаючи на прикладні повідомлення клієнта
+        async for msg in ws:
+            if msg.type == web.WSMsgType.TEXT:
+                self.received_messages.append(json.loads(msg.data))
+
+        return ws
+
+async def check_stream(frames_path: Optional[str] = None):
+    """
+    Перевіряє subscribe_tickers() BinanceAPI на локальному сервері відтворення
+    """
+    from exchange_api.binance_api import BinanceAPI
+
+    if frames_path:
+        server = WebSocketReplayServer.from_file(frames_path)
+    else:
+        server = WebSocketReplayServer(SAMPLE_BINANCE_FRAMES)
+    await server.start()
+
+    exchange = BinanceAPI(api_key="", api_secret="")
+    exchange.ws_url = server.url
+
+    expected = sum(1 for frame in server.frames if "s" in frame)
+    received = 0
+    try:
+        stream = exchange.subscribe_tickers(["BTC/USDT", "ETH/USDT"])
+        async for ticker in stream:
+            received += 1
+            logger.info(f"{ticker['symbol']}: bid={ticker['bid']}, ask={ticker['ask']}")
+            if received >= expected:
+                break
+        await stream.aclose()
+
+        logger.info(f"Підписка клієнта: {server.received_messages[0] if server.received_messages else 'відсутня'}")
+        logger.info(f"Живі ціни: {exchange.live_tickers}")
+        return received == expected
+    finally:
+        await exchange.close()
+        await server.stop()
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    success = asyncio.run(check_stream(path))
+
+    if success:
+        logger.info("✅ WebSocket-потік працює коректно")
+        sys.exit(0)
+    else:
+        logger.error("❌ Отримано не всі кадри потоку")
+        sys.exit(1)